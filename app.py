@@ -1,5 +1,6 @@
 import streamlit as st
-from utils.database import USERS, setup_files
+from utils.database import authenticate_user, setup_files
+from utils.sessions import current_user, end_session, start_session
 import os
 
 # Configurações iniciais
@@ -8,16 +9,16 @@ st.set_page_config(
     layout="wide",
 )
 
-# Cria os arquivos de dados se eles não existirem
+# Cria os arquivos de dados se eles não existirem (uma vez por processo)
 setup_files()
 
 # Função para realizar o login
 def check_login(username, password):
-    if username in USERS and USERS[username]["password"] == password:
-        st.session_state["logged_in"] = True
-        st.session_state["username"] = username
-        st.session_state["role"] = USERS[username]["role"]
-        st.success(f"Bem-vindo, {username}!")
+    perfil = authenticate_user(username, password)
+    if perfil:
+        # Sessão no servidor: perfil e permissões ficam em cache e o token em um cookie
+        start_session(perfil)
+        st.rerun()
     else:
         st.error("Usuário ou senha inválidos.")
 
@@ -32,13 +33,10 @@ def login_page():
 
 # Função para logout
 def logout():
-    st.session_state["logged_in"] = False
-    st.session_state["username"] = None
-    st.session_state["role"] = None
-    st.rerun()
+    end_session()
 
 # Roteamento de páginas
-if "logged_in" not in st.session_state or not st.session_state["logged_in"]:
+if current_user() is None:
     login_page()
 else:
     st.sidebar.title(f"Bem-vindo, {st.session_state['username']}!")
@@ -0,0 +1,35 @@
+"""Compara dois arquivos de resultados de benchmarks/run.py (mediana por caso e escala).
+
+Uso: python benchmarks/comparar.py base.json novo.json
+"""
+import argparse
+import json
+
+
+def carregar(caminho: str) -> dict:
+    with open(caminho, encoding='utf-8') as f:
+        relatorio = json.load(f)
+    return {
+        (r['caso'], r['escala']): r['mediana']
+        for r in relatorio['resultados'] if 'mediana' in r
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('base')
+    parser.add_argument('novo')
+    args = parser.parse_args()
+
+    base, novo = carregar(args.base), carregar(args.novo)
+    print(f"{'caso':<52} {'escala':>6} {'base (ms)':>12} {'novo (ms)':>12} {'razão':>8}")
+    for chave in sorted(base.keys() & novo.keys()):
+        caso, escala = chave
+        razao = novo[chave] / base[chave] if base[chave] else float('inf')
+        print(f"{caso:<52} {escala:>6} {base[chave] * 1000:>12.1f} {novo[chave] * 1000:>12.1f} {razao:>7.2f}x")
+    for caso, escala in sorted(base.keys() ^ novo.keys()):
+        print(f"{caso:<52} {escala:>6} (presente em apenas um dos arquivos)")
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,22 @@
+import os
+from math import ceil
+
+from generate_data import EscritorArquivo, calendario_letivo, gerar_dados
+
+ANO_LETIVO = 2025
+
+
+def gerar_escola(destino: str, linhas: int, alunos_por_turma: int = 30,
+                 turmas_por_professor: int = 4, seed: int = 42) -> dict:
+    """Gera em destino/data uma escola sintética com `linhas` registros de frequência.
+
+    O número de turmas é escolhido para que alunos × dias letivos de um ano chegue
+    ao volume pedido. Retorna o resumo de generate_data.gerar_dados.
+    """
+    dias = len(calendario_letivo([ANO_LETIVO]))
+    turmas = ceil(ceil(linhas / dias) / alunos_por_turma)
+    return gerar_dados(
+        EscritorArquivo(os.path.join(destino, 'data'), 'csv'), cadastro='sintetico',
+        turmas_por_escola=turmas, alunos_por_turma=alunos_por_turma,
+        professores=ceil(turmas / turmas_por_professor), anos=[ANO_LETIVO], max_linhas=linhas, seed=seed
+    )
\ No newline at end of file
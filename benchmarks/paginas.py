@@ -0,0 +1,37 @@
+import ast
+import os
+from typing import Callable, Dict
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def carregar_funcoes(pagina: str, *nomes: str) -> Dict[str, Callable]:
+    """Extrai funções de uma página do Streamlit sem executar o script da página.
+
+    Os imports e constantes do topo da página são executados e as funções pedidas
+    (inclusive as definidas dentro de abas) compiladas sem decoradores, de modo que
+    o benchmark mede o cálculo e não o st.cache_data.
+    """
+    caminho = os.path.join(RAIZ, 'pages', pagina)
+    with open(caminho, encoding='utf-8') as f:
+        arvore = ast.parse(f.read(), filename=caminho)
+
+    corpo = [
+        no for no in arvore.body
+        if isinstance(no, (ast.Import, ast.ImportFrom))
+        or (isinstance(no, ast.Assign) and isinstance(no.value, ast.Constant))
+    ]
+    funcoes = {
+        no.name: no for no in ast.walk(arvore)
+        if isinstance(no, ast.FunctionDef) and no.name in nomes
+    }
+    faltando = set(nomes) - set(funcoes)
+    if faltando:
+        raise KeyError(f"Funções não encontradas em {pagina}: {', '.join(sorted(faltando))}")
+
+    for no in funcoes.values():
+        no.decorator_list = []
+    modulo = ast.Module(body=corpo + [funcoes[nome] for nome in nomes], type_ignores=[])
+    namespace = {'__name__': f"pagina_{os.path.splitext(pagina)[0]}"}
+    exec(compile(modulo, caminho, 'exec'), namespace)
+    return {nome: namespace[nome] for nome in nomes}
\ No newline at end of file
@@ -0,0 +1,239 @@
+"""Benchmarks de leitura, agregação, gravação e exportação em escolas sintéticas.
+
+Uso (a partir da raiz do projeto):
+
+    python benchmarks/run.py                         # 10k, 100k e 1M registros
+    python benchmarks/run.py --escalas 10k 10M --repeticoes 5
+    python benchmarks/run.py --casos coordenador exportacao
+    python benchmarks/comparar.py base.json novo.json
+
+Cada escala gera turmas/alunos/frequência em um diretório temporário e mede as
+funções usadas pelas páginas. Os resultados são gravados (a cada caso) em
+benchmarks/resultados/<data>.json para comparar execuções.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from statistics import median
+from typing import Callable, Dict, List, Optional
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from benchmarks.escola_sintetica import gerar_escola
+from benchmarks.paginas import carregar_funcoes
+
+ESCALAS = {'10k': 10_000, '100k': 100_000, '1M': 1_000_000, '10M': 10_000_000}
+ESCALAS_PADRAO = ['10k', '100k', '1M']
+GRUPOS = ['database', 'paginas', 'coordenador', 'admin', 'professor', 'exportacao']
+RESULTADOS_DIR = os.path.join(RAIZ, 'benchmarks', 'resultados')
+# Limite de linhas de uma planilha do Excel (sem contar o cabeçalho)
+LIMITE_EXCEL = 1_048_575
+
+
+class Benchmark:
+    """Executa os casos de uma escala e acumula os resultados no arquivo JSON."""
+
+    def __init__(self, saida: str, repeticoes: int, grupos: List[str], parametros: Dict[str, any]):
+        self.saida = saida
+        self.repeticoes = repeticoes
+        self.grupos = grupos
+        self.relatorio = {
+            'inicio': datetime.now().isoformat(timespec='seconds'),
+            'ambiente': _ambiente(),
+            'parametros': parametros,
+            'resultados': [],
+        }
+
+    def medir(self, escala: str, linhas: int, grupo: str, caso: str, func: Callable[[], any],
+              preparar: Optional[Callable[[], None]] = None, pular: str = ""):
+        """Mede func `repeticoes` vezes (preparar roda antes de cada uma, fora da medição)."""
+        if grupo not in self.grupos:
+            return None
+        resultado = {'escala': escala, 'linhas': linhas, 'grupo': grupo, 'caso': caso}
+        retorno = None
+        if pular:
+            resultado['pulado'] = pular
+            print(f"{escala:>5}  {caso:<52} pulado ({pular})")
+        else:
+            tempos = []
+            for _ in range(self.repeticoes):
+                if preparar:
+                    preparar()
+                inicio = time.perf_counter()
+                retorno = func()
+                tempos.append(time.perf_counter() - inicio)
+            resultado.update({
+                'tempos': [round(t, 6) for t in tempos],
+                'mediana': round(median(tempos), 6),
+                'minimo': round(min(tempos), 6),
+                'rss_pico_mb': round(_rss_pico_mb(), 1),
+            })
+            print(f"{escala:>5}  {caso:<52} {resultado['mediana'] * 1000:>12.1f} ms")
+        self.relatorio['resultados'].append(resultado)
+        self._gravar()
+        return retorno
+
+    def _gravar(self):
+        os.makedirs(os.path.dirname(self.saida), exist_ok=True)
+        caminho_tmp = f"{self.saida}.tmp"
+        with open(caminho_tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.relatorio, f, ensure_ascii=False, indent=2)
+        os.replace(caminho_tmp, self.saida)
+
+
+def executar_escala(bench: Benchmark, escala: str, linhas: int, seed: int):
+    # Imports da aplicação só depois do chdir: os caminhos de dados são relativos
+    from utils import database
+    from utils.database import ALUNOS_FILE, FREQUENCIA_FILE, TURMAS_FILE
+    from utils.export import consolidated_workbook, serialize_dataframe
+
+    def invalidar():
+        """Muda a versão dos dados (mtime), forçando a reconstrução dos índices em memória."""
+        agora = time.time_ns()
+        for arquivo in (FREQUENCIA_FILE, ALUNOS_FILE, TURMAS_FILE):
+            os.utime(arquivo, ns=(agora, agora))
+
+    admin = carregar_funcoes('2_Dashboard_Admin.py', 'load_all_data', 'calcular_relatorio')
+    coordenador = carregar_funcoes(
+        '3_Dashboard_Coordenador.py', 'load_all_data', 'gerar_insights', 'gerar_alertas', 'calcular_ranking_faltas'
+    )
+    professor = carregar_funcoes('1_Dashboard_Professor.py', 'load_data', 'salvar_frequencia_dia')
+    agente = carregar_funcoes('4_Dashboard_Agente.py', 'load_agente_data')
+
+    # Banco de dados
+    df_bruto = bench.medir(escala, linhas, 'database', 'database.get_data[frequencia]',
+                           lambda: database.get_data(FREQUENCIA_FILE))
+    bench.medir(escala, linhas, 'database', 'database.save_data[frequencia]',
+                lambda: database.db_manager.save_data(df_bruto, 'frequencia', notify=False))
+
+    # Carregamento de cada página (índices reconstruídos a cada repetição)
+    def versao():
+        return database.get_data_version(FREQUENCIA_FILE, ALUNOS_FILE, TURMAS_FILE)
+
+    dados_admin = bench.medir(escala, linhas, 'paginas', 'admin.load_all_data',
+                              lambda: admin['load_all_data'](versao()), invalidar)
+    dados_coord = bench.medir(escala, linhas, 'paginas', 'coordenador.load_all_data',
+                              lambda: coordenador['load_all_data'](versao()), invalidar)
+    dados_prof = bench.medir(escala, linhas, 'paginas', 'professor.load_data',
+                             lambda: professor['load_data'](versao(), 'professor1', 'professor'), invalidar)
+    bench.medir(escala, linhas, 'paginas', 'agente.load_agente_data',
+                lambda: agente['load_agente_data'](versao()), invalidar)
+
+    # Agregações do Coordenador e relatórios do Admin
+    if dados_coord is None:
+        dados_coord = coordenador['load_all_data'](versao())
+    df_coord = dados_coord[0]
+    bench.medir(escala, linhas, 'coordenador', 'coordenador.gerar_insights',
+                lambda: coordenador['gerar_insights'](df_coord))
+    bench.medir(escala, linhas, 'coordenador', 'coordenador.gerar_alertas',
+                lambda: coordenador['gerar_alertas'](df_coord, 30, 15))
+    bench.medir(escala, linhas, 'coordenador', 'coordenador.calcular_ranking_faltas',
+                lambda: coordenador['calcular_ranking_faltas'](df_coord))
+
+    if dados_admin is None:
+        dados_admin = admin['load_all_data'](versao())
+    df_completo = dados_admin[3]
+    for tipo in ("Frequência Consolidada", "Relatório por Turma", "Relatório por Professor", "Análise Temporal"):
+        bench.medir(escala, linhas, 'admin', f"admin.calcular_relatorio[{tipo}]",
+                    lambda tipo=tipo: admin['calcular_relatorio'](df_completo, tipo, "Todos"))
+
+    # Gravação de uma chamada pelo Professor (substitui o último dia da turma)
+    if dados_prof is None:
+        dados_prof = professor['load_data'](versao(), 'professor1', 'professor')
+    turma = dados_prof[0][0]
+    alunos_turma = database.get_alunos_by_turma(turma)
+    data_chamada = df_completo['data'].max().date()
+    registros = [
+        {'id_aluno': id_aluno, 'data': data_chamada, 'status': 'Presença',
+         'justificativa': '', 'professor': 'professor1'}
+        for id_aluno in alunos_turma['id_aluno']
+    ]
+    bench.medir(escala, linhas, 'professor', 'professor.salvar_frequencia_dia',
+                lambda: professor['salvar_frequencia_dia'](turma, data_chamada, registros))
+
+    # Exportações
+    for formato in ('CSV', 'Excel', 'JSON', 'Parquet', 'Arrow'):
+        pular = "acima do limite de linhas do Excel" if formato == 'Excel' and len(df_completo) > LIMITE_EXCEL else ""
+        bench.medir(escala, linhas, 'exportacao', f"export.serialize_dataframe[{formato}]",
+                    lambda formato=formato: serialize_dataframe(df_completo, formato), pular=pular)
+    bench.medir(escala, linhas, 'exportacao', 'export.consolidated_workbook',
+                lambda: consolidated_workbook(df_completo, dados_admin[2]))
+
+
+def _ambiente() -> Dict[str, any]:
+    import numpy
+    import pandas
+    import pyarrow
+    import streamlit
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'pandas': pandas.__version__,
+        'numpy': numpy.__version__,
+        'pyarrow': pyarrow.__version__,
+        'streamlit': streamlit.__version__,
+    }
+
+
+def _rss_pico_mb() -> float:
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é em KB no Linux e em bytes no macOS
+    return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--escalas', nargs='+', choices=list(ESCALAS), default=ESCALAS_PADRAO)
+    parser.add_argument('--casos', nargs='+', choices=GRUPOS, default=GRUPOS, help="Grupos de casos a executar")
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--saida', help="Arquivo JSON de resultados (padrão: benchmarks/resultados/<data>.json)")
+    parser.add_argument('--manter-dados', action='store_true', help="Não apagar os diretórios gerados")
+    parser.add_argument('--verbose', action='store_true', help="Exibir os logs da aplicação")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+    saida = args.saida or os.path.join(RESULTADOS_DIR, f"{datetime.now():%Y%m%d_%H%M%S}.json")
+    bench = Benchmark(saida, args.repeticoes, args.casos, {
+        'escalas': args.escalas, 'casos': args.casos, 'repeticoes': args.repeticoes, 'seed': args.seed
+    })
+
+    diretorio_original = os.getcwd()
+    for escala in args.escalas:
+        destino = tempfile.mkdtemp(prefix=f"bench_{escala}_")
+        try:
+            inicio = time.perf_counter()
+            resumo = gerar_escola(destino, ESCALAS[escala], seed=args.seed)
+            print(f"{escala:>5}  escola gerada em {time.perf_counter() - inicio:.1f}s: {resumo}")
+            os.makedirs(os.path.join(destino, '.streamlit'), exist_ok=True)
+            with open(os.path.join(destino, '.streamlit', 'secrets.toml'), 'w') as f:
+                f.write("use_google_sheets = false\n")
+            os.chdir(destino)
+            executar_escala(bench, escala, resumo['linhas'], args.seed)
+        finally:
+            os.chdir(diretorio_original)
+            if not args.manter_dados:
+                shutil.rmtree(destino, ignore_errors=True)
+    print(f"Resultados gravados em {saida}")
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -1,46 +1,359 @@
-import pandas as pd
+"""Gerador de dados sintéticos de frequência (demonstração e benchmarks).
+
+Exemplos (a partir da raiz do projeto):
+
+    python generate_data.py                                    # frequência de 2025 para o cadastro atual
+    python generate_data.py --cadastro sintetico --escolas 3 --turmas-por-escola 20 --anos 2024 2025
+    python generate_data.py --cadastro sintetico --escolas 10 --turmas-por-escola 100 --formato parquet --destino /tmp/escola
+
+A frequência é simulada dia a dia para todos os alunos de uma vez (numpy), com
+faltas mais prováveis às segundas e sextas, alunos faltosos crônicos e
+sequências de faltas (uma falta aumenta a chance de faltar no dia seguinte).
+Os registros são gravados em blocos, sem montar a tabela inteira em memória.
+"""
+import argparse
+import os
+import time
 from datetime import date, timedelta
+from math import ceil
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+# Ano letivo: início, fim e recesso de julho (mês, dia)
+INICIO_ANO_LETIVO = (2, 1)
+FIM_ANO_LETIVO = (12, 15)
+RECESSO_JULHO = ((7, 15), (7, 31))
+
+# Feriados nacionais de data fixa (mês, dia)
+FERIADOS_FIXOS = [(1, 1), (4, 21), (5, 1), (9, 7), (10, 12), (11, 2), (11, 15), (11, 20), (12, 25)]
+
+# Multiplicador da chance de faltar por dia da semana (segunda a sexta)
+FATOR_DIA_SEMANA = np.array([1.3, 1.0, 0.9, 1.0, 1.4])
+
+JUSTIFICATIVAS = ['Atestado médico', 'Problema familiar', 'Transporte', 'Consulta médica', 'Viagem']
+SEM_JUSTIFICATIVA = 'nda'
+
+PRIMEIROS_NOMES = [
+    'Ana', 'Beatriz', 'Bruno', 'Camila', 'Carlos', 'Daniel', 'Eduarda', 'Felipe', 'Gabriel', 'Giovana',
+    'Gustavo', 'Heitor', 'Helena', 'Isabela', 'João', 'Júlia', 'Kauã', 'Larissa', 'Laura', 'Lucas',
+    'Luiza', 'Manuela', 'Marcos', 'Maria', 'Mateus', 'Miguel', 'Nicolas', 'Pedro', 'Rafael', 'Sofia',
+    'Thiago', 'Valentina', 'Vitória', 'Yasmin',
+]
+SOBRENOMES = [
+    'Almeida', 'Alves', 'Araújo', 'Barbosa', 'Cardoso', 'Carvalho', 'Costa', 'Dias', 'Ferreira', 'Gomes',
+    'Lima', 'Martins', 'Melo', 'Oliveira', 'Pereira', 'Ribeiro', 'Rocha', 'Rodrigues', 'Santos', 'Silva',
+    'Soares', 'Souza', 'Teixeira', 'Vieira',
+]
+
+FORMATOS = ['csv', 'parquet', 'banco']
+# Registros por bloco gravado
+LINHAS_POR_BLOCO = 1_000_000
+
 
-def generate_frequencia_data():
-    """Generates a CSV file of frequency with simulated data."""
+def _pascoa(ano: int) -> date:
+    """Domingo de Páscoa (algoritmo de Meeus/Jones/Butcher)."""
+    a, b, c = ano % 19, ano // 100, ano % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes = (h + l - 7 * m + 114) // 31
+    dia = (h + l - 7 * m + 114) % 31 + 1
+    return date(ano, mes, dia)
+
+
+def feriados_nacionais(ano: int) -> List[date]:
+    """Feriados nacionais e pontos facultativos móveis (Carnaval, Sexta-feira Santa, Corpus Christi)."""
+    pascoa = _pascoa(ano)
+    moveis = [pascoa - timedelta(days=48), pascoa - timedelta(days=47),
+              pascoa - timedelta(days=2), pascoa + timedelta(days=60)]
+    return [date(ano, mes, dia) for mes, dia in FERIADOS_FIXOS] + moveis
+
+
+def calendario_letivo(anos: List[int], feriados: str = 'nacional', feriados_extra: Optional[List[date]] = None,
+                      inicio: Optional[date] = None, fim: Optional[date] = None) -> pd.DatetimeIndex:
+    """Dias letivos (segunda a sexta) dos anos informados, sem recesso e feriados.
+
+    feriados: 'nacional' (feriados nacionais) ou 'nenhum'; feriados_extra soma datas
+    do calendário local. inicio/fim restringem o período.
+    """
+    dias = []
+    for ano in anos:
+        periodo = pd.bdate_range(date(ano, *INICIO_ANO_LETIVO), date(ano, *FIM_ANO_LETIVO))
+        (mes_ini, dia_ini), (mes_fim, dia_fim) = RECESSO_JULHO
+        recesso = (periodo >= pd.Timestamp(ano, mes_ini, dia_ini)) & (periodo <= pd.Timestamp(ano, mes_fim, dia_fim))
+        dias.append(periodo[~recesso])
+    dias = dias[0].append(dias[1:]) if len(dias) > 1 else dias[0]
+
+    excluir = list(feriados_extra or [])
+    if feriados == 'nacional':
+        for ano in anos:
+            excluir += feriados_nacionais(ano)
+    dias = dias[~dias.isin(pd.DatetimeIndex(excluir))]
+    if inicio:
+        dias = dias[dias >= pd.Timestamp(inicio)]
+    if fim:
+        dias = dias[dias <= pd.Timestamp(fim)]
+    return dias
+
+
+def gerar_cadastro(escolas: int = 1, turmas_por_escola: int = 10, alunos_por_turma: int = 30,
+                   professores: int = 10, seed: int = 42) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Gera turmas, alunos e a atribuição professor → turma."""
+    rng = np.random.default_rng(seed)
+    nomes_turmas = []
+    for escola in range(1, escolas + 1):
+        for t in range(turmas_por_escola):
+            serie, grupo = t % 9 + 1, t // 9
+            letra = chr(ord('A') + grupo) if grupo < 26 else str(grupo + 1)
+            nome = f"{serie}º {letra}"
+            nomes_turmas.append(f"Escola {escola} - {nome}" if escolas > 1 else nome)
+    nomes_turmas = np.array(nomes_turmas, dtype=object)
+    turmas = pd.DataFrame({'id_turma': np.arange(1, len(nomes_turmas) + 1), 'nome_turma': nomes_turmas})
+
+    n_alunos = len(nomes_turmas) * alunos_por_turma
+    nomes = (
+        np.array(PRIMEIROS_NOMES, dtype=object)[rng.integers(0, len(PRIMEIROS_NOMES), n_alunos)] + ' '
+        + np.array(SOBRENOMES, dtype=object)[rng.integers(0, len(SOBRENOMES), n_alunos)] + ' '
+        + np.array(SOBRENOMES, dtype=object)[rng.integers(0, len(SOBRENOMES), n_alunos)]
+    )
+    alunos = pd.DataFrame({
+        'id_aluno': np.arange(1, n_alunos + 1),
+        'nome': nomes,
+        'turma': np.repeat(nomes_turmas, alunos_por_turma),
+    })
+
+    professor_turmas = pd.DataFrame({
+        'username': [f"professor{t % max(1, professores) + 1}" for t in range(len(nomes_turmas))],
+        'turma': nomes_turmas,
+    })
+    return turmas, alunos, professor_turmas
+
+
+def carregar_cadastro(pasta: str = 'data') -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Lê turmas, alunos e a atribuição de professores já cadastrados."""
     try:
-        # Read the CSV with the correct encoding.
-        # Add 'skipinitialspace=True' to ignore any leading whitespace in the header.
-        df_alunos = pd.read_csv('data/alunos.csv', encoding='utf-8', skipinitialspace=True)
+        alunos = pd.read_csv(os.path.join(pasta, 'alunos.csv'), encoding='utf-8', skipinitialspace=True)
     except UnicodeDecodeError:
-        # Fallback to Latin1 if UTF-8 fails
-        df_alunos = pd.read_csv('data/alunos.csv', encoding='latin1', skipinitialspace=True)
-    
-    print("Columns read by pandas:")
-    print(df_alunos.columns)
-    
-    # Check if the 'id_aluno' column exists
-    if 'id_aluno' not in df_alunos.columns:
-        print("Error: The 'id_aluno' column was not found. Please check your CSV file header.")
+        # Fallback para Latin1 se UTF-8 falhar
+        alunos = pd.read_csv(os.path.join(pasta, 'alunos.csv'), encoding='latin1', skipinitialspace=True)
+    if 'id_aluno' not in alunos.columns or 'turma' not in alunos.columns:
+        raise ValueError("alunos.csv precisa das colunas 'id_aluno' e 'turma'")
+
+    caminho_turmas = os.path.join(pasta, 'turmas.csv')
+    if os.path.exists(caminho_turmas):
+        turmas = pd.read_csv(caminho_turmas)
+    else:
+        nomes = alunos['turma'].dropna().unique()
+        turmas = pd.DataFrame({'id_turma': np.arange(1, len(nomes) + 1), 'nome_turma': nomes})
+
+    caminho_atribuicao = os.path.join(pasta, 'professor_turmas.csv')
+    atribuicao = pd.read_csv(caminho_atribuicao) if os.path.exists(caminho_atribuicao) else pd.DataFrame()
+    if atribuicao.empty:
+        atribuicao = pd.DataFrame({'username': 'professor1', 'turma': turmas['nome_turma']})
+    return turmas, alunos, atribuicao
+
+
+def gerar_frequencia(alunos: pd.DataFrame, professor_turmas: pd.DataFrame, dias: pd.DatetimeIndex,
+                     taxa_falta: float = 0.06, fracao_cronicos: float = 0.08, persistencia: float = 0.45,
+                     taxa_justificativa: float = 0.4, linhas_por_bloco: int = LINHAS_POR_BLOCO,
+                     max_linhas: Optional[int] = None, seed: int = 42) -> Iterator[pa.Table]:
+    """Simula a frequência de todos os alunos nos dias letivos, em blocos de ~linhas_por_bloco.
+
+    Cada aluno tem uma propensão própria a faltar (média taxa_falta; os crônicos,
+    fracao_cronicos dos alunos, faltam cerca de um terço dos dias). A chance do dia
+    é multiplicada por FATOR_DIA_SEMANA e, após uma falta, passa a ser `persistencia`
+    (sequências de faltas). As colunas seguem data/frequencia.csv.
+    """
+    rng = np.random.default_rng(seed)
+    ids = alunos['id_aluno'].to_numpy()
+    n = len(ids)
+    if n == 0 or len(dias) == 0:
         return
 
-    frequencia_data = []
+    # Professor responsável por aluno (pela turma)
+    professor_por_turma = professor_turmas.drop_duplicates('turma').set_index('turma')['username']
+    professores = alunos['turma'].map(professor_por_turma).fillna('professor1').astype(str)
+    nomes_professores, professor_aluno = np.unique(professores.to_numpy(), return_inverse=True)
+    professor_aluno = pa.array(professor_aluno.astype('int32'))
+    nomes_professores = pa.array(nomes_professores)
+
+    # Propensão individual: maioria com poucas faltas, alguns faltosos crônicos
+    cronico = rng.random(n) < fracao_cronicos
+    propensao = np.where(
+        cronico,
+        rng.beta(4, 8, n),
+        rng.beta(2, 2 / max(taxa_falta, 1e-6) - 2, n)
+    )
+    # Chance de faltar após um dia presente, para que a taxa média fique na propensão
+    inicio_sequencia = np.clip(propensao * (1 - persistencia) / np.maximum(1 - propensao, 1e-6), 0, 1)
+
+    rotulos_status = pa.array(['Presença', 'Falta'])
+    rotulos_justificativa = pa.array([SEM_JUSTIFICATIVA] + JUSTIFICATIVAS)
+    ids_array = pa.array(ids)
+    dias_por_bloco = max(1, linhas_por_bloco // n)
+    restante = max_linhas if max_linhas is not None else len(dias) * n
+    fator_dia = FATOR_DIA_SEMANA / FATOR_DIA_SEMANA.mean()
+    anterior = rng.random(n) < propensao
+
+    for inicio in range(0, len(dias), dias_por_bloco):
+        bloco = dias[inicio:inicio + dias_por_bloco]
+        faltas = np.empty((len(bloco), n), dtype=bool)
+        for i, dia in enumerate(bloco):
+            chance = np.where(anterior, persistencia, inicio_sequencia * fator_dia[dia.weekday()])
+            anterior = rng.random(n) < chance
+            faltas[i] = anterior
+
+        faltas = faltas.ravel()[:restante]
+        linhas = len(faltas)
+        justificada = faltas & (rng.random(linhas) < taxa_justificativa)
+        codigo_justificativa = np.where(justificada, rng.integers(1, len(JUSTIFICATIVAS) + 1, linhas), 0)
+        repeticoes = ceil(linhas / n)
+
+        yield pa.table({
+            'id_aluno': pa.concat_arrays([ids_array] * repeticoes)[:linhas],
+            'data': pa.array(bloco.strftime('%Y-%m-%d')).take(pa.array(np.repeat(np.arange(len(bloco)), n)[:linhas])),
+            'status': rotulos_status.take(pa.array(faltas.astype('int8'))),
+            'justificativa': rotulos_justificativa.take(pa.array(codigo_justificativa.astype('int8'))),
+            'professor': nomes_professores.take(pa.concat_arrays([professor_aluno] * repeticoes)[:linhas]),
+        })
+        restante -= linhas
+        if restante <= 0:
+            return
+
+
+class EscritorArquivo:
+    """Grava as tabelas em destino/<tabela>.csv ou .parquet, com a frequência em blocos."""
+
+    def __init__(self, destino: str, formato: str = 'csv'):
+        self.destino = destino
+        self.formato = formato
+        os.makedirs(destino, exist_ok=True)
+
+    def gravar_tabela(self, nome: str, df: pd.DataFrame):
+        caminho = os.path.join(self.destino, f"{nome}.{self.formato}")
+        if self.formato == 'parquet':
+            df.to_parquet(caminho, index=False)
+        else:
+            df.to_csv(caminho, index=False, encoding='utf-8')
+
+    def gravar_blocos(self, nome: str, blocos: Iterator[pa.Table]) -> int:
+        caminho = os.path.join(self.destino, f"{nome}.{self.formato}")
+        caminho_tmp = f"{caminho}.tmp"
+        total, escritor = 0, None
+        try:
+            for bloco in blocos:
+                if escritor is None:
+                    if self.formato == 'parquet':
+                        escritor = pq.ParquetWriter(caminho_tmp, bloco.schema, compression='zstd')
+                    else:
+                        escritor = pa_csv.CSVWriter(caminho_tmp, bloco.schema)
+                escritor.write_table(bloco)
+                total += bloco.num_rows
+        finally:
+            if escritor is not None:
+                escritor.close()
+        if escritor is not None:
+            os.replace(caminho_tmp, caminho)
+        return total
+
+
+class EscritorBanco:
+    """Grava pelo DatabaseManager (CSV local ou Google Sheets, conforme configuração).
+
+    O DatabaseManager grava tabelas inteiras, então os blocos são reunidos antes de salvar:
+    indicado apenas para volumes de demonstração.
+    """
+
+    def __init__(self):
+        from utils.database import db_manager
+        self.db_manager = db_manager
+
+    def gravar_tabela(self, nome: str, df: pd.DataFrame):
+        self.db_manager.save_data(df, nome, notify=False)
+
+    def gravar_blocos(self, nome: str, blocos: Iterator[pa.Table]) -> int:
+        tabelas = list(blocos)
+        df = pa.concat_tables(tabelas).to_pandas() if tabelas else pd.DataFrame()
+        self.db_manager.save_data(df, nome, notify=False)
+        return len(df)
+
+
+def gerar_dados(escritor, cadastro: str = 'existente', escolas: int = 1, turmas_por_escola: int = 10,
+                alunos_por_turma: int = 30, professores: int = 10, anos: Optional[List[int]] = None,
+                feriados: str = 'nacional', feriados_extra: Optional[List[date]] = None,
+                inicio: Optional[date] = None, fim: Optional[date] = None, max_linhas: Optional[int] = None,
+                seed: int = 42, **padroes) -> Dict[str, int]:
+    """Gera (ou lê) o cadastro e grava a frequência simulada pelo escritor.
+
+    cadastro='sintetico' também grava turmas, alunos e professor_turmas; 'existente' usa
+    o cadastro de data/. padroes são repassados a gerar_frequencia (taxa_falta, ...).
+    Retorna um resumo com as quantidades geradas.
+    """
+    if cadastro == 'sintetico':
+        turmas, alunos, professor_turmas = gerar_cadastro(escolas, turmas_por_escola, alunos_por_turma,
+                                                          professores, seed)
+        escritor.gravar_tabela('turmas', turmas)
+        escritor.gravar_tabela('alunos', alunos)
+        escritor.gravar_tabela('professor_turmas', professor_turmas)
+    else:
+        turmas, alunos, professor_turmas = carregar_cadastro()
+
+    dias = calendario_letivo(anos or [date.today().year], feriados, feriados_extra, inicio, fim)
+    blocos = gerar_frequencia(alunos, professor_turmas, dias, max_linhas=max_linhas, seed=seed, **padroes)
+    linhas = escritor.gravar_blocos('frequencia', blocos)
+    return {'linhas': linhas, 'alunos': len(alunos), 'turmas': len(turmas), 'dias_letivos': len(dias),
+            'professores': professor_turmas['username'].nunique()}
+
+
+def _ler_feriados(caminho: str) -> List[date]:
+    """Datas de um CSV com a coluna 'data' (calendário municipal/estadual)."""
+    return pd.to_datetime(pd.read_csv(caminho)['data']).dt.date.tolist()
 
-    start_date = date(2025, 7, 1)
-    end_date = date(2025, 12, 31)
 
-    delta = timedelta(days=1)
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cadastro', choices=['existente', 'sintetico'], default='existente',
+                        help="Usar o cadastro de data/ ou gerar turmas e alunos")
+    parser.add_argument('--escolas', type=int, default=1)
+    parser.add_argument('--turmas-por-escola', type=int, default=10)
+    parser.add_argument('--alunos-por-turma', type=int, default=30)
+    parser.add_argument('--professores', type=int, default=10)
+    parser.add_argument('--anos', type=int, nargs='+', default=[2025])
+    parser.add_argument('--inicio', type=date.fromisoformat, help="Primeiro dia (AAAA-MM-DD)")
+    parser.add_argument('--fim', type=date.fromisoformat, help="Último dia (AAAA-MM-DD)")
+    parser.add_argument('--feriados', choices=['nacional', 'nenhum'], default='nacional')
+    parser.add_argument('--feriados-extra', help="CSV com a coluna 'data' (feriados locais)")
+    parser.add_argument('--taxa-falta', type=float, default=0.06, help="Taxa média de faltas dos alunos regulares")
+    parser.add_argument('--fracao-cronicos', type=float, default=0.08)
+    parser.add_argument('--persistencia', type=float, default=0.45,
+                        help="Chance de faltar no dia seguinte a uma falta")
+    parser.add_argument('--max-linhas', type=int)
+    parser.add_argument('--formato', choices=FORMATOS, default='csv',
+                        help="csv/parquet em --destino, ou 'banco' (DatabaseManager: CSV ou Google Sheets)")
+    parser.add_argument('--destino', default='data')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
 
-    while start_date <= end_date:
-        if start_date.weekday() < 5:
-            for _, aluno in df_alunos.iterrows():
-                frequencia_data.append({
-                    'id_aluno': aluno['id_aluno'],
-                    'data': start_date.strftime('%Y-%m-%d'),
-                    'status': 'Presença',
-                    'justificativa': 'nda',
-                    'professor': 'professor1'
-                })
-        start_date += delta
+    escritor = EscritorBanco() if args.formato == 'banco' else EscritorArquivo(args.destino, args.formato)
+    inicio = time.perf_counter()
+    resumo = gerar_dados(
+        escritor, cadastro=args.cadastro, escolas=args.escolas, turmas_por_escola=args.turmas_por_escola,
+        alunos_por_turma=args.alunos_por_turma, professores=args.professores, anos=args.anos,
+        feriados=args.feriados, feriados_extra=_ler_feriados(args.feriados_extra) if args.feriados_extra else None,
+        inicio=args.inicio, fim=args.fim, max_linhas=args.max_linhas, seed=args.seed,
+        taxa_falta=args.taxa_falta, fracao_cronicos=args.fracao_cronicos, persistencia=args.persistencia,
+    )
+    print(f"Frequência gerada em {time.perf_counter() - inicio:.1f}s: {resumo}")
 
-    df_frequencia = pd.DataFrame(frequencia_data)
-    df_frequencia.to_csv('data/frequencia.csv', index=False, encoding='utf-8')
-    print("frequencia.csv file generated with data from July to December 2025.")
 
 if __name__ == '__main__':
-    generate_frequencia_data()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -1,8 +1,11 @@
 import streamlit as st
 import pandas as pd
-from datetime import date, timedelta
+from datetime import date
 import calendar
-from utils.database import get_data, save_data, get_alunos_by_turma, FREQUENCIA_FILE, TURMAS_FILE, ALUNOS_FILE
+from utils.database import db_manager, get_alunos_by_turma, add_aluno_info, get_data_version, get_accessible_turmas, get_frequencia_turmas, FREQUENCIA_FILE, TURMAS_FILE, ALUNOS_FILE, PROFESSOR_TURMAS_FILE
+from utils.prefetch import month_cache
+from utils.sessions import check_access
+from utils.metrics import measure, timed
 
 # Configuração da página
 st.set_page_config(
@@ -12,9 +15,7 @@ st.set_page_config(
 )
 
 # Verificação de permissão
-if st.session_state.get("role") != "professor":
-    st.error("🚫 Você não tem permissão para acessar esta página.")
-    st.stop()
+usuario = check_access(role="professor", permission="frequencia")
 
 # CSS customizado para melhor visualização
 st.markdown("""
@@ -86,30 +87,126 @@ st.markdown("""
 st.title("👨‍🏫 Dashboard do Professor")
 
 # Carregamento de dados
-@st.cache_data
-def load_data():
-    df_turmas = get_data(TURMAS_FILE)
-    df_alunos_completo = get_data(ALUNOS_FILE)
-    df_frequencia = get_data(FREQUENCIA_FILE)
+@st.cache_data(max_entries=32)
+def load_data(versao, username, role):
+    """Carrega apenas as turmas do professor e a frequência dessas turmas."""
+    turmas = get_accessible_turmas(username, role)
+    return turmas, get_frequencia_turmas(turmas)
+
+versao_dados = get_data_version(FREQUENCIA_FILE, ALUNOS_FILE, TURMAS_FILE, PROFESSOR_TURMAS_FILE)
+with measure("professor.carregar"):
+    turmas, df_frequencia_com_turma = load_data(
+        versao_dados, usuario['username'], usuario['role']
+    )
+
+@st.cache_data(show_spinner=False)
+def calcular_resumo_turma(_freq_turma, turma, versao):
+    """Resumo por aluno e por mês da turma em uma única agregação (cache por turma/versão)."""
+    base = _freq_turma.assign(
+        presenca=_freq_turma['status'] == 'Presença',
+        falta=_freq_turma['status'] == 'Falta',
+        data_falta=_freq_turma['data'].where(_freq_turma['status'] == 'Falta'),
+        mes=_freq_turma['data'].dt.to_period('M')
+    ).groupby(['id_aluno', 'mes']).agg(
+        total=('status', 'size'),
+        presencas=('presenca', 'sum'),
+        faltas=('falta', 'sum'),
+        ultima_falta=('data_falta', 'max')
+    )
+    
+    # Por aluno
+    resumo_alunos = base.groupby(level='id_aluno').agg(
+        total=('total', 'sum'),
+        presencas=('presencas', 'sum'),
+        faltas=('faltas', 'sum'),
+        ultima_falta=('ultima_falta', 'max')
+    )
+    resumo_alunos['taxa'] = (resumo_alunos['presencas'] / resumo_alunos['total'] * 100).round(1)
+    resumo_alunos.columns = ['Total Dias', 'Presenças', 'Faltas', 'Última Falta', 'Taxa Presença (%)']
+    resumo_alunos = resumo_alunos[['Total Dias', 'Presenças', 'Faltas', 'Taxa Presença (%)', 'Última Falta']]
+    
+    # Por mês
+    freq_mensal = base.groupby(level='mes')[['presencas', 'total']].sum().reset_index()
+    freq_mensal.columns = ['Mês', 'Presenças', 'Total']
+    freq_mensal['Faltas'] = freq_mensal['Total'] - freq_mensal['Presenças']
+    freq_mensal['Taxa Presença'] = (freq_mensal['Presenças'] / freq_mensal['Total'] * 100).round(1)
     
-    if not df_frequencia.empty:
-        df_frequencia_com_turma = pd.merge(
-            df_frequencia, 
-            df_alunos_completo[['id_aluno', 'turma']], 
-            on='id_aluno', 
-            how='left'
+    return resumo_alunos, freq_mensal
+
+def agregar_mes(df_frequencia, turma, mes):
+    """Presenças/faltas por dia e status de cada aluno por dia para um mês da turma."""
+    if df_frequencia.empty:
+        return {'por_dia': pd.DataFrame(columns=['Presença', 'Falta']), 'status_alunos': {}}
+    
+    inicio = pd.Timestamp(f"{mes}-01")
+    fim = inicio + pd.offsets.MonthBegin(1)
+    do_mes = df_frequencia[
+        (df_frequencia['turma'] == turma) &
+        (df_frequencia['data'] >= inicio) &
+        (df_frequencia['data'] < fim)
+    ]
+    dias = do_mes['data'].dt.date
+    
+    por_dia = pd.crosstab(dias, do_mes['status']).reindex(columns=['Presença', 'Falta'], fill_value=0)
+    status_alunos = {
+        dia: grupo.set_index('id_aluno').reindex(columns=['status', 'justificativa'])
+        for dia, grupo in do_mes.groupby(dias)
+    }
+    return {'por_dia': por_dia, 'status_alunos': status_alunos}
+
+def obter_mes(turma, mes):
+    """Agregados do mês, servidos da memória quando já calculados (ou pré-carregados)."""
+    return month_cache.get_or_compute(
+        (turma, mes, versao_dados),
+        lambda: agregar_mes(df_frequencia_com_turma, turma, mes)
+    )
+
+def prefetch_meses_adjacentes(turma, mes):
+    """Agenda em segundo plano o cálculo dos meses anterior e seguinte."""
+    periodo = pd.Period(mes, freq='M')
+    for vizinho in (str(periodo - 1), str(periodo + 1)):
+        month_cache.prefetch(
+            (turma, vizinho, versao_dados),
+            lambda m=vizinho: agregar_mes(df_frequencia_com_turma, turma, m)
         )
-        df_frequencia_com_turma['data'] = pd.to_datetime(df_frequencia_com_turma['data'])
+
+@timed("professor.salvar")
+def salvar_frequencia_dia(turma, data_chamada, registros):
+    """Substitui a chamada da turma no dia pelos registros informados.
+
+    Leitura e gravação passam por db_manager.update_table, sob a trava da
+    tabela: chamadas salvas ao mesmo tempo por outros professores não se perdem.
+    """
+    db_manager.update_table(
+        'frequencia',
+        lambda df_frequencia: _substituir_chamada(df_frequencia, turma, data_chamada, registros),
+        notify=True
+    )
+
+def _substituir_chamada(df_frequencia_atualizado, turma, data_chamada, registros):
+    if not df_frequencia_atualizado.empty:
+        df_frequencia_atualizado = add_aluno_info(df_frequencia_atualizado, ['turma'])
+        df_frequencia_atualizado['data'] = pd.to_datetime(df_frequencia_atualizado['data']).dt.date
+        
+        # Remover registros existentes para esta data/turma
+        index_to_drop = df_frequencia_atualizado[
+            (df_frequencia_atualizado['turma'] == turma) & 
+            (df_frequencia_atualizado['data'] == data_chamada)
+        ].index
+        df_frequencia_atualizado = df_frequencia_atualizado.drop(index_to_drop)
+        df_frequencia_atualizado = df_frequencia_atualizado.drop(columns=['turma'])
     else:
-        df_frequencia_com_turma = pd.DataFrame()
+        df_frequencia_atualizado = pd.DataFrame()
     
-    return df_turmas, df_alunos_completo, df_frequencia_com_turma
-
-df_turmas, df_alunos_completo, df_frequencia_com_turma = load_data()
-turmas = df_turmas['nome_turma'].tolist()
+    # Adicionar novos registros
+    novo_registro_df = pd.DataFrame(registros)
+    return pd.concat([df_frequencia_atualizado, novo_registro_df], ignore_index=True)
 
 if not turmas:
-    st.warning("⚠️ Nenhuma turma cadastrada. Contate o administrador.")
+    st.warning(
+        "⚠️ Nenhuma turma atribuída a você. Peça ao administrador para atribuir suas turmas "
+        "em 'Monitoramento Professores → Turmas por Professor'."
+    )
     st.stop()
 
 # Seleção de turma
@@ -132,7 +229,7 @@ with col2:
 # Tabs para organizar o conteúdo
 tab1, tab2, tab3 = st.tabs(["📅 Calendário de Frequência", "📊 Registrar Frequência", "📈 Relatórios"])
 
-with tab1:
+with tab1, measure("professor.calendario"):
     st.subheader("📅 Calendário de Frequência")
     
     # Seletor de mês
@@ -149,21 +246,15 @@ with tab1:
     
     # Cálculo do calendário
     primeiro_dia_mes = pd.to_datetime(f"{mes_selecionado}-01").date()
-    proximo_mes = (primeiro_dia_mes + timedelta(days=32)).replace(day=1)
-    ultimo_dia_mes = proximo_mes - timedelta(days=1)
     
-    # Filtrar frequência do mês
-    frequencia_do_mes = df_frequencia_com_turma[
-        (df_frequencia_com_turma['data'].dt.date >= primeiro_dia_mes) &
-        (df_frequencia_com_turma['data'].dt.date <= ultimo_dia_mes) &
-        (df_frequencia_com_turma['turma'] == turma_selecionada)
-    ] if not df_frequencia_com_turma.empty else pd.DataFrame()
+    # Agregados do mês por dia
+    frequencia_por_dia = obter_mes(turma_selecionada, mes_selecionado)['por_dia']
     
     # Estatísticas do mês
-    if not frequencia_do_mes.empty:
-        dias_com_registro = len(frequencia_do_mes['data'].dt.date.unique())
-        total_presencas = len(frequencia_do_mes[frequencia_do_mes['status'] == 'Presença'])
-        total_faltas = len(frequencia_do_mes[frequencia_do_mes['status'] == 'Falta'])
+    if not frequencia_por_dia.empty:
+        dias_com_registro = len(frequencia_por_dia)
+        total_presencas = int(frequencia_por_dia['Presença'].sum())
+        total_faltas = int(frequencia_por_dia['Falta'].sum())
         
         col1, col2, col3, col4 = st.columns(4)
         with col1:
@@ -196,13 +287,9 @@ with tab1:
                 data_dia = date(primeiro_dia_mes.year, primeiro_dia_mes.month, dia)
                 
                 # Verificar se há registro para este dia
-                registros_dia = frequencia_do_mes[
-                    frequencia_do_mes['data'].dt.date == data_dia
-                ] if not frequencia_do_mes.empty else pd.DataFrame()
-                
-                if not registros_dia.empty:
-                    presencas = len(registros_dia[registros_dia['status'] == 'Presença'])
-                    faltas = len(registros_dia[registros_dia['status'] == 'Falta'])
+                if data_dia in frequencia_por_dia.index:
+                    presencas = int(frequencia_por_dia.at[data_dia, 'Presença'])
+                    faltas = int(frequencia_por_dia.at[data_dia, 'Falta'])
                     
                     if presencas > faltas:
                         status_class = "day-present"
@@ -229,7 +316,7 @@ with tab1:
                     else:
                         cols_semana[i].write(f"{dia}")
 
-with tab2:
+with tab2, measure("professor.registrar"):
     st.subheader("📊 Registrar/Editar Frequência")
     
     # Seleção de data
@@ -244,17 +331,17 @@ with tab2:
             key="data_frequencia"
         )
     
+    mes_data_selecionada = data_selecionada.strftime('%Y-%m')
+    agregados_data = obter_mes(turma_selecionada, mes_data_selecionada)
+    
     with col2:
         # Mostrar informações da data selecionada
         if not df_frequencia_com_turma.empty:
-            registros_data = df_frequencia_com_turma[
-                (df_frequencia_com_turma['turma'] == turma_selecionada) & 
-                (df_frequencia_com_turma['data'].dt.date == data_selecionada)
-            ]
+            por_dia = agregados_data['por_dia']
             
-            if not registros_data.empty:
-                presencas = len(registros_data[registros_data['status'] == 'Presença'])
-                faltas = len(registros_data[registros_data['status'] == 'Falta'])
+            if data_selecionada in por_dia.index:
+                presencas = int(por_dia.at[data_selecionada, 'Presença'])
+                faltas = int(por_dia.at[data_selecionada, 'Falta'])
                 st.info(f"✅ {presencas} presenças | ❌ {faltas} faltas")
             else:
                 st.warning("📝 Sem registro para esta data")
@@ -262,29 +349,11 @@ with tab2:
     if df_alunos.empty:
         st.warning("⚠️ Nenhum aluno nesta turma.")
     else:
-        # Buscar registros existentes
-        df_frequencia_atual = get_data(FREQUENCIA_FILE)
-        if not df_frequencia_atual.empty:
-            df_frequencia_com_turma_atual = pd.merge(
-                df_frequencia_atual, 
-                df_alunos_completo[['id_aluno', 'turma']], 
-                on='id_aluno', 
-                how='left'
-            )
-            df_frequencia_com_turma_atual['data'] = pd.to_datetime(df_frequencia_com_turma_atual['data']).dt.date
-            
-            registros_existentes = df_frequencia_com_turma_atual[
-                (df_frequencia_com_turma_atual['turma'] == turma_selecionada) & 
-                (df_frequencia_com_turma_atual['data'] == data_selecionada)
-            ]
-        else:
-            registros_existentes = pd.DataFrame()
+        # Buscar registros existentes (agregados do mês, chaveados pela versão dos dados)
+        registros_salvos = agregados_data['status_alunos'].get(data_selecionada, pd.DataFrame())
         
-        if not registros_existentes.empty:
+        if not registros_salvos.empty:
             st.info("✏️ Já existe registro para esta data. Você pode editá-lo abaixo.")
-            registros_salvos = registros_existentes.set_index('id_aluno')
-        else:
-            registros_salvos = pd.DataFrame()
         
         # Formulário de frequência
         with st.form("form_frequencia", clear_on_submit=False):
@@ -372,34 +441,7 @@ with tab2:
             
             if submitted:
                 try:
-                    # Recarregar dados atuais
-                    df_frequencia_atualizado = get_data(FREQUENCIA_FILE)
-                    
-                    if not df_frequencia_atualizado.empty:
-                        df_frequencia_atualizado = pd.merge(
-                            df_frequencia_atualizado, 
-                            df_alunos_completo[['id_aluno', 'turma']], 
-                            on='id_aluno', 
-                            how='left'
-                        )
-                        df_frequencia_atualizado['data'] = pd.to_datetime(df_frequencia_atualizado['data']).dt.date
-                        
-                        # Remover registros existentes para esta data/turma
-                        index_to_drop = df_frequencia_atualizado[
-                            (df_frequencia_atualizado['turma'] == turma_selecionada) & 
-                            (df_frequencia_atualizado['data'] == data_selecionada)
-                        ].index
-                        df_frequencia_atualizado = df_frequencia_atualizado.drop(index_to_drop)
-                        df_frequencia_atualizado = df_frequencia_atualizado.drop(columns=['turma'])
-                    else:
-                        df_frequencia_atualizado = pd.DataFrame()
-                    
-                    # Adicionar novos registros
-                    novo_registro_df = pd.DataFrame(registros_a_salvar)
-                    df_frequencia_atualizado = pd.concat([df_frequencia_atualizado, novo_registro_df], ignore_index=True)
-                    
-                    # Salvar
-                    save_data(df_frequencia_atualizado, FREQUENCIA_FILE)
+                    salvar_frequencia_dia(turma_selecionada, data_selecionada, registros_a_salvar)
                     
                     # Limpar cache
                     st.cache_data.clear()
@@ -415,7 +457,7 @@ with tab2:
                 except Exception as e:
                     st.error(f"❌ Erro ao salvar: {str(e)}")
 
-with tab3:
+with tab3, measure("professor.relatorios"):
     st.subheader("📈 Relatórios de Frequência")
     
     if not df_frequencia_com_turma.empty:
@@ -423,51 +465,38 @@ with tab3:
         freq_turma = df_frequencia_com_turma[df_frequencia_com_turma['turma'] == turma_selecionada]
         
         if not freq_turma.empty:
+            resumo_alunos, freq_mensal = calcular_resumo_turma(
+                freq_turma, turma_selecionada, get_data_version(FREQUENCIA_FILE, ALUNOS_FILE)
+            )
+            
             # Relatório por aluno
             st.markdown("#### 👥 Frequência por Aluno")
             
-            relatorio_alunos = []
-            for _, aluno in df_alunos.iterrows():
-                freq_aluno = freq_turma[freq_turma['id_aluno'] == aluno['id_aluno']]
-                if not freq_aluno.empty:
-                    total_dias = len(freq_aluno)
-                    presencas = len(freq_aluno[freq_aluno['status'] == 'Presença'])
-                    faltas = len(freq_aluno[freq_aluno['status'] == 'Falta'])
-                    taxa_presenca = (presencas / total_dias * 100) if total_dias > 0 else 0
-                    
-                    relatorio_alunos.append({
-                        'Aluno': aluno['nome'],
-                        'Total Dias': total_dias,
-                        'Presenças': presencas,
-                        'Faltas': faltas,
-                        'Taxa Presença (%)': f"{taxa_presenca:.1f}%"
-                    })
-                else:
-                    relatorio_alunos.append({
-                        'Aluno': aluno['nome'],
-                        'Total Dias': 0,
-                        'Presenças': 0,
-                        'Faltas': 0,
-                        'Taxa Presença (%)': "0.0%"
-                    })
+            df_relatorio = pd.merge(
+                df_alunos[['id_aluno', 'nome']],
+                resumo_alunos,
+                left_on='id_aluno',
+                right_index=True,
+                how='left'
+            )
+            for coluna in ['Total Dias', 'Presenças', 'Faltas']:
+                df_relatorio[coluna] = df_relatorio[coluna].fillna(0).astype(int)
+            df_relatorio['Taxa Presença (%)'] = df_relatorio['Taxa Presença (%)'].fillna(0).map(lambda x: f"{x:.1f}%")
+            df_relatorio['Última Falta'] = df_relatorio['Última Falta'].dt.strftime('%d/%m/%Y').fillna('-')
+            df_relatorio = df_relatorio.drop(columns=['id_aluno']).rename(columns={'nome': 'Aluno'})
             
-            df_relatorio = pd.DataFrame(relatorio_alunos)
             st.dataframe(df_relatorio, use_container_width=True)
             
             # Gráfico de frequência mensal
             st.markdown("#### 📊 Frequência Mensal")
-            freq_mensal = freq_turma.groupby(freq_turma['data'].dt.to_period('M')).agg({
-                'status': lambda x: (x == 'Presença').sum(),
-                'id_aluno': 'count'
-            }).reset_index()
-            
-            freq_mensal.columns = ['Mês', 'Presenças', 'Total']
-            freq_mensal['Faltas'] = freq_mensal['Total'] - freq_mensal['Presenças']
-            freq_mensal['Taxa Presença'] = (freq_mensal['Presenças'] / freq_mensal['Total'] * 100).round(1)
-            
             st.dataframe(freq_mensal, use_container_width=True)
             
         else:
             st.info("📝 Nenhum dado de frequência encontrado para esta turma.")
     else:
-        st.info("📝 Nenhum dado de frequência encontrado no sistema.")
\ No newline at end of file
+        st.info("📝 Nenhum dado de frequência encontrado no sistema.")
+
+# Pré-carregamento em segundo plano dos meses vizinhos (calendário e data selecionada)
+prefetch_meses_adjacentes(turma_selecionada, mes_selecionado)
+if mes_data_selecionada != mes_selecionado:
+    prefetch_meses_adjacentes(turma_selecionada, mes_data_selecionada)
\ No newline at end of file
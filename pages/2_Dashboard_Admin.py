@@ -5,7 +5,15 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import os
-from utils.database import get_data, save_data, FREQUENCIA_FILE, TURMAS_FILE, ALUNOS_FILE
+from utils.database import get_data, save_data, get_alunos, get_alunos_by_turma, add_aluno_info, get_data_version, get_users_by_role, get_manifest, FREQUENCIA_FILE, TURMAS_FILE, ALUNOS_FILE, PROFESSOR_TURMAS_FILE
+from utils.export import EXPORT_FORMATS
+from utils.report_cache import report_cache
+from utils.tiered_cache import cache_stats, export_cache, filter_cache
+from utils.charts import cached_figure, figure_cache, timeline_chart
+from utils.sessions import check_access
+from utils.metrics import METRICS_DIR, METRICS_EXPORT_INTERVAL, measure, metrics
+from utils.jobs import get_report_queue, exibir_meus_relatorios
+from utils.backup import BACKUP_DIR, gerar_backup, last_backup_info, listar_backups, restaurar_backup
 
 # Configuração da página
 st.set_page_config(
@@ -15,9 +23,7 @@ st.set_page_config(
 )
 
 # Verificação de permissão
-if st.session_state.get("role") != "admin":
-    st.error("🚫 Você não tem permissão para acessar esta página.")
-    st.stop()
+check_access(role="admin")
 
 # CSS customizado para interface moderna
 st.markdown("""
@@ -106,34 +112,74 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Carregamento e cache de dados
-@st.cache_data
-def load_all_data():
+@st.cache_data(max_entries=2)
+def load_all_data(versao):
     """Carrega todos os dados com cache para melhor performance"""
     df_frequencia = get_data(FREQUENCIA_FILE)
     df_turmas = get_data(TURMAS_FILE)
-    df_alunos = get_data(ALUNOS_FILE)
+    df_alunos = get_alunos()
     
     # Processamento de dados
     if not df_frequencia.empty and not df_alunos.empty:
         df_frequencia['data'] = pd.to_datetime(df_frequencia['data'])
-        df_frequencia_completa = pd.merge(
-            df_frequencia, 
-            df_alunos[['id_aluno', 'nome', 'turma']], 
-            on='id_aluno', 
-            how='left'
-        )
+        df_frequencia_completa = add_aluno_info(df_frequencia, ['nome', 'turma'])
     else:
         df_frequencia_completa = pd.DataFrame()
     
     return df_frequencia, df_turmas, df_alunos, df_frequencia_completa
 
-df_frequencia, df_turmas, df_alunos, df_frequencia_completa = load_all_data()
+def calcular_relatorio(df, tipo_relatorio, periodo_relatorio):
+    """Calcula um relatório detalhado (aba de relatórios) para o período escolhido."""
+    dias_periodo = {"Último Mês": 30, "Últimos 3 Meses": 90}.get(periodo_relatorio)
+    if dias_periodo:
+        df = df[df['data'] >= df['data'].max() - pd.Timedelta(days=dias_periodo)]
+    if tipo_relatorio == "Dados Brutos de Frequência":
+        return df[['data', 'id_aluno', 'nome', 'turma', 'status', 'justificativa', 'professor']].sort_values('data').reset_index(drop=True)
+    
+    df = df.assign(presenca=df['status'] == 'Presença', falta=df['status'] == 'Falta')
+    
+    if tipo_relatorio == "Frequência Consolidada":
+        relatorio = df.groupby(['turma', 'nome']).agg(
+            Total_Dias=('status', 'count'), Presencas=('presenca', 'sum'), Faltas=('falta', 'sum')
+        ).reset_index()
+        relatorio.columns = ['Turma', 'Aluno', 'Total_Dias', 'Presencas', 'Faltas']
+        relatorio['Taxa_Presenca_%'] = (relatorio['Presencas'] / relatorio['Total_Dias'] * 100).round(2)
+        
+    elif tipo_relatorio == "Relatório por Turma":
+        relatorio = df.groupby('turma').agg(
+            Total_Alunos=('id_aluno', 'nunique'), Total_Registros=('status', 'count'),
+            Presencas=('presenca', 'sum'), Faltas=('falta', 'sum')
+        ).reset_index()
+        relatorio.columns = ['Turma', 'Total_Alunos', 'Total_Registros', 'Presencas', 'Faltas']
+        relatorio['Taxa_Presenca_%'] = (relatorio['Presencas'] / relatorio['Total_Registros'] * 100).round(2)
+        
+    elif tipo_relatorio == "Relatório por Professor":
+        relatorio = df.groupby('professor').agg(
+            Turmas_Atendidas=('turma', 'nunique'), Alunos_Registrados=('id_aluno', 'nunique'),
+            Total_Registros=('status', 'count'), Primeiro_Registro=('data', 'min'), Ultimo_Registro=('data', 'max')
+        ).reset_index()
+        relatorio.columns = ['Professor', 'Turmas_Atendidas', 'Alunos_Registrados', 'Total_Registros', 'Primeiro_Registro', 'Ultimo_Registro']
+        
+    else:  # Análise Temporal
+        relatorio = df.groupby(df['data'].dt.to_period('M')).agg(
+            Total_Registros=('status', 'count'), Presencas=('presenca', 'sum'), Faltas=('falta', 'sum'),
+            Turmas_Ativas=('turma', 'nunique'), Alunos_Registrados=('id_aluno', 'nunique')
+        ).reset_index()
+        relatorio.columns = ['Mes', 'Total_Registros', 'Presencas', 'Faltas', 'Turmas_Ativas', 'Alunos_Registrados']
+        relatorio['Mes'] = relatorio['Mes'].astype(str)
+    
+    return relatorio
+
+versao_dados = get_data_version(FREQUENCIA_FILE, TURMAS_FILE, ALUNOS_FILE)
+with measure("admin.carregar"):
+    df_frequencia, df_turmas, df_alunos, df_frequencia_completa = load_all_data(versao_dados)
 
-# Métricas principais
+# Métricas principais (contagens do manifesto das tabelas, sem recontar os dados)
+manifesto = get_manifest()
 col1, col2, col3, col4 = st.columns(4)
 
 with col1:
-    total_turmas = len(df_turmas) if not df_turmas.empty else 0
+    total_turmas = manifesto.get('turmas', {}).get('rows', 0)
     st.markdown(f"""
     <div class="metric-card">
         <h2>🏫 {total_turmas}</h2>
@@ -142,7 +188,7 @@ with col1:
     """, unsafe_allow_html=True)
 
 with col2:
-    total_alunos = len(df_alunos) if not df_alunos.empty else 0
+    total_alunos = manifesto.get('alunos', {}).get('rows', 0)
     st.markdown(f"""
     <div class="metric-card">
         <h2>👥 {total_alunos}</h2>
@@ -151,7 +197,7 @@ with col2:
     """, unsafe_allow_html=True)
 
 with col3:
-    total_registros = len(df_frequencia) if not df_frequencia.empty else 0
+    total_registros = manifesto.get('frequencia', {}).get('rows', 0)
     st.markdown(f"""
     <div class="metric-card">
         <h2>📊 {total_registros}</h2>
@@ -169,15 +215,16 @@ with col4:
     """, unsafe_allow_html=True)
 
 # Tabs principais
-tab1, tab2, tab3, tab4, tab5 = st.tabs([
+tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
     "🏫 Gestão de Turmas", 
     "📊 Analytics Avançadas", 
     "👨‍🏫 Monitoramento Professores", 
     "📈 Relatórios Detalhados",
-    "⚙️ Administração"
+    "⚙️ Administração",
+    "⏱️ Performance"
 ])
 
-with tab1:
+with tab1, measure("admin.turmas"):
     st.subheader("🏫 Gestão de Turmas e Alunos")
     
     if not df_turmas.empty:
@@ -194,7 +241,7 @@ with tab1:
         
         with col2:
             if turma_selecionada != "Todas as Turmas":
-                alunos_na_turma = df_alunos[df_alunos['turma'] == turma_selecionada]
+                alunos_na_turma = get_alunos_by_turma(turma_selecionada)
                 st.info(f"👥 {len(alunos_na_turma)} alunos")
         
         st.markdown('</div>', unsafe_allow_html=True)
@@ -215,19 +262,25 @@ with tab1:
             st.markdown('</div>', unsafe_allow_html=True)
             
             # Gráfico de distribuição
-            fig_dist = px.pie(
-                resumo_turmas, 
-                values='Qtd Alunos', 
-                names='Turma',
-                title="Distribuição de Alunos por Turma",
-                hole=0.4
+            def grafico_distribuicao_alunos():
+                fig_dist = px.pie(
+                    resumo_turmas, 
+                    values='Qtd Alunos', 
+                    names='Turma',
+                    title="Distribuição de Alunos por Turma",
+                    hole=0.4
+                )
+                fig_dist.update_layout(height=400)
+                return fig_dist
+            
+            st.plotly_chart(
+                cached_figure('admin.distribuicao_alunos', versao_dados, grafico_distribuicao_alunos),
+                use_container_width=True
             )
-            fig_dist.update_layout(height=400)
-            st.plotly_chart(fig_dist, use_container_width=True)
             
         else:
             st.markdown(f"### 👥 Alunos da Turma: {turma_selecionada}")
-            alunos_na_turma = df_alunos[df_alunos['turma'] == turma_selecionada]
+            alunos_na_turma = get_alunos_by_turma(turma_selecionada)
             
             if not alunos_na_turma.empty:
                 # Adicionar informações de frequência se disponível
@@ -261,7 +314,7 @@ with tab1:
     else:
         st.warning("⚠️ Nenhuma turma cadastrada no sistema.")
 
-with tab2:
+with tab2, measure("admin.analytics"):
     st.subheader("📊 Analytics Avançadas de Frequência")
     
     if not df_frequencia_completa.empty:
@@ -305,6 +358,8 @@ with tab2:
             (df_frequencia_completa['data'] >= data_inicio) &
             (df_frequencia_completa['turma'].isin(turmas_analise))
         ]
+        # Os registros são diários: dentro do mesmo dia, o período relativo seleciona as mesmas linhas
+        filtros_graficos = {'periodo': periodo_analise, 'dia': hoje.date(), 'turmas': tuple(turmas_analise)}
         
         if not df_filtrado.empty:
             if tipo_analise == "Frequência Geral":
@@ -313,35 +368,36 @@ with tab2:
                 
                 with col1:
                     # Tendência temporal
-                    freq_temporal = df_filtrado.groupby([
-                        df_filtrado['data'].dt.to_period('W'), 'status'
-                    ]).size().unstack(fill_value=0).reset_index()
-                    freq_temporal['data'] = freq_temporal['data'].astype(str)
-                    
-                    fig_temporal = px.line(
-                        freq_temporal.melt(id_vars=['data'], var_name='Status', value_name='Quantidade'),
-                        x='data', y='Quantidade', color='Status',
-                        title="Tendência Semanal de Frequência",
-                        color_discrete_map={'Presença': '#28a745', 'Falta': '#dc3545'}
+                    # Semanal por padrão; períodos maiores só quando o intervalo excede o limite de pontos
+                    timeline_chart(
+                        'admin.tendencia', versao_dados, df_filtrado,
+                        "Tendência de Frequência",
+                        {'Presença': '#28a745', 'Falta': '#dc3545'},
+                        periodo_minimo='W',
+                        **filtros_graficos
                     )
-                    fig_temporal.update_layout(height=400)
-                    st.plotly_chart(fig_temporal, use_container_width=True)
                 
                 with col2:
                     # Distribuição por turma
-                    freq_turma = df_filtrado.groupby(['turma', 'status']).size().unstack(fill_value=0)
-                    freq_turma['Total'] = freq_turma.sum(axis=1)
-                    freq_turma['Taxa_Presença'] = (freq_turma.get('Presença', 0) / freq_turma['Total'] * 100).round(1)
+                    def grafico_presenca_turmas():
+                        freq_turma = df_filtrado.groupby(['turma', 'status']).size().unstack(fill_value=0)
+                        freq_turma['Total'] = freq_turma.sum(axis=1)
+                        freq_turma['Taxa_Presença'] = (freq_turma.get('Presença', 0) / freq_turma['Total'] * 100).round(1)
+                        
+                        fig_turma = px.bar(
+                            freq_turma.reset_index(),
+                            x='turma', y='Taxa_Presença',
+                            title="Taxa de Presença por Turma (%)",
+                            color='Taxa_Presença',
+                            color_continuous_scale=['red', 'yellow', 'green']
+                        )
+                        fig_turma.update_layout(height=400)
+                        return fig_turma
                     
-                    fig_turma = px.bar(
-                        freq_turma.reset_index(),
-                        x='turma', y='Taxa_Presença',
-                        title="Taxa de Presença por Turma (%)",
-                        color='Taxa_Presença',
-                        color_continuous_scale=['red', 'yellow', 'green']
+                    st.plotly_chart(
+                        cached_figure('admin.presenca_turmas', versao_dados, grafico_presenca_turmas, **filtros_graficos),
+                        use_container_width=True
                     )
-                    fig_turma.update_layout(height=400)
-                    st.plotly_chart(fig_turma, use_container_width=True)
                 
                 # Estatísticas resumo
                 col1, col2, col3, col4 = st.columns(4)
@@ -393,28 +449,40 @@ with tab2:
                 col1, col2 = st.columns(2)
                 
                 with col1:
-                    fig_faltas = px.bar(
-                        faltas_por_aluno,
-                        x='total_faltas', y='nome',
-                        title="Top 10 Alunos com Mais Faltas",
-                        orientation='h',
-                        color='turma'
+                    def grafico_top_faltas():
+                        fig_faltas = px.bar(
+                            faltas_por_aluno,
+                            x='total_faltas', y='nome',
+                            title="Top 10 Alunos com Mais Faltas",
+                            orientation='h',
+                            color='turma'
+                        )
+                        fig_faltas.update_layout(height=400)
+                        return fig_faltas
+                    
+                    st.plotly_chart(
+                        cached_figure('admin.top_faltas', versao_dados, grafico_top_faltas, **filtros_graficos),
+                        use_container_width=True
                     )
-                    fig_faltas.update_layout(height=400)
-                    st.plotly_chart(fig_faltas, use_container_width=True)
                 
                 with col2:
                     # Justificativas de faltas
-                    justificativas = df_filtrado[df_filtrado['status'] == 'Falta']['justificativa'].value_counts()
+                    def grafico_justificativas():
+                        justificativas = df_filtrado[df_filtrado['status'] == 'Falta']['justificativa'].value_counts()
+                        
+                        fig_just = px.pie(
+                            values=justificativas.values,
+                            names=justificativas.index,
+                            title="Distribuição de Justificativas",
+                            hole=0.4
+                        )
+                        fig_just.update_layout(height=400)
+                        return fig_just
                     
-                    fig_just = px.pie(
-                        values=justificativas.values,
-                        names=justificativas.index,
-                        title="Distribuição de Justificativas",
-                        hole=0.4
+                    st.plotly_chart(
+                        cached_figure('admin.justificativas', versao_dados, grafico_justificativas, **filtros_graficos),
+                        use_container_width=True
                     )
-                    fig_just.update_layout(height=400)
-                    st.plotly_chart(fig_just, use_container_width=True)
                 
                 # Tabela detalhada
                 st.markdown("##### 📋 Detalhamento de Alunos com Altas Taxas de Falta")
@@ -427,7 +495,7 @@ with tab2:
     else:
         st.info("📊 Nenhum dado de frequência disponível para análise.")
 
-with tab3:
+with tab3, measure("admin.professores"):
     st.subheader("👨‍🏫 Monitoramento de Atividade dos Professores")
     
     if not df_frequencia_completa.empty:
@@ -445,27 +513,39 @@ with tab3:
         col1, col2 = st.columns(2)
         
         with col1:
-            fig_prof = px.bar(
-                atividade_prof.sort_values('Total_Registros', ascending=True),
-                x='Total_Registros', y='Professor',
-                title="Total de Registros por Professor",
-                orientation='h',
-                color='Total_Registros',
-                color_continuous_scale='Viridis'
+            def grafico_registros_professor():
+                fig_prof = px.bar(
+                    atividade_prof.sort_values('Total_Registros', ascending=True),
+                    x='Total_Registros', y='Professor',
+                    title="Total de Registros por Professor",
+                    orientation='h',
+                    color='Total_Registros',
+                    color_continuous_scale='Viridis'
+                )
+                fig_prof.update_layout(height=400)
+                return fig_prof
+            
+            st.plotly_chart(
+                cached_figure('admin.registros_professor', versao_dados, grafico_registros_professor),
+                use_container_width=True
             )
-            fig_prof.update_layout(height=400)
-            st.plotly_chart(fig_prof, use_container_width=True)
         
         with col2:
-            fig_turmas = px.bar(
-                atividade_prof,
-                x='Professor', y='Turmas_Atendidas',
-                title="Número de Turmas por Professor",
-                color='Turmas_Atendidas',
-                color_continuous_scale='Blues'
+            def grafico_turmas_professor():
+                fig_turmas = px.bar(
+                    atividade_prof,
+                    x='Professor', y='Turmas_Atendidas',
+                    title="Número de Turmas por Professor",
+                    color='Turmas_Atendidas',
+                    color_continuous_scale='Blues'
+                )
+                fig_turmas.update_layout(height=400)
+                return fig_turmas
+            
+            st.plotly_chart(
+                cached_figure('admin.turmas_professor', versao_dados, grafico_turmas_professor),
+                use_container_width=True
             )
-            fig_turmas.update_layout(height=400)
-            st.plotly_chart(fig_turmas, use_container_width=True)
         
         # Tabela detalhada
         st.markdown("##### 📊 Detalhamento da Atividade dos Professores")
@@ -486,8 +566,38 @@ with tab3:
         
     else:
         st.info("👨‍🏫 Nenhum registro de atividade de professores encontrado.")
+    
+    # Atribuição de turmas: define quais dados cada professor carrega
+    st.markdown("##### 🔗 Turmas por Professor")
+    professores = get_users_by_role('professor')
+    
+    if not professores.empty and not df_turmas.empty:
+        df_atribuicoes = get_data(PROFESSOR_TURMAS_FILE)
+        if df_atribuicoes.empty:
+            df_atribuicoes = pd.DataFrame(columns=['username', 'turma'])
+        
+        col1, col2 = st.columns([1, 2])
+        with col1:
+            professor_atribuicao = st.selectbox("👨‍🏫 Professor:", professores['username'].tolist(), key="professor_atribuicao")
+        with col2:
+            turmas_atribuidas = st.multiselect(
+                "🏫 Turmas:",
+                df_turmas['nome_turma'].tolist(),
+                default=[t for t in df_atribuicoes.loc[df_atribuicoes['username'] == professor_atribuicao, 'turma'] if t in df_turmas['nome_turma'].tolist()],
+                key=f"turmas_atribuidas_{professor_atribuicao}"
+            )
+        st.caption("Professores sem turmas atribuídas não visualizam nenhuma turma até que uma seja atribuída.")
+        
+        if st.button("💾 Salvar Atribuição"):
+            df_atribuicoes = pd.concat([
+                df_atribuicoes[df_atribuicoes['username'] != professor_atribuicao],
+                pd.DataFrame({'username': professor_atribuicao, 'turma': turmas_atribuidas})
+            ], ignore_index=True)
+            save_data(df_atribuicoes, PROFESSOR_TURMAS_FILE)
+    else:
+        st.info("Cadastre professores e turmas para definir as atribuições.")
 
-with tab4:
+with tab4, measure("admin.relatorios"):
     st.subheader("📈 Relatórios Detalhados e Exportação")
     
     if not df_frequencia_completa.empty:
@@ -497,13 +607,13 @@ with tab4:
         with col1:
             tipo_relatorio = st.selectbox(
                 "📄 Tipo de Relatório:",
-                ["Frequência Consolidada", "Relatório por Turma", "Relatório por Professor", "Análise Temporal"]
+                ["Frequência Consolidada", "Relatório por Turma", "Relatório por Professor", "Análise Temporal", "Dados Brutos de Frequência"]
             )
         
         with col2:
             formato_export = st.selectbox(
                 "💾 Formato de Exportação:",
-                ["CSV", "Excel", "JSON"]
+                list(EXPORT_FORMATS)
             )
         
         with col3:
@@ -512,67 +622,55 @@ with tab4:
                 ["Último Mês", "Últimos 3 Meses", "Todo o Período"]
             )
         
-        # Gerar relatório baseado na seleção
-        if tipo_relatorio == "Frequência Consolidada":
-            relatorio = df_frequencia_completa.groupby(['turma', 'nome']).agg({
-                'status': ['count', lambda x: (x == 'Presença').sum(), lambda x: (x == 'Falta').sum()]
-            }).reset_index()
-            relatorio.columns = ['Turma', 'Aluno', 'Total_Dias', 'Presencas', 'Faltas']
-            relatorio['Taxa_Presenca_%'] = (relatorio['Presencas'] / relatorio['Total_Dias'] * 100).round(2)
-            
-        elif tipo_relatorio == "Relatório por Turma":
-            relatorio = df_frequencia_completa.groupby('turma').agg({
-                'id_aluno': 'nunique',
-                'status': ['count', lambda x: (x == 'Presença').sum(), lambda x: (x == 'Falta').sum()]
-            }).reset_index()
-            relatorio.columns = ['Turma', 'Total_Alunos', 'Total_Registros', 'Presencas', 'Faltas']
-            relatorio['Taxa_Presenca_%'] = (relatorio['Presencas'] / relatorio['Total_Registros'] * 100).round(2)
-            
-        elif tipo_relatorio == "Relatório por Professor":
-            relatorio = df_frequencia_completa.groupby('professor').agg({
-                'turma': 'nunique',
-                'id_aluno': 'nunique',
-                'status': 'count',
-                'data': ['min', 'max']
-            }).reset_index()
-            relatorio.columns = ['Professor', 'Turmas_Atendidas', 'Alunos_Registrados', 'Total_Registros', 'Primeiro_Registro', 'Ultimo_Registro']
-            
-        else:  # Análise Temporal
-            relatorio = df_frequencia_completa.groupby(df_frequencia_completa['data'].dt.to_period('M')).agg({
-                'status': ['count', lambda x: (x == 'Presença').sum(), lambda x: (x == 'Falta').sum()],
-                'turma': 'nunique',
-                'id_aluno': 'nunique'
-            }).reset_index()
-            relatorio.columns = ['Mes', 'Total_Registros', 'Presencas', 'Faltas', 'Turmas_Ativas', 'Alunos_Registrados']
-            relatorio['Mes'] = relatorio['Mes'].astype(str)
+        # Relatório compartilhado entre sessões: calculado uma vez por tipo, período e versão dos dados
+        chave_relatorio = (tipo_relatorio, periodo_relatorio, versao_dados)
+        calcular = lambda: calcular_relatorio(df_frequencia_completa, tipo_relatorio, periodo_relatorio)
+        relatorio = report_cache.get_or_compute(chave_relatorio, calcular)
         
         # Exibir relatório
         st.markdown("##### 📊 Visualização do Relatório")
         st.markdown('<div class="data-table">', unsafe_allow_html=True)
-        st.dataframe(relatorio, use_container_width=True)
+        st.dataframe(relatorio.head(1000), use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
+        if len(relatorio) > 1000:
+            st.caption(f"Exibindo 1.000 de {len(relatorio)} linhas; o arquivo exportado contém todas.")
         
-        # Botão de download
-        if formato_export == "CSV":
-            csv = relatorio.to_csv(index=False)
-            st.download_button(
-                label=f"⬇️ Baixar Relatório ({tipo_relatorio}) - CSV",
-                data=csv,
-                file_name=f"relatorio_{tipo_relatorio.lower().replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv"
-            )
-        elif formato_export == "JSON":
-            json_str = relatorio.to_json(orient='records', indent=2)
-            st.download_button(
-                label=f"⬇️ Baixar Relatório ({tipo_relatorio}) - JSON",
-                data=json_str,
-                file_name=f"relatorio_{tipo_relatorio.lower().replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.json",
-                mime="application/json"
+        # Botão de download (o arquivo só é serializado quando solicitado)
+        extensao, mime = EXPORT_FORMATS[formato_export]
+        nome_arquivo = f"relatorio_{tipo_relatorio.lower().replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.{extensao}"
+        st.download_button(
+            label=f"⬇️ Baixar Relatório ({tipo_relatorio}) - {formato_export}",
+            data=lambda: report_cache.get_bytes(chave_relatorio, formato_export, calcular),
+            file_name=nome_arquivo,
+            mime=mime
+        )
+        
+        # Exportação em segundo plano (fila de relatórios)
+        usuario = st.session_state.get("username", "admin")
+        
+        def gerar_exportacao(job, chave, formato, calcular):
+            """Serializa o relatório na fila (o cancelamento é verificado antes da serialização)."""
+            job.progresso(0.1)
+            return report_cache.get_bytes(chave, formato, calcular)
+        
+        if st.button("📤 Gerar Exportação em Segundo Plano"):
+            get_report_queue().submit(
+                owner=usuario,
+                descricao=f"{tipo_relatorio} ({formato_export}) - {periodo_relatorio}",
+                func=lambda job, chave=chave_relatorio, formato=formato_export, calcular=calcular: gerar_exportacao(job, chave, formato, calcular),
+                params={'relatorio': tipo_relatorio, 'formato': formato_export, 'periodo': periodo_relatorio},
+                versao=versao_dados,
+                file_name=nome_arquivo,
+                mime=mime
             )
+            st.success("✅ Exportação enviada para a fila! Acompanhe em 'Meus Relatórios'.")
+        
+        st.markdown("---")
+        exibir_meus_relatorios(usuario)
     else:
         st.info("📈 Nenhum dado disponível para gerar relatórios.")
 
-with tab5:
+with tab5, measure("admin.administracao"):
     st.subheader("⚙️ Administração do Sistema")
     
     # Seção de informações do sistema
@@ -583,9 +681,10 @@ with tab5:
     with col1:
         st.markdown('<div class="stat-card">', unsafe_allow_html=True)
         st.write("**📈 Estatísticas Gerais:**")
-        st.write(f"• Total de registros no sistema: {len(df_frequencia)}")
+        st.write(f"• Total de registros no sistema: {total_registros}")
         st.write(f"• Período de dados: {df_frequencia_completa['data'].min().strftime('%d/%m/%Y') if not df_frequencia_completa.empty else 'N/A'} até {df_frequencia_completa['data'].max().strftime('%d/%m/%Y') if not df_frequencia_completa.empty else 'N/A'}")
-        st.write(f"• Última atualização: {datetime.now().strftime('%d/%m/%Y %H:%M')}")
+        ultima_atualizacao = max((info['updated_at'] for info in manifesto.values() if info['updated_at']), default=None)
+        st.write(f"• Última atualização: {datetime.strptime(ultima_atualizacao, '%Y-%m-%d %H:%M:%S').strftime('%d/%m/%Y %H:%M') if ultima_atualizacao else 'N/A'}")
         st.markdown('</div>', unsafe_allow_html=True)
     
     with col2:
@@ -597,6 +696,23 @@ with tab5:
         st.write("• Manutenção de arquivos")
         st.markdown('</div>', unsafe_allow_html=True)
     
+    # Resumo das tabelas a partir de data/manifest.json
+    st.dataframe(
+        pd.DataFrame([
+            {
+                'Tabela': tabela,
+                'Schema': f"v{info['schema_version']}",
+                'Registros': info['rows'],
+                'Tamanho (KB)': round(info['bytes'] / 1024, 1),
+                'Atualizada em': info['updated_at'],
+                'SHA-256': info['sha256'][:12] if info['sha256'] else "—",
+            }
+            for tabela, info in manifesto.items()
+        ]),
+        use_container_width=True,
+        hide_index=True
+    )
+    
     st.markdown("---")
     
     # Zona de perigo - Reset do sistema
@@ -710,30 +826,91 @@ with tab5:
     with col1:
         st.markdown("##### 📦 Backup dos Dados")
         
-        if st.button("💾 Gerar Backup Completo"):
+        ultimo_backup = last_backup_info()
+        if ultimo_backup:
+            st.caption(f"Último backup: {ultimo_backup['ultimo_backup']}")
+        
+        tipo_backup = st.radio(
+            "Tipo de backup:",
+            ["Completo", "Incremental"],
+            horizontal=True,
+            help="O incremental inclui apenas as linhas alteradas desde o último backup.",
+            disabled=not ultimo_backup
+        )
+        formato_backup = st.radio(
+            "Formato dos dados:",
+            ["NDJSON", "Parquet"],
+            horizontal=True,
+            help="Parquet gera arquivos menores e mais rápidos de restaurar; NDJSON pode ser lido em qualquer editor de texto."
+        )
+        
+        if st.button("💾 Gerar Backup"):
             try:
-                # Criar backup em formato JSON
-                backup_data = {
-                    "timestamp": datetime.now().isoformat(),
-                    "frequencia": df_frequencia.to_dict('records') if not df_frequencia.empty else [],
-                    "turmas": df_turmas.to_dict('records') if not df_turmas.empty else [],
-                    "alunos": df_alunos.to_dict('records') if not df_alunos.empty else []
-                }
-                
-                import json
-                backup_json = json.dumps(backup_data, indent=2, ensure_ascii=False)
+                with st.spinner("Gerando backup..."):
+                    st.session_state['backup_path'] = gerar_backup(
+                        incremental=tipo_backup == "Incremental", formato=formato_backup.lower()
+                    )
+                st.success("✅ Backup gerado com sucesso!")
                 
-                st.download_button(
-                    label="⬇️ Baixar Backup Completo",
-                    data=backup_json,
-                    file_name=f"backup_sistema_frequencia_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                    mime="application/json"
+            except Exception as e:
+                st.error(f"❌ Erro ao gerar backup: {str(e)}")
+        
+        backup_path = st.session_state.get('backup_path')
+        if backup_path and os.path.exists(backup_path):
+            def ler_backup():
+                # Lido só quando o download é solicitado; o arquivo é fechado logo após a leitura
+                with open(backup_path, 'rb') as f:
+                    return f.read()
+            
+            st.download_button(
+                label="⬇️ Baixar Backup",
+                data=ler_backup,
+                file_name=os.path.basename(backup_path),
+                mime="application/gzip"
+            )
+        
+        st.markdown("##### ♻️ Restaurar Backup")
+        
+        origem_backup = st.radio("Origem:", ["Backups do servidor", "Enviar arquivo"], horizontal=True)
+        if origem_backup == "Backups do servidor":
+            backups_disponiveis = listar_backups()
+            backup_escolhido = st.selectbox("Backup:", backups_disponiveis) if backups_disponiveis else None
+            arquivo_restauracao = os.path.join(BACKUP_DIR, backup_escolhido) if backup_escolhido else None
+        else:
+            arquivo_restauracao = st.file_uploader("Arquivo de backup (.tar.gz):", type=["gz"])
+        
+        simular_restauracao = st.checkbox("🔎 Apenas validar (dry-run)", value=True)
+        restauracao_estrita = st.checkbox("Bloquear se houver problemas de integridade referencial")
+        
+        if st.button("♻️ Restaurar", disabled=arquivo_restauracao is None):
+            barra = st.progress(0.0, text="Lendo backup...")
+            try:
+                resultado = restaurar_backup(
+                    arquivo_restauracao,
+                    dry_run=simular_restauracao,
+                    estrito=restauracao_estrita,
+                    progresso=lambda fracao, mensagem: barra.progress(fracao, text=mensagem)
                 )
+                barra.empty()
                 
-                st.success("✅ Backup gerado com sucesso!")
+                for tabela, info in resultado['tabelas'].items():
+                    st.write(f"**{tabela}:** {info['linhas']} linhas")
+                    for erro in info['erros']:
+                        st.write(f"❌ {erro}")
+                    for aviso in info['avisos']:
+                        st.write(f"🔸 {aviso}")
+                
+                if resultado['aplicado']:
+                    st.cache_data.clear()
+                    st.success(f"✅ Backup {resultado['tipo']} restaurado com sucesso!")
+                elif not resultado['valido']:
+                    st.error("❌ Backup inválido: nenhum dado foi alterado.")
+                else:
+                    st.info("✅ Backup válido (nenhum dado foi alterado).")
                 
             except Exception as e:
-                st.error(f"❌ Erro ao gerar backup: {str(e)}")
+                barra.empty()
+                st.error(f"❌ Erro ao restaurar backup: {str(e)}")
     
     with col2:
         st.markdown("##### 🔧 Ferramentas de Manutenção")
@@ -811,6 +988,72 @@ with tab5:
                 st.write("**Estrutura df_turmas:**")
                 st.write(df_turmas.dtypes)
 
+with tab6:
+    st.subheader("⏱️ Desempenho do Sistema")
+    
+    # Medições do processo do servidor (todas as sessões), mantidas em buffer circular
+    resumo_desempenho = metrics.summary()
+    mais_antiga = metrics.oldest_sample()
+    st.caption(
+        f"Últimas {metrics.capacidade:,} operações medidas neste processo do servidor"
+        + (f", desde {datetime.fromtimestamp(mais_antiga).strftime('%d/%m/%Y %H:%M:%S')}." if mais_antiga else ".")
+    )
+    
+    if resumo_desempenho.empty:
+        st.info("⏱️ Nenhuma medição registrada ainda.")
+    else:
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Operações Medidas", f"{int(resumo_desempenho['Chamadas'].sum()):,}")
+        with col2:
+            st.metric("I/O Total", f"{resumo_desempenho['Bytes I/O'].sum() / 1024 / 1024:,.1f} MB")
+        with col3:
+            st.metric("Erros", f"{int(resumo_desempenho['Erros'].sum()):,}")
+        
+        filtro_operacao = st.text_input("🔍 Filtrar operações", placeholder="ex.: db.read, sheets, coordenador")
+        if filtro_operacao:
+            resumo_desempenho = resumo_desempenho[
+                resumo_desempenho['Operação'].str.contains(filtro_operacao, case=False, regex=False)
+            ]
+        
+        st.dataframe(resumo_desempenho, use_container_width=True, hide_index=True)
+        
+        mais_lentas = resumo_desempenho.head(15)
+        fig_desempenho = px.bar(
+            mais_lentas,
+            x='p95 (ms)',
+            y='Operação',
+            orientation='h',
+            title="p95 por Operação (15 mais lentas)",
+            hover_data=['p50 (ms)', 'Máx (ms)', 'Chamadas']
+        )
+        fig_desempenho.update_layout(height=500, yaxis={'categoryorder': 'total ascending'})
+        st.plotly_chart(fig_desempenho, use_container_width=True)
+    
+    with st.expander("🗄️ Caches"):
+        st.caption("Caches limitados em bytes: LRU em memória, entradas removidas vão para data/cache/.")
+        st.dataframe(cache_stats(), use_container_width=True, hide_index=True)
+        if st.button("🧹 Limpar Caches"):
+            report_cache.clear()
+            filter_cache.clear()
+            export_cache.clear()
+            figure_cache.clear()
+            st.rerun()
+    
+    with st.expander("📈 Contadores exportados"):
+        if metrics.ultima_exportacao:
+            st.caption(
+                f"Exportados para {METRICS_DIR}/metrics.prom e metrics.json a cada {METRICS_EXPORT_INTERVAL}s "
+                f"(última: {datetime.fromtimestamp(metrics.ultima_exportacao).strftime('%d/%m/%Y %H:%M:%S')})."
+            )
+        else:
+            st.caption(f"Exportados para {METRICS_DIR}/metrics.prom e metrics.json a cada {METRICS_EXPORT_INTERVAL}s.")
+        st.dataframe(metrics.counters(), use_container_width=True, hide_index=True)
+    
+    if st.button("🧹 Limpar Medições"):
+        metrics.clear()
+        st.rerun()
+
 # Footer com informações do sistema
 st.markdown("---")
 st.markdown("""
@@ -1,12 +1,18 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from utils.database import get_data, FREQUENCIA_FILE, TURMAS_FILE, ALUNOS_FILE
+from utils.database import get_data, get_alunos, add_aluno_info, get_data_version, FREQUENCIA_FILE, TURMAS_FILE, ALUNOS_FILE
+from utils.reports import gerar_relatorios_lote
+from utils.export import EXPORT_FORMATS, consolidated_workbook, serialize_dataframe
+from utils.jobs import get_report_queue, exibir_meus_relatorios
+from utils.sessions import check_access
+from utils.metrics import measure
+from utils.tiered_cache import filter_cache
+from utils.charts import cached_figure, timeline_chart
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from fpdf import FPDF
-from io import BytesIO
 from datetime import datetime, timedelta
 import warnings
 warnings.filterwarnings('ignore')
@@ -55,9 +61,7 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Verificação de permissão
-if st.session_state.get("role") != "coordenador":
-    st.error("🚫 Você não tem permissão para acessar esta página.")
-    st.stop()
+check_access(role="coordenador", permission="reports")
 
 # Header principal
 st.markdown("""
@@ -68,21 +72,16 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Carregamento de dados com cache
-@st.cache_data(ttl=300)  # Cache por 5 minutos
-def load_all_data():
+@st.cache_data(ttl=300, max_entries=2)  # Cache por 5 minutos ou até os dados mudarem
+def load_all_data(versao):
     """Carrega e processa todos os dados necessários"""
     df_frequencia = get_data(FREQUENCIA_FILE)
     df_turmas = get_data(TURMAS_FILE)
-    df_alunos = get_data(ALUNOS_FILE)
+    df_alunos = get_alunos()
     
     if not df_frequencia.empty:
         df_frequencia['data'] = pd.to_datetime(df_frequencia['data'])
-        df_frequencia = pd.merge(
-            df_frequencia, 
-            df_alunos[['id_aluno', 'nome', 'turma']], 
-            on='id_aluno', 
-            how='left'
-        )
+        df_frequencia = add_aluno_info(df_frequencia, ['nome', 'turma'])
         df_frequencia['mes'] = df_frequencia['data'].dt.strftime('%Y-%m')
         df_frequencia['semana'] = df_frequencia['data'].dt.isocalendar().week
         df_frequencia['dia_semana'] = df_frequencia['data'].dt.day_name()
@@ -90,11 +89,12 @@ def load_all_data():
     return df_frequencia, df_turmas, df_alunos
 
 # Carrega dados
-with st.spinner("📊 Carregando dados..."):
-    df_frequencia, df_turmas, df_alunos = load_all_data()
+versao_dados = get_data_version(FREQUENCIA_FILE, ALUNOS_FILE, TURMAS_FILE)
+with st.spinner("📊 Carregando dados..."), measure("coordenador.carregar"):
+    df_frequencia, df_turmas, df_alunos = load_all_data(versao_dados)
 
 # Sidebar com filtros avançados
-with st.sidebar:
+with st.sidebar, measure("coordenador.filtros"):
     st.markdown("### 🎛️ Filtros Avançados")
     
     # Filtro de data
@@ -109,13 +109,19 @@ with st.sidebar:
             max_value=data_max
         )
         
-        if len(periodo_selecionado) == 2:
+        # Variações filtradas ficam no cache limitado em bytes, compartilhado entre sessões
+        # (o período completo sem filtro de turma é o próprio df_frequencia, sem cópia)
+        if len(periodo_selecionado) == 2 and tuple(periodo_selecionado) != (data_min, data_max):
             inicio, fim = periodo_selecionado
-            df_filtrado = df_frequencia[
-                (df_frequencia['data'].dt.date >= inicio) & 
-                (df_frequencia['data'].dt.date <= fim)
-            ]
+            df_filtrado = filter_cache.get_or_compute(
+                ('coordenador', versao_dados, inicio, fim, 'Todas'),
+                lambda: df_frequencia[
+                    (df_frequencia['data'].dt.date >= inicio) & 
+                    (df_frequencia['data'].dt.date <= fim)
+                ]
+            )
         else:
+            inicio, fim = data_min, data_max
             df_filtrado = df_frequencia
         
         # Filtro por turma
@@ -123,7 +129,11 @@ with st.sidebar:
         turma_selecionada = st.selectbox("🎓 Turma", turmas_disponiveis)
         
         if turma_selecionada != 'Todas':
-            df_filtrado = df_filtrado[df_filtrado['turma'] == turma_selecionada]
+            df_periodo = df_filtrado
+            df_filtrado = filter_cache.get_or_compute(
+                ('coordenador', versao_dados, inicio, fim, turma_selecionada),
+                lambda: df_periodo[df_periodo['turma'] == turma_selecionada]
+            )
         
         # Métricas rápidas na sidebar
         st.markdown("### 📈 Métricas Rápidas")
@@ -145,6 +155,9 @@ if df_filtrado.empty:
     st.warning("⚠️ Nenhum dado encontrado para o período selecionado.")
     st.stop()
 
+# Filtros que definem df_filtrado: com a versão dos dados, identificam cada gráfico no cache
+filtros_graficos = {'inicio': inicio, 'fim': fim, 'turma': turma_selecionada}
+
 # Tabs principais
 tab1, tab2, tab3, tab4, tab5 = st.tabs([
     "📊 Visão Geral", 
@@ -154,7 +167,7 @@ tab1, tab2, tab3, tab4, tab5 = st.tabs([
     "🚨 Alertas"
 ])
 
-with tab1:
+with tab1, measure("coordenador.visao_geral"):
     st.header("📊 Visão Geral do Sistema")
     
     # KPIs principais
@@ -204,57 +217,65 @@ with tab1:
     
     with col1:
         # Distribuição de frequência
-        status_counts = df_filtrado['status'].value_counts()
-        fig_pie = px.pie(
-            values=status_counts.values,
-            names=status_counts.index,
-            title="📊 Distribuição Geral de Frequência",
-            color_discrete_map={'Presença': '#00b33c', 'Falta': '#ff3300'},
-            hole=0.4
+        def grafico_distribuicao():
+            status_counts = df_filtrado['status'].value_counts()
+            fig_pie = px.pie(
+                values=status_counts.values,
+                names=status_counts.index,
+                title="📊 Distribuição Geral de Frequência",
+                color_discrete_map={'Presença': '#00b33c', 'Falta': '#ff3300'},
+                hole=0.4
+            )
+            fig_pie.update_traces(textposition='inside', textinfo='percent+label')
+            fig_pie.update_layout(height=400, showlegend=True)
+            return fig_pie
+        
+        st.plotly_chart(
+            cached_figure('coordenador.distribuicao', versao_dados, grafico_distribuicao, **filtros_graficos),
+            use_container_width=True
         )
-        fig_pie.update_traces(textposition='inside', textinfo='percent+label')
-        fig_pie.update_layout(height=400, showlegend=True)
-        st.plotly_chart(fig_pie, use_container_width=True)
     
     with col2:
         # Frequência por turma
-        freq_turma = df_filtrado.groupby(['turma', 'status']).size().reset_index(name='count')
-        fig_bar = px.bar(
-            freq_turma,
-            x='turma',
-            y='count',
-            color='status',
-            title="📈 Frequência por Turma",
-            color_discrete_map={'Presença': '#00b33c', 'Falta': '#ff3300'},
-            barmode='group'
+        def grafico_turmas():
+            freq_turma = df_filtrado.groupby(['turma', 'status']).size().reset_index(name='count')
+            fig_bar = px.bar(
+                freq_turma,
+                x='turma',
+                y='count',
+                color='status',
+                title="📈 Frequência por Turma",
+                color_discrete_map={'Presença': '#00b33c', 'Falta': '#ff3300'},
+                barmode='group'
+            )
+            fig_bar.update_layout(height=400, xaxis_tickangle=-45)
+            return fig_bar
+        
+        st.plotly_chart(
+            cached_figure('coordenador.turmas', versao_dados, grafico_turmas, **filtros_graficos),
+            use_container_width=True
         )
-        fig_bar.update_layout(height=400, xaxis_tickangle=-45)
-        st.plotly_chart(fig_bar, use_container_width=True)
     
     # Timeline de frequência
     st.subheader("📅 Timeline de Frequência")
-    freq_timeline = df_filtrado.groupby(['data', 'status']).size().reset_index(name='count')
-    fig_timeline = px.line(
-        freq_timeline,
-        x='data',
-        y='count',
-        color='status',
-        title="Evolução Temporal da Frequência",
-        color_discrete_map={'Presença': '#00b33c', 'Falta': '#ff3300'}
+    timeline_chart(
+        'coordenador.timeline', versao_dados, df_filtrado,
+        "Evolução Temporal da Frequência",
+        {'Presença': '#00b33c', 'Falta': '#ff3300'},
+        **filtros_graficos
     )
-    fig_timeline.update_layout(height=400)
-    st.plotly_chart(fig_timeline, use_container_width=True)
 
-with tab2:
+with tab2, measure("coordenador.analytics"):
     st.header("📈 Analytics Avançada")
     
     # Heatmap de faltas por dia da semana e turma
     st.subheader("🔥 Mapa de Calor: Faltas por Dia da Semana")
     
-    faltas_heatmap = df_filtrado[df_filtrado['status'] == 'Falta'].groupby(['dia_semana', 'turma']).size().reset_index(name='faltas')
-    faltas_pivot = faltas_heatmap.pivot(index='dia_semana', columns='turma', values='faltas').fillna(0)
-    
-    if not faltas_pivot.empty:
+    def grafico_heatmap():
+        faltas_heatmap = df_filtrado[df_filtrado['status'] == 'Falta'].groupby(['dia_semana', 'turma']).size().reset_index(name='faltas')
+        faltas_pivot = faltas_heatmap.pivot(index='dia_semana', columns='turma', values='faltas').fillna(0)
+        if faltas_pivot.empty:
+            return None
         fig_heatmap = px.imshow(
             faltas_pivot.values,
             x=faltas_pivot.columns,
@@ -264,6 +285,10 @@ with tab2:
             labels={'color': 'Número de Faltas'}
         )
         fig_heatmap.update_layout(height=400)
+        return fig_heatmap
+    
+    fig_heatmap = cached_figure('coordenador.heatmap', versao_dados, grafico_heatmap, **filtros_graficos)
+    if fig_heatmap is not None:
         st.plotly_chart(fig_heatmap, use_container_width=True)
     
     col1, col2 = st.columns(2)
@@ -272,13 +297,17 @@ with tab2:
         # Top 10 alunos com mais faltas
         st.subheader("🎯 Ranking de Faltas por Aluno")
         
-        aluno_faltas = df_filtrado[df_filtrado['status'] == 'Falta'].groupby(['nome', 'turma']).size().reset_index(name='total_faltas')
-        aluno_total = df_filtrado.groupby(['nome', 'turma']).size().reset_index(name='total_registros')
-        ranking_faltas = pd.merge(aluno_faltas, aluno_total, on=['nome', 'turma'], how='right').fillna(0)
-        ranking_faltas['percentual_faltas'] = ranking_faltas['total_faltas'] / ranking_faltas['total_registros'] * 100
-        ranking_faltas = ranking_faltas.sort_values('percentual_faltas', ascending=False).head(10)
-        
-        if not ranking_faltas.empty:
+        def calcular_ranking_faltas(df, limite=10):
+            aluno_faltas = df[df['status'] == 'Falta'].groupby(['nome', 'turma']).size().reset_index(name='total_faltas')
+            aluno_total = df.groupby(['nome', 'turma']).size().reset_index(name='total_registros')
+            ranking = pd.merge(aluno_faltas, aluno_total, on=['nome', 'turma'], how='right').fillna(0)
+            ranking['percentual_faltas'] = ranking['total_faltas'] / ranking['total_registros'] * 100
+            return ranking.sort_values('percentual_faltas', ascending=False).head(limite)
+        
+        def grafico_ranking():
+            ranking_faltas = calcular_ranking_faltas(df_filtrado)
+            if ranking_faltas.empty:
+                return None
             fig_ranking = px.bar(
                 ranking_faltas,
                 x='percentual_faltas',
@@ -289,29 +318,39 @@ with tab2:
                 color_continuous_scale='Reds'
             )
             fig_ranking.update_layout(height=500, yaxis={'categoryorder': 'total ascending'})
+            return fig_ranking
+        
+        fig_ranking = cached_figure('coordenador.ranking', versao_dados, grafico_ranking, **filtros_graficos)
+        if fig_ranking is not None:
             st.plotly_chart(fig_ranking, use_container_width=True)
     
     with col2:
         # Análise por turma
         st.subheader("📚 Performance por Turma")
         
-        turma_stats = df_filtrado.groupby('turma').agg({
-            'status': ['count', lambda x: (x == 'Falta').sum()]
-        }).round(2)
-        turma_stats.columns = ['Total_Registros', 'Total_Faltas']
-        turma_stats['Taxa_Presenca'] = ((turma_stats['Total_Registros'] - turma_stats['Total_Faltas']) / turma_stats['Total_Registros'] * 100).round(1)
-        turma_stats = turma_stats.reset_index().sort_values('Taxa_Presenca')
-        
-        fig_turma_perf = px.bar(
-            turma_stats,
-            x='turma',
-            y='Taxa_Presenca',
-            title="Taxa de Presença por Turma (%)",
-            color='Taxa_Presenca',
-            color_continuous_scale='RdYlGn'
+        def grafico_performance_turmas():
+            turma_stats = df_filtrado.groupby('turma').agg({
+                'status': ['count', lambda x: (x == 'Falta').sum()]
+            }).round(2)
+            turma_stats.columns = ['Total_Registros', 'Total_Faltas']
+            turma_stats['Taxa_Presenca'] = ((turma_stats['Total_Registros'] - turma_stats['Total_Faltas']) / turma_stats['Total_Registros'] * 100).round(1)
+            turma_stats = turma_stats.reset_index().sort_values('Taxa_Presenca')
+            
+            fig_turma_perf = px.bar(
+                turma_stats,
+                x='turma',
+                y='Taxa_Presenca',
+                title="Taxa de Presença por Turma (%)",
+                color='Taxa_Presenca',
+                color_continuous_scale='RdYlGn'
+            )
+            fig_turma_perf.update_layout(height=500, xaxis_tickangle=-45)
+            return fig_turma_perf
+        
+        st.plotly_chart(
+            cached_figure('coordenador.performance_turmas', versao_dados, grafico_performance_turmas, **filtros_graficos),
+            use_container_width=True
         )
-        fig_turma_perf.update_layout(height=500, xaxis_tickangle=-45)
-        st.plotly_chart(fig_turma_perf, use_container_width=True)
     
     # Análise temporal avançada
     st.subheader("⏰ Análise Temporal Avançada")
@@ -320,48 +359,66 @@ with tab2:
     
     with col1:
         # Faltas por mês
-        faltas_mes = df_filtrado[df_filtrado['status'] == 'Falta'].groupby('mes').size().reset_index(name='faltas')
-        fig_mes = px.line(
-            faltas_mes,
-            x='mes',
-            y='faltas',
-            title="Evolução de Faltas por Mês",
-            markers=True
+        def grafico_faltas_mes():
+            faltas_mes = df_filtrado[df_filtrado['status'] == 'Falta'].groupby('mes').size().reset_index(name='faltas')
+            fig_mes = px.line(
+                faltas_mes,
+                x='mes',
+                y='faltas',
+                title="Evolução de Faltas por Mês",
+                markers=True
+            )
+            fig_mes.update_layout(height=300, xaxis_tickangle=-45)
+            return fig_mes
+        
+        st.plotly_chart(
+            cached_figure('coordenador.faltas_mes', versao_dados, grafico_faltas_mes, **filtros_graficos),
+            use_container_width=True
         )
-        fig_mes.update_layout(height=300, xaxis_tickangle=-45)
-        st.plotly_chart(fig_mes, use_container_width=True)
     
     with col2:
         # Faltas por dia da semana
-        faltas_dia = df_filtrado[df_filtrado['status'] == 'Falta'].groupby('dia_semana').size().reset_index(name='faltas')
-        dias_ordem = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        faltas_dia['dia_semana'] = pd.Categorical(faltas_dia['dia_semana'], categories=dias_ordem, ordered=True)
-        faltas_dia = faltas_dia.sort_values('dia_semana')
-        
-        fig_dia = px.bar(
-            faltas_dia,
-            x='dia_semana',
-            y='faltas',
-            title="Faltas por Dia da Semana",
-            color='faltas',
-            color_continuous_scale='Oranges'
+        def grafico_faltas_dia():
+            faltas_dia = df_filtrado[df_filtrado['status'] == 'Falta'].groupby('dia_semana').size().reset_index(name='faltas')
+            dias_ordem = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+            faltas_dia['dia_semana'] = pd.Categorical(faltas_dia['dia_semana'], categories=dias_ordem, ordered=True)
+            faltas_dia = faltas_dia.sort_values('dia_semana')
+            
+            fig_dia = px.bar(
+                faltas_dia,
+                x='dia_semana',
+                y='faltas',
+                title="Faltas por Dia da Semana",
+                color='faltas',
+                color_continuous_scale='Oranges'
+            )
+            fig_dia.update_layout(height=300, xaxis_tickangle=-45)
+            return fig_dia
+        
+        st.plotly_chart(
+            cached_figure('coordenador.faltas_dia', versao_dados, grafico_faltas_dia, **filtros_graficos),
+            use_container_width=True
         )
-        fig_dia.update_layout(height=300, xaxis_tickangle=-45)
-        st.plotly_chart(fig_dia, use_container_width=True)
     
     with col3:
         # Distribuição de justificativas
         if 'justificativa' in df_filtrado.columns:
-            just_counts = df_filtrado[df_filtrado['status'] == 'Falta']['justificativa'].value_counts().head(5)
-            fig_just = px.pie(
-                values=just_counts.values,
-                names=just_counts.index,
-                title="Top 5 Justificativas"
+            def grafico_justificativas():
+                just_counts = df_filtrado[df_filtrado['status'] == 'Falta']['justificativa'].value_counts().head(5)
+                fig_just = px.pie(
+                    values=just_counts.values,
+                    names=just_counts.index,
+                    title="Top 5 Justificativas"
+                )
+                fig_just.update_layout(height=300)
+                return fig_just
+            
+            st.plotly_chart(
+                cached_figure('coordenador.justificativas', versao_dados, grafico_justificativas, **filtros_graficos),
+                use_container_width=True
             )
-            fig_just.update_layout(height=300)
-            st.plotly_chart(fig_just, use_container_width=True)
 
-with tab3:
+with tab3, measure("coordenador.insights"):
     st.header("🎯 Insights com Inteligência Artificial")
     
     # Função para gerar insights automáticos
@@ -496,31 +553,36 @@ with tab3:
         with col2:
             # Calcular distribuição de risco
             if not df_filtrado.empty:
-                risco_dist = df_filtrado.groupby('nome')['status'].apply(
-                    lambda x: (x == 'Falta').sum() / x.count() * 100
-                ).reset_index(name='perc_faltas')
-                
-                risco_dist['categoria'] = pd.cut(
-                    risco_dist['perc_faltas'],
-                    bins=[0, 20, 40, 100],
-                    labels=['Baixo Risco', 'Médio Risco', 'Alto Risco']
-                )
-                
-                risco_counts = risco_dist['categoria'].value_counts()
+                def grafico_risco():
+                    risco_dist = df_filtrado.groupby('nome')['status'].apply(
+                        lambda x: (x == 'Falta').sum() / x.count() * 100
+                    ).reset_index(name='perc_faltas')
+                    
+                    risco_dist['categoria'] = pd.cut(
+                        risco_dist['perc_faltas'],
+                        bins=[0, 20, 40, 100],
+                        labels=['Baixo Risco', 'Médio Risco', 'Alto Risco']
+                    )
+                    
+                    risco_counts = risco_dist['categoria'].value_counts()
+                    
+                    return px.pie(
+                        values=risco_counts.values,
+                        names=risco_counts.index,
+                        title="Distribuição de Risco de Evasão",
+                        color_discrete_map={
+                            'Baixo Risco': '#4caf50',
+                            'Médio Risco': '#ff9800', 
+                            'Alto Risco': '#f44336'
+                        }
+                    )
                 
-                fig_risco = px.pie(
-                    values=risco_counts.values,
-                    names=risco_counts.index,
-                    title="Distribuição de Risco de Evasão",
-                    color_discrete_map={
-                        'Baixo Risco': '#4caf50',
-                        'Médio Risco': '#ff9800', 
-                        'Alto Risco': '#f44336'
-                    }
+                st.plotly_chart(
+                    cached_figure('coordenador.risco', versao_dados, grafico_risco, **filtros_graficos),
+                    use_container_width=True
                 )
-                st.plotly_chart(fig_risco, use_container_width=True)
 
-with tab4:
+with tab4, measure("coordenador.relatorios"):
     st.header("📋 Relatórios Avançados")
     
     # Seletor de tipo de relatório
@@ -533,7 +595,7 @@ with tab4:
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        formato_export = st.selectbox("Formato:", ["PDF", "Excel", "CSV"])
+        formato_export = st.selectbox("Formato:", ["PDF", "Excel", "CSV", "Parquet", "Arrow"])
     with col2:
         incluir_graficos = st.checkbox("Incluir Gráficos", value=True)
     with col3:
@@ -618,10 +680,10 @@ with tab4:
             total_faltas = len(dados[dados['status'] == 'Falta']) if 'status' in dados.columns else 0
             taxa_presenca = ((total_registros - total_faltas) / total_registros * 100) if total_registros > 0 else 0
             
-            pdf.cell(0, 6, f"• Total de Alunos: {total_alunos}", 0, 1)
-            pdf.cell(0, 6, f"• Total de Registros: {total_registros}", 0, 1)
-            pdf.cell(0, 6, f"• Taxa de Presença: {taxa_presenca:.1f}%", 0, 1)
-            pdf.cell(0, 6, f"• Total de Faltas: {total_faltas}", 0, 1)
+            pdf.cell(0, 6, f"- Total de Alunos: {total_alunos}", 0, 1)
+            pdf.cell(0, 6, f"- Total de Registros: {total_registros}", 0, 1)
+            pdf.cell(0, 6, f"- Taxa de Presença: {taxa_presenca:.1f}%", 0, 1)
+            pdf.cell(0, 6, f"- Total de Faltas: {total_faltas}", 0, 1)
         
         pdf.ln(5)
         
@@ -656,63 +718,75 @@ with tab4:
         
         return pdf
     
-    # Botão para gerar relatório
+    def gerar_arquivo_relatorio(job, formato, tipo, dados, periodo, alunos):
+        """Gera o conteúdo do relatório no formato escolhido (executado na fila de relatórios)."""
+        if formato == "PDF":
+            job.progresso(0.1)
+            return bytes(gerar_relatorio_pdf(tipo, dados, periodo).output())
+        
+        if formato == "Excel":
+            # Planilha consolidada: grade aluno × dia letivo por turma + resumos
+            return consolidated_workbook(dados, alunos, progresso=job.progresso)
+        
+        # Dados brutos (CSV, ou Parquet/Arrow com esquema tipado)
+        job.progresso(0.1)
+        return serialize_dataframe(dados, formato)
+    
+    periodo_texto = f"{periodo_selecionado[0]} a {periodo_selecionado[1]}" if len(periodo_selecionado) == 2 else "Todo período"
+    parametros_filtro = {'periodo': periodo_texto, 'turma': turma_selecionada}
+    usuario = st.session_state.get("username", "coordenador")
+    report_queue = get_report_queue()
+    
+    # Botão para gerar relatório (executado em segundo plano pela fila de relatórios)
     if st.button("📥 Gerar Relatório", type="primary"):
         if not df_filtrado.empty:
-            with st.spinner("Gerando relatório..."):
-                if formato_export == "PDF":
-                    pdf_relatorio = gerar_relatorio_pdf(tipo_relatorio, df_filtrado, f"{periodo_selecionado[0]} a {periodo_selecionado[1]}" if len(periodo_selecionado) == 2 else "Todo período")
-                    pdf_output = BytesIO()
-                    pdf_string = pdf_relatorio.output(dest='S').encode('latin-1')
-                    pdf_output.write(pdf_string)
-                    pdf_output.seek(0)
-                    
-                    st.download_button(
-                        label="📄 Baixar Relatório PDF",
-                        data=pdf_output,
-                        file_name=f"relatorio_{tipo_relatorio.lower().replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M')}.pdf",
-                        mime="application/pdf"
-                    )
-                
-                elif formato_export == "Excel":
-                    output = BytesIO()
-                    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                        # Aba principal com dados
-                        df_filtrado.to_excel(writer, sheet_name='Dados_Frequencia', index=False)
-                        
-                        # Aba com resumo por turma
-                        if 'turma' in df_filtrado.columns and 'nome' in df_filtrado.columns:
-                            resumo_turmas = df_filtrado.groupby('turma').agg({
-                                'nome': 'nunique',
-                                'status': ['count', lambda x: (x == 'Falta').sum()]
-                            }).round(2)
-                            resumo_turmas.columns = ['Qtd_Alunos', 'Total_Registros', 'Total_Faltas']
-                            resumo_turmas['Taxa_Presenca'] = ((resumo_turmas['Total_Registros'] - resumo_turmas['Total_Faltas']) / resumo_turmas['Total_Registros'] * 100).round(1)
-                            resumo_turmas.to_excel(writer, sheet_name='Resumo_Turmas')
-                    
-                    st.download_button(
-                        label="📊 Baixar Relatório Excel",
-                        data=output.getvalue(),
-                        file_name=f"relatorio_{tipo_relatorio.lower().replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                    )
-                
-                elif formato_export == "CSV":
-                    csv_output = BytesIO()
-                    df_filtrado.to_csv(csv_output, index=False, encoding='utf-8')
-                    
-                    st.download_button(
-                        label="📋 Baixar Relatório CSV",
-                        data=csv_output.getvalue(),
-                        file_name=f"relatorio_{tipo_relatorio.lower().replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
-                        mime="text/csv"
-                    )
-                    
-                st.success("✅ Relatório gerado com sucesso!")
+            extensao, mime = ("pdf", "application/pdf") if formato_export == "PDF" else EXPORT_FORMATS[formato_export]
+            dados_relatorio = df_filtrado.copy()
+            alunos_relatorio = df_alunos if turma_selecionada == 'Todas' else df_alunos[df_alunos['turma'] == turma_selecionada]
+            
+            report_queue.submit(
+                owner=usuario,
+                descricao=f"{tipo_relatorio} ({formato_export}) - {periodo_texto}",
+                func=lambda job, formato=formato_export, tipo=tipo_relatorio: gerar_arquivo_relatorio(
+                    job, formato, tipo, dados_relatorio, periodo_texto, alunos_relatorio
+                ),
+                params={'relatorio': tipo_relatorio, 'formato': formato_export, **parametros_filtro},
+                versao=versao_dados,
+                file_name=f"relatorio_{tipo_relatorio.lower().replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M')}.{extensao}",
+                mime=mime
+            )
+            st.success("✅ Relatório enviado para a fila! Acompanhe em 'Meus Relatórios'.")
         else:
             st.warning("⚠️ Nenhum dado disponível para gerar o relatório.")
+    
+    # Relatórios em lote: um PDF por turma (e opcionalmente por aluno) em um único ZIP
+    st.subheader("📦 Relatórios em Lote")
+    
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        incluir_pdf_alunos = st.checkbox("Incluir PDF individual por aluno", value=False)
+    with col2:
+        gerar_lote = st.button("📦 Gerar PDFs de Todas as Turmas")
+    
+    if gerar_lote:
+        dados_lote = df_filtrado.copy()
+        report_queue.submit(
+            owner=usuario,
+            descricao=f"PDFs de todas as turmas{' e alunos' if incluir_pdf_alunos else ''} - {periodo_texto}",
+            func=lambda job, por_aluno=incluir_pdf_alunos: gerar_relatorios_lote(
+                dados_lote, periodo_texto, por_aluno=por_aluno, progresso=job.progresso
+            ),
+            params={'relatorio': 'lote_pdf', 'por_aluno': incluir_pdf_alunos, **parametros_filtro},
+            versao=versao_dados,
+            file_name=f"relatorios_frequencia_{datetime.now().strftime('%Y%m%d_%H%M')}.zip",
+            mime="application/zip"
+        )
+        st.success("✅ Geração em lote enviada para a fila! Acompanhe em 'Meus Relatórios'.")
+    
+    st.markdown("---")
+    exibir_meus_relatorios(usuario)
 
-with tab5:
+with tab5, measure("coordenador.alertas"):
     st.header("🚨 Sistema de Alertas Inteligentes")
     
     # Configuração de alertas
@@ -728,12 +802,14 @@ with tab5:
         dias_consecutivos = st.slider("📅 Dias Consecutivos de Falta", 2, 10, 3, 1)
     
     # Processamento de alertas
-    alertas = []
-    
-    if not df_filtrado.empty:
+    def gerar_alertas(df, limite_falta_individual, limite_falta_turma):
+        alertas = []
+        if df.empty:
+            return alertas
+        
         # Alerta 1: Alunos com alta taxa de faltas
-        if 'nome' in df_filtrado.columns and 'turma' in df_filtrado.columns:
-            alunos_alta_falta = df_filtrado.groupby(['nome', 'turma']).agg({
+        if 'nome' in df.columns and 'turma' in df.columns:
+            alunos_alta_falta = df.groupby(['nome', 'turma']).agg({
                 'status': ['count', lambda x: (x == 'Falta').sum()]
             }).round(2)
             alunos_alta_falta.columns = ['Total_Registros', 'Total_Faltas']
@@ -751,8 +827,8 @@ with tab5:
                 })
         
         # Alerta 2: Turmas com taxa elevada de faltas
-        if 'turma' in df_filtrado.columns:
-            turmas_alta_falta = df_filtrado.groupby('turma')['status'].apply(
+        if 'turma' in df.columns:
+            turmas_alta_falta = df.groupby('turma')['status'].apply(
                 lambda x: (x == 'Falta').sum() / x.count() * 100
             ).reset_index(name='percentual_faltas')
             turmas_criticas = turmas_alta_falta[turmas_alta_falta['percentual_faltas'] >= limite_falta_turma]
@@ -768,10 +844,10 @@ with tab5:
                 })
         
         # Alerta 3: Tendência crescente de faltas
-        if len(df_filtrado) > 30:  # Só analisa se tiver dados suficientes
-            df_recente = df_filtrado[df_filtrado['data'] >= df_filtrado['data'].max() - timedelta(days=7)]
-            df_anterior = df_filtrado[(df_filtrado['data'] >= df_filtrado['data'].max() - timedelta(days=14)) & 
-                                    (df_filtrado['data'] < df_filtrado['data'].max() - timedelta(days=7))]
+        if len(df) > 30:  # Só analisa se tiver dados suficientes
+            df_recente = df[df['data'] >= df['data'].max() - timedelta(days=7)]
+            df_anterior = df[(df['data'] >= df['data'].max() - timedelta(days=14)) & 
+                             (df['data'] < df['data'].max() - timedelta(days=7))]
             
             if len(df_recente) > 0 and len(df_anterior) > 0:
                 taxa_recente = len(df_recente[df_recente['status'] == 'Falta']) / len(df_recente) * 100
@@ -787,6 +863,10 @@ with tab5:
                         'acao': 'Investigar causas do aumento de faltas',
                         'prioridade': 2
                     })
+        
+        return alertas
+    
+    alertas = gerar_alertas(df_filtrado, limite_falta_individual, limite_falta_turma)
     
     # Exibição dos alertas
     if alertas:
@@ -1,25 +1,90 @@
 import streamlit as st
 import pandas as pd
-from io import BytesIO
-from utils.database import get_data, FREQUENCIA_FILE, ALUNOS_FILE, TURMAS_FILE
+from utils.database import get_data, get_alunos_by_turma, get_frequencia_turmas, get_roster_index, add_aluno_info, get_data_version, FREQUENCIA_FILE, ALUNOS_FILE, TURMAS_FILE
+from utils.export import chunks_to_xlsx
+from utils.sessions import check_access
+from utils.metrics import measure, timed
+from utils.tiered_cache import export_cache
+from utils.charts import cached_figure
 import plotly.express as px
 
-if st.session_state.get("role") != "agente":
-    st.warning("Você não tem permissão para acessar esta página.")
-    st.stop()
+check_access(role="agente", permission="frequencia")
 
 st.title("Dashboard do Agente")
 
-df_frequencia = get_data(FREQUENCIA_FILE)
-df_alunos = get_data(ALUNOS_FILE)
-df_turmas = get_data(TURMAS_FILE)
+TODAS_TURMAS = "Todas as Turmas"
+TODOS_MESES = "Todos os Meses"
+
+@timed("agente.exportar")
+def gerar_excel_frequencia(turma, mes, versao):
+    """Gera o Excel de frequência sob demanda (cache limitado em bytes por turma, mês e versão dos dados)."""
+    return export_cache.get_or_compute(
+        ('agente.frequencia', turma, mes, versao), lambda: _montar_excel_frequencia(turma, mes)
+    )
+
+def _montar_excel_frequencia(turma, mes):
+    """Monta o Excel turma a turma, a partir da frequência já particionada em memória.
+
+    Nenhuma turma é juntada à tabela inteira: a memória depende da maior turma,
+    não da escola. Acima do limite de linhas do Excel, os dados seguem em novas planilhas.
+    """
+    indice_alunos = get_roster_index()
+    turmas = sorted(indice_alunos['por_turma'], key=str) if turma == TODAS_TURMAS else [turma]
+    colunas_frequencia = [c for c in get_frequencia_turmas([]).columns if c not in ('id_aluno', 'turma')]
+    colunas = indice_alunos['alunos'].columns.tolist() + colunas_frequencia
+    
+    def blocos():
+        for nome_turma in turmas:
+            df_alunos_turma = get_alunos_by_turma(nome_turma)
+            if df_alunos_turma.empty:
+                continue
+            df_frequencia = get_frequencia_turmas([nome_turma]).drop(columns='turma', errors='ignore')
+            if mes != TODOS_MESES and not df_frequencia.empty:
+                df_frequencia = df_frequencia[df_frequencia['data'].dt.strftime('%Y-%m') == mes]
+            yield pd.merge(df_alunos_turma, df_frequencia, on='id_aluno', how='left')
+    
+    return chunks_to_xlsx(blocos(), colunas, 'Frequencia')
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def load_agente_data(versao):
+    """Carrega e pré-agrega os dados do painel (cache por versão dos dados).
+
+    Retorna apenas agregados (meses, taxas por aluno e justificativas), de modo
+    que o custo de cada rerun não dependa do tamanho do histórico.
+    """
+    df_frequencia = get_data(FREQUENCIA_FILE)
+    df_turmas = get_data(TURMAS_FILE)
+    turmas = df_turmas['nome_turma'].tolist() if 'nome_turma' in df_turmas.columns else []
+    
+    if df_frequencia.empty:
+        return turmas, [], pd.DataFrame(), pd.Series(dtype='int64')
+    
+    meses = sorted(pd.to_datetime(df_frequencia['data']).dt.to_period('M').astype(str).unique())
+    
+    frequencia_alunos = pd.crosstab(df_frequencia['id_aluno'], df_frequencia['status'])
+    frequencia_alunos = frequencia_alunos.reindex(
+        columns=frequencia_alunos.columns.union(['Presença', 'Falta'], sort=False), fill_value=0
+    )
+    frequencia_alunos['total'] = frequencia_alunos.sum(axis=1)
+    frequencia_alunos['%_presenca'] = (frequencia_alunos['Presença'] / frequencia_alunos['total']) * 100
+    
+    df_analytics = add_aluno_info(frequencia_alunos.reset_index(), ['nome', 'turma']).dropna(subset=['nome'])
+    df_analytics = df_analytics.sort_values(by='%_presenca', ascending=True)
+    
+    justificativas = df_frequencia[df_frequencia['status'] == 'Falta']['justificativa'].value_counts()
+    
+    return turmas, meses, df_analytics, justificativas
+
+versao_dados = get_data_version(FREQUENCIA_FILE, ALUNOS_FILE, TURMAS_FILE)
+with measure("agente.carregar"):
+    turmas_cadastradas, meses, df_analytics, justificativas = load_agente_data(versao_dados)
 
 # --- Download da Tabela de Frequência ---
 st.subheader("Download da Tabela de Frequência")
 
-if not df_frequencia.empty:
-    meses = sorted(df_frequencia['data'].apply(lambda x: pd.to_datetime(x).strftime('%Y-%m')).unique())
-    turmas = df_turmas['nome_turma'].tolist()
+if meses:
+    meses = meses + [TODOS_MESES]
+    turmas = turmas_cadastradas + [TODAS_TURMAS]
     
     col1, col2 = st.columns(2)
     with col1:
@@ -27,25 +92,10 @@ if not df_frequencia.empty:
     with col2:
         turma_selecionada = st.selectbox("Selecione a Turma:", turmas)
     
-    df_frequencia['data'] = pd.to_datetime(df_frequencia['data'])
-    df_filtrado = df_frequencia[df_frequencia['data'].dt.strftime('%Y-%m') == mes_selecionado]
-    
-    df_alunos_filtrado = df_alunos[df_alunos['turma'] == turma_selecionada]
-    
-    df_download = pd.merge(df_alunos_filtrado, df_filtrado, on='id_aluno', how='left')
-    
-    def to_excel(df):
-        output = BytesIO()
-        writer = pd.ExcelWriter(output, engine='xlsxwriter')
-        df.to_excel(writer, index=False, sheet_name='Frequencia')
-        writer.close()
-        processed_data = output.getvalue()
-        return processed_data
-
-    excel_data = to_excel(df_download)
+    # O arquivo só é gerado quando o download é solicitado
     st.download_button(
         label="Baixar Tabela de Frequência (Excel)",
-        data=excel_data,
+        data=lambda: gerar_excel_frequencia(turma_selecionada, mes_selecionado, versao_dados),
         file_name=f"frequencia_{turma_selecionada}_{mes_selecionado}.xlsx",
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
@@ -53,32 +103,24 @@ if not df_frequencia.empty:
 # --- Analytics de Frequência ---
 st.subheader("Analytics de Frequência")
 
-if not df_frequencia.empty:
-    frequencia_alunos = df_frequencia.groupby('id_aluno')['status'].value_counts().unstack(fill_value=0)
-    frequencia_alunos['total'] = frequencia_alunos.sum(axis=1)
-    frequencia_alunos['%_presenca'] = (frequencia_alunos['Presença'] / frequencia_alunos['total']) * 100
-    
-    df_analytics = pd.merge(df_alunos, frequencia_alunos, on='id_aluno')
-    df_analytics = df_analytics.sort_values(by='%_presenca', ascending=True)
-
-    fig = px.bar(
+if not df_analytics.empty:
+    fig = cached_figure('agente.presenca', versao_dados, lambda: px.bar(
         df_analytics,
         x='nome',
         y='%_presenca',
         title="Percentual de Presença por Aluno",
         color='%_presenca'
-    )
+    ))
     st.plotly_chart(fig, use_container_width=True)
     
     st.markdown("---")
     st.subheader("Justificativas de Falta")
-    justificativas = df_frequencia[df_frequencia['status'] == 'Falta']['justificativa'].value_counts()
-    fig_pie = px.pie(
+    fig_pie = cached_figure('agente.justificativas', versao_dados, lambda: px.pie(
         justificativas,
         values=justificativas.values,
         names=justificativas.index,
         title="Distribuição das Justificativas de Falta"
-    )
+    ))
     st.plotly_chart(fig_pie)
 else:
     st.warning("Nenhum dado de frequência para análise.")
\ No newline at end of file
@@ -0,0 +1,428 @@
+import pandas as pd
+import numpy as np
+import hashlib
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+from io import BytesIO
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import logging
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from utils.database import DATA_FILES, db_manager
+
+logger = logging.getLogger(__name__)
+
+BACKUP_DIR = "data/backups"
+BACKUP_STATE_DIR = os.path.join(BACKUP_DIR, "estado")
+BACKUP_STATE_FILE = os.path.join(BACKUP_STATE_DIR, "estado.json")
+BACKUP_TABLES = ['turmas', 'alunos', 'frequencia', 'professor_turmas']
+BACKUP_FORMAT_VERSION = 1
+# Formato dos dados de cada tabela no arquivo: extensão do membro
+BACKUP_DATA_FORMATS = {'ndjson': 'jsonl', 'parquet': 'parquet'}
+
+# Linhas por bloco na leitura/escrita das tabelas
+CHUNK_SIZE = 50_000
+
+
+def iter_table_chunks(table_name: str, chunk_size: int = CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Lê uma tabela em blocos, com todos os valores como texto (igual ao CSV em disco)."""
+    file_path = DATA_FILES[table_name]
+    if os.path.exists(file_path):
+        try:
+            for chunk in pd.read_csv(file_path, chunksize=chunk_size, dtype=str, keep_default_na=False):
+                yield chunk
+            return
+        except pd.errors.EmptyDataError:
+            return
+
+    # Sem CSV local (ex.: somente Google Sheets): leitura completa da tabela
+    df = db_manager.get_data(table_name)
+    df = df.astype(str)
+    for inicio in range(0, len(df), chunk_size):
+        yield df.iloc[inicio:inicio + chunk_size]
+
+
+def hash_rows(df: pd.DataFrame) -> np.ndarray:
+    """Hash de cada linha (independente do índice), usado para detectar alterações."""
+    return pd.util.hash_pandas_object(df, index=False).to_numpy(dtype=np.uint64)
+
+
+def assinatura_linhas(hashes: np.ndarray) -> str:
+    """Assinatura do conteúdo de uma tabela a partir dos hashes das linhas (independe da ordem)."""
+    return hashlib.sha256(np.sort(hashes.astype(np.uint64)).tobytes()).hexdigest()
+
+
+def assinatura_tabela(table_name: str) -> str:
+    """Assinatura do conteúdo atual de uma tabela (lida em blocos)."""
+    hashes = [hash_rows(chunk) for chunk in iter_table_chunks(table_name)]
+    return assinatura_linhas(np.concatenate(hashes) if hashes else np.array([], dtype=np.uint64))
+
+
+def _load_state() -> Dict[str, any]:
+    try:
+        with open(BACKUP_STATE_FILE, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _load_hashes(table_name: str) -> np.ndarray:
+    try:
+        return np.load(os.path.join(BACKUP_STATE_DIR, f"{table_name}.npy"))
+    except FileNotFoundError:
+        return np.array([], dtype=np.uint64)
+
+
+@contextmanager
+def _escritor_tabela(caminho: str, formato: str):
+    """Fornece escrever(chunk), que acrescenta um bloco ao arquivo da tabela no formato pedido.
+
+    No Parquet cada bloco vira um row group (colunas como texto, compressão zstd),
+    gravado à medida que chega: a memória fica limitada a um bloco.
+    """
+    if formato == 'ndjson':
+        with open(caminho, 'w', encoding='utf-8') as f:
+            yield lambda chunk: f.write(chunk.to_json(orient='records', lines=True, force_ascii=False).rstrip('\n') + '\n')
+        return
+
+    escritor = None
+
+    def escrever(chunk: pd.DataFrame):
+        nonlocal escritor
+        schema = pa.schema([(str(coluna), pa.string()) for coluna in chunk.columns])
+        tabela = pa.Table.from_pandas(chunk.astype(str), schema=schema, preserve_index=False)
+        if escritor is None:
+            escritor = pq.ParquetWriter(caminho, schema, compression='zstd')
+        escritor.write_table(tabela)
+
+    try:
+        yield escrever
+    finally:
+        if escritor is not None:
+            escritor.close()
+
+
+def last_backup_info() -> Optional[Dict[str, any]]:
+    """Informações do último backup gerado (ou None se nunca houve backup)."""
+    return _load_state() or None
+
+
+def listar_backups() -> List[str]:
+    """Arquivos de backup disponíveis no servidor, mais recentes primeiro."""
+    if not os.path.isdir(BACKUP_DIR):
+        return []
+    nomes = [nome for nome in os.listdir(BACKUP_DIR) if nome.endswith('.tar.gz')]
+    return sorted(nomes, key=lambda nome: os.path.getmtime(os.path.join(BACKUP_DIR, nome)), reverse=True)
+
+
+def gerar_backup(incremental: bool = False, tables: Optional[List[str]] = None, formato: str = 'ndjson') -> str:
+    """Gera um backup .tar.gz (uma tabela NDJSON ou Parquet por membro) e retorna o caminho.
+
+    As tabelas são lidas e gravadas em blocos, mantendo a memória limitada.
+    No modo incremental, apenas tabelas cuja versão mudou desde o último
+    backup são incluídas, e delas somente as linhas novas/alteradas; os hashes
+    das linhas removidas vão em '<tabela>.removidos.npy'. O manifesto guarda
+    a assinatura de cada tabela no backup base, conferida na restauração.
+    """
+    tables = tables or BACKUP_TABLES
+    if formato not in BACKUP_DATA_FORMATS:
+        raise ValueError(f"Formato de backup desconhecido: {formato}")
+    os.makedirs(BACKUP_STATE_DIR, exist_ok=True)
+    estado_anterior = _load_state()
+    if incremental and not estado_anterior:
+        raise ValueError("Nenhum backup anterior encontrado; gere um backup completo primeiro.")
+
+    tipo = 'incremental' if incremental else 'completo'
+    timestamp = datetime.now()
+    nome = f"backup_{tipo}_{timestamp.strftime('%Y%m%d_%H%M%S')}.tar.gz"
+    caminho = os.path.join(BACKUP_DIR, nome)
+
+    manifest = {
+        'formato': BACKUP_FORMAT_VERSION,
+        'tipo': tipo,
+        'dados': formato,
+        'timestamp': timestamp.isoformat(),
+        'base': estado_anterior.get('ultimo_backup') if incremental else None,
+        'base_tabelas': {
+            table_name: assinatura_linhas(_load_hashes(table_name))
+            for table_name in tables if table_name in estado_anterior.get('tabelas', {})
+        } if incremental else None,
+        'tabelas': {}
+    }
+    novos_hashes = {}
+
+    with tempfile.TemporaryDirectory(dir=BACKUP_DIR) as tmp_dir:
+        arquivos = []
+        for table_name in tables:
+            versao = db_manager.get_data_version(table_name)
+            info_anterior = estado_anterior.get('tabelas', {}).get(table_name, {})
+            if incremental and info_anterior.get('versao') == versao:
+                continue
+
+            hashes_anteriores = np.sort(_load_hashes(table_name)) if incremental else None
+            hashes_atuais = []
+            colunas = None
+            linhas = 0
+            membro = f"{table_name}.{BACKUP_DATA_FORMATS[formato]}"
+            caminho_tabela = os.path.join(tmp_dir, membro)
+
+            with _escritor_tabela(caminho_tabela, formato) as escrever:
+                for chunk in iter_table_chunks(table_name):
+                    colunas = colunas or chunk.columns.tolist()
+                    hashes = hash_rows(chunk)
+                    hashes_atuais.append(hashes)
+                    if incremental and len(hashes_anteriores):
+                        chunk = chunk[~np.isin(hashes, hashes_anteriores)]
+                    if not chunk.empty:
+                        escrever(chunk)
+                        linhas += len(chunk)
+            if not os.path.exists(caminho_tabela):
+                # Parquet sem nenhuma linha: arquivo só com o esquema
+                pq.write_table(pa.table({coluna: pa.array([], pa.string()) for coluna in colunas or []}), caminho_tabela)
+
+            hashes_atuais = np.concatenate(hashes_atuais) if hashes_atuais else np.array([], dtype=np.uint64)
+            novos_hashes[table_name] = hashes_atuais
+
+            info = {
+                'versao': versao,
+                'colunas': colunas or [],
+                'linhas': linhas,
+                'linhas_total': int(len(hashes_atuais))
+            }
+            if incremental and len(hashes_anteriores):
+                removidos = np.setdiff1d(hashes_anteriores, hashes_atuais)
+                info['removidos'] = int(len(removidos))
+                caminho_removidos = os.path.join(tmp_dir, f"{table_name}.removidos.npy")
+                np.save(caminho_removidos, removidos)
+                arquivos.append((f"{table_name}.removidos.npy", caminho_removidos))
+            # As linhas removidas vêm antes dos dados da tabela, para a restauração em uma única passada
+            arquivos.append((membro, caminho_tabela))
+            manifest['tabelas'][table_name] = info
+
+        # O manifesto vai primeiro para que a restauração possa validar antes de ler os dados
+        caminho_manifest = os.path.join(tmp_dir, "manifest.json")
+        with open(caminho_manifest, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        with tarfile.open(caminho, 'w:gz') as tar:
+            tar.add(caminho_manifest, arcname="manifest.json")
+            for arcname, caminho_arquivo in arquivos:
+                tar.add(caminho_arquivo, arcname=arcname)
+
+    # Atualiza o estado usado pelo próximo backup incremental
+    estado = {
+        'ultimo_backup': nome,
+        'timestamp': manifest['timestamp'],
+        'tabelas': dict(estado_anterior.get('tabelas', {}))
+    }
+    for table_name, hashes in novos_hashes.items():
+        np.save(os.path.join(BACKUP_STATE_DIR, f"{table_name}.npy"), hashes)
+        estado['tabelas'][table_name] = {'versao': manifest['tabelas'][table_name]['versao']}
+    with open(BACKUP_STATE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(estado, f, ensure_ascii=False, indent=2)
+
+    logger.info(f"Backup {tipo} gerado: {caminho} ({len(manifest['tabelas'])} tabelas)")
+    return caminho
+
+# Colunas obrigatórias por tabela na restauração
+RESTORE_REQUIRED_COLUMNS = {
+    'turmas': ['nome_turma'],
+    'alunos': ['id_aluno', 'nome', 'turma'],
+    'frequencia': ['id_aluno', 'data', 'status'],
+    'professor_turmas': ['username', 'turma'],
+}
+STATUS_VALIDOS = {'Presença', 'Falta'}
+# Máximo de erros registrados por tabela no relatório
+MAX_ERROS_TABELA = 20
+
+
+def _chaves_atuais(table_name: str, coluna: str) -> set:
+    """Chaves de uma tabela já armazenada (usadas quando ela não está no backup)."""
+    chaves = set()
+    for chunk in iter_table_chunks(table_name):
+        if coluna in chunk.columns:
+            chaves.update(chunk[coluna])
+    return chaves
+
+
+def _validar_chunk(table_name: str, chunk: pd.DataFrame, chaves: Dict[str, set]) -> Tuple[List[str], List[str]]:
+    """Valida um bloco: retorna (erros de esquema/valores, avisos de integridade referencial)."""
+    erros, avisos = [], []
+    for coluna in RESTORE_REQUIRED_COLUMNS.get(table_name, []):
+        vazios = int((chunk[coluna] == '').sum())
+        if vazios:
+            erros.append(f"{vazios} linhas sem '{coluna}'")
+
+    if table_name == 'alunos':
+        duplicados = chunk['id_aluno'].duplicated() | chunk['id_aluno'].isin(chaves['alunos'])
+        if duplicados.any():
+            erros.append(f"{int(duplicados.sum())} alunos com IDs duplicados")
+        if chaves['turmas'] is not None:
+            orfaos = ~chunk['turma'].isin(chaves['turmas'])
+            if orfaos.any():
+                avisos.append(f"{int(orfaos.sum())} alunos em turmas inexistentes (ex.: {chunk.loc[orfaos, 'turma'].iloc[0]})")
+    elif table_name == 'frequencia':
+        status_invalidos = ~chunk['status'].isin(STATUS_VALIDOS)
+        if status_invalidos.any():
+            erros.append(f"{int(status_invalidos.sum())} registros com status inválido")
+        datas_invalidas = pd.to_datetime(chunk['data'], errors='coerce', format='%Y-%m-%d').isna()
+        if datas_invalidas.any():
+            erros.append(f"{int(datas_invalidas.sum())} registros com data inválida")
+        orfaos = ~chunk['id_aluno'].isin(chaves['alunos'])
+        if orfaos.any():
+            avisos.append(f"{int(orfaos.sum())} registros de frequência com alunos inexistentes")
+    elif table_name == 'professor_turmas' and chaves['turmas'] is not None:
+        orfaos = ~chunk['turma'].isin(chaves['turmas'])
+        if orfaos.any():
+            avisos.append(f"{int(orfaos.sum())} atribuições a turmas inexistentes (ex.: {chunk.loc[orfaos, 'turma'].iloc[0]})")
+    return erros, avisos
+
+
+def restaurar_backup(arquivo, dry_run: bool = False, estrito: bool = False,
+                     progresso: Optional[Callable[[float, str], None]] = None) -> Dict[str, any]:
+    """Restaura um backup gerado por gerar_backup, lendo o arquivo em fluxo.
+
+    arquivo pode ser um caminho ou um objeto de arquivo binário. Cada tabela é
+    lida e validada em blocos para um CSV temporário; somente se todas as
+    tabelas forem válidas (e dry_run for False) cada uma é gravada, em uma
+    única operação, por db_manager.replace_table. Backups incrementais são
+    aplicados sobre os dados atuais, que precisam ser exatamente os do backup
+    base (senão ValueError: restaure a base antes). Problemas de integridade referencial são
+    avisos, que só bloqueiam a restauração quando estrito=True.
+    Retorna {'valido', 'aplicado', 'tipo', 'tabelas': {tabela: {'linhas', 'erros', 'avisos'}}}.
+    """
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    relatorio = {'valido': False, 'aplicado': False, 'tipo': None, 'tabelas': {}}
+    abrir = {'name': arquivo} if isinstance(arquivo, str) else {'fileobj': arquivo}
+
+    with tempfile.TemporaryDirectory(dir=BACKUP_DIR) as tmp_dir, \
+            tarfile.open(mode='r|gz', **abrir) as tar:
+        membros = iter(tar)
+        primeiro = next(membros, None)
+        if primeiro is None or primeiro.name != 'manifest.json':
+            raise ValueError("Arquivo de backup inválido: manifesto não encontrado.")
+        manifest = json.load(tar.extractfile(primeiro))
+        if manifest.get('formato') != BACKUP_FORMAT_VERSION:
+            raise ValueError(f"Formato de backup não suportado: {manifest.get('formato')}")
+
+        tabelas = manifest['tabelas']
+        incremental = manifest['tipo'] == 'incremental'
+        relatorio['tipo'] = manifest['tipo']
+        if incremental:
+            _conferir_base(manifest)
+        total_linhas = sum(info['linhas_total'] for info in tabelas.values()) or 1
+        processadas = 0
+
+        # Chaves das tabelas-pai: do próprio backup ou, se ausentes dele, dos dados atuais
+        chaves = {
+            'turmas': None if 'turmas' in tabelas else _chaves_atuais('turmas', 'nome_turma'),
+            'alunos': set() if 'alunos' in tabelas else _chaves_atuais('alunos', 'id_aluno')
+        }
+        removidos = {}
+        prontos = []
+
+        for membro in membros:
+            if membro.name.endswith('.removidos.npy'):
+                removidos[membro.name[:-len('.removidos.npy')]] = np.load(BytesIO(tar.extractfile(membro).read()))
+                continue
+            table_name, _, extensao = membro.name.rpartition('.')
+            if extensao not in BACKUP_DATA_FORMATS.values() or table_name not in tabelas:
+                raise ValueError(f"Membro inesperado no backup: {membro.name}")
+
+            info = tabelas[table_name]
+            colunas = info['colunas']
+            faltando = set(RESTORE_REQUIRED_COLUMNS.get(table_name, [])) - set(colunas)
+            erros = [f"Colunas obrigatórias ausentes: {', '.join(sorted(faltando))}"] if faltando else []
+            avisos = []
+            if table_name == 'turmas':
+                chaves['turmas'] = set()
+
+            def blocos():
+                # Incremental: linhas atuais (exceto as removidas) seguidas das novas/alteradas;
+                # tabelas sem estado na base vêm completas e substituem as atuais
+                if incremental and table_name in manifest['base_tabelas']:
+                    hashes_removidos = removidos.get(table_name, np.array([], dtype=np.uint64))
+                    for chunk in iter_table_chunks(table_name):
+                        yield chunk[~np.isin(hash_rows(chunk), hashes_removidos)]
+                if extensao == 'parquet':
+                    # O Parquet precisa de acesso aleatório: o membro vai para o disco e é lido por row group
+                    caminho_parquet = os.path.join(tmp_dir, membro.name)
+                    with open(caminho_parquet, 'wb') as destino:
+                        shutil.copyfileobj(tar.extractfile(membro), destino)
+                    for lote in pq.ParquetFile(caminho_parquet).iter_batches(batch_size=CHUNK_SIZE):
+                        yield lote.to_pandas().reindex(columns=colunas).fillna('').astype(str)
+                    return
+                linhas_json = iter(tar.extractfile(membro))
+                while True:
+                    registros = [json.loads(linha) for linha in islice(linhas_json, CHUNK_SIZE)]
+                    if not registros:
+                        break
+                    yield pd.DataFrame.from_records(registros, columns=colunas).fillna('').astype(str)
+
+            caminho_tabela = os.path.join(tmp_dir, f"{table_name}.csv")
+            linhas = 0
+            with open(caminho_tabela, 'w', encoding='utf-8', newline='') as f:
+                for chunk in blocos():
+                    if not faltando:
+                        erros_chunk, avisos_chunk = _validar_chunk(table_name, chunk, chaves)
+                        erros.extend(erros_chunk[:MAX_ERROS_TABELA - len(erros)])
+                        avisos.extend(avisos_chunk[:MAX_ERROS_TABELA - len(avisos)])
+                        if table_name == 'turmas':
+                            chaves['turmas'].update(chunk['nome_turma'])
+                        elif table_name == 'alunos':
+                            chaves['alunos'].update(chunk['id_aluno'])
+                    chunk.to_csv(f, index=False, header=linhas == 0)
+                    linhas += len(chunk)
+                    processadas += len(chunk)
+                    if progresso:
+                        progresso(min(processadas / total_linhas, 1.0), f"Validando {table_name}...")
+                if linhas == 0:
+                    f.write(','.join(colunas) + '\n')
+
+            relatorio['tabelas'][table_name] = {'linhas': linhas, 'erros': erros, 'avisos': avisos}
+            prontos.append((table_name, caminho_tabela))
+
+        relatorio['valido'] = all(
+            not info['erros'] and not (estrito and info['avisos'])
+            for info in relatorio['tabelas'].values()
+        )
+        if not relatorio['valido'] or dry_run:
+            logger.info(f"Restauração {'simulada' if dry_run else 'abortada'}: {relatorio}")
+            return relatorio
+
+        for table_name, caminho_tabela in prontos:
+            if progresso:
+                progresso(1.0, f"Gravando {table_name}...")
+            if not db_manager.replace_table(table_name, caminho_tabela, relatorio['tabelas'][table_name]['linhas']):
+                raise RuntimeError(f"Falha ao gravar a tabela '{table_name}'.")
+        relatorio['aplicado'] = True
+
+    logger.info(f"Backup restaurado ({manifest['tipo']}): {list(relatorio['tabelas'])}")
+    return relatorio
+
+
+def _conferir_base(manifest: Dict[str, any]):
+    """Garante que os dados atuais são o estado base do backup incremental."""
+    base = manifest.get('base')
+    assinaturas = manifest.get('base_tabelas')
+    if not assinaturas:
+        raise ValueError(
+            f"Backup incremental sem assinatura da base ({base}): restaure um backup completo mais recente."
+        )
+    divergentes = [
+        table_name for table_name, assinatura in assinaturas.items()
+        if assinatura_tabela(table_name) != assinatura
+    ]
+    if divergentes:
+        raise ValueError(
+            f"Os dados atuais de {', '.join(divergentes)} não correspondem ao backup base ({base}). "
+            "Restaure primeiro o backup base e os incrementais anteriores, em ordem."
+        )
\ No newline at end of file
@@ -0,0 +1,118 @@
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+from typing import Callable, Dict, Optional, Tuple
+import logging
+
+from utils.tiered_cache import TieredCache
+
+logger = logging.getLogger(__name__)
+
+# Máximo de pontos por série nas linhas do tempo: acima disso os registros são
+# agregados em períodos maiores (semana, mês...), qualquer que seja o intervalo
+TIMELINE_MAX_POINTS = 400
+# Períodos de agregação, do mais fino ao mais grosso
+TIMELINE_PERIODOS = [('D', 'dia'), ('W', 'semana'), ('M', 'mês'), ('Q', 'trimestre'), ('Y', 'ano')]
+
+
+def _tamanho_figura(figura: Optional[go.Figure]) -> int:
+    # Tamanho do JSON enviado ao navegador (o que o st.plotly_chart serializa a cada rerun)
+    return len(pio.to_json(figura, validate=False)) if figura is not None else 0
+
+
+# Figuras prontas, compartilhadas entre sessões (o st.plotly_chart serializa uma cópia,
+# então a mesma figura pode ser exibida por várias sessões)
+figure_cache = TieredCache('graficos', max_bytes=64 * 1024 * 1024, medir=_tamanho_figura)
+
+
+def cached_figure(chart_id: str, versao: str, build: Callable[[], Optional[go.Figure]],
+                  **filtros) -> Optional[go.Figure]:
+    """Figura do gráfico `chart_id` para os filtros e a versão dos dados informados.
+
+    build (agregação + construção da figura) só roda quando algum deles muda;
+    mexer em um controle que não afeta o gráfico reaproveita a figura pronta.
+    build pode retornar None quando não há dados para o gráfico.
+    """
+    return figure_cache.get_or_compute((chart_id, versao, tuple(sorted(filtros.items()))), build)
+
+
+def timeline_counts(df: pd.DataFrame, max_pontos: int = TIMELINE_MAX_POINTS,
+                    periodo_minimo: str = 'D') -> Tuple[pd.DataFrame, str]:
+    """Registros por período e status ('data', 'status', 'count'), com zeros preenchidos.
+
+    Usa o período mais fino (a partir de periodo_minimo) em que o intervalo de
+    datas cabe em max_pontos por série. Retorna também o nome do período usado.
+    """
+    frequencias = [freq for freq, _ in TIMELINE_PERIODOS]
+    periodos = TIMELINE_PERIODOS[frequencias.index(periodo_minimo):]
+    if df.empty:
+        return pd.DataFrame(columns=['data', 'status', 'count']), periodos[0][1]
+    
+    inicio, fim = df['data'].min(), df['data'].max()
+    for freq, nome in periodos:
+        if len(pd.period_range(inicio, fim, freq=freq)) <= max_pontos:
+            break
+    datas = df['data'].dt.floor('D') if freq == 'D' else df['data'].dt.to_period(freq).dt.start_time
+    contagem = df.groupby([datas.rename('data'), 'status']).size().unstack(fill_value=0)
+    return contagem.stack().rename('count').reset_index(), nome
+
+
+def timeline_chart(chart_id: str, versao: str, df: pd.DataFrame, titulo: str, cores: Dict[str, str],
+                   max_pontos: int = TIMELINE_MAX_POINTS, periodo_minimo: str = 'D', **filtros):
+    """Linha do tempo de registros por status, limitada a max_pontos por série.
+
+    Arrastar uma seleção (caixa) no gráfico detalha o intervalo escolhido, com
+    períodos mais finos; o zoom vale enquanto os filtros da página não mudam.
+    """
+    filtros_atuais = tuple(sorted(filtros.items()))
+    zoom = st.session_state.get(f"{chart_id}.zoom")
+    intervalo = zoom['intervalo'] if zoom and zoom['filtros'] == filtros_atuais else None
+    
+    def build():
+        dados = df if intervalo is None else df[(df['data'] >= intervalo[0]) & (df['data'] <= intervalo[1])]
+        contagem, periodo = timeline_counts(dados, max_pontos, periodo_minimo)
+        if contagem.empty:
+            return None
+        fig = px.line(
+            contagem,
+            x='data',
+            y='count',
+            color='status',
+            title=f"{titulo} (por {periodo})",
+            labels={'data': 'Data', 'count': 'Registros', 'status': 'Status'},
+            color_discrete_map=cores
+        )
+        fig.update_layout(height=400, dragmode='select')
+        return fig
+    
+    fig = cached_figure(chart_id, versao, build, intervalo=intervalo, max_pontos=max_pontos, **filtros)
+    if fig is None:
+        st.info("📅 Nenhum registro no intervalo selecionado.")
+    else:
+        # A chave muda a cada zoom: o novo gráfico começa sem a seleção anterior
+        evento = st.plotly_chart(
+            fig, use_container_width=True, on_select="rerun", selection_mode="box",
+            key=f"{chart_id}.grafico.{st.session_state.get(f'{chart_id}.geracao', 0)}"
+        )
+        caixas = evento.selection.box if evento else []
+        if caixas:
+            x0, x1 = sorted(pd.Timestamp(x) for x in caixas[0]['x'])
+            _definir_zoom(chart_id, {'filtros': filtros_atuais, 'intervalo': (x0.floor('D'), x1.ceil('D'))})
+    
+    if intervalo is not None:
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.caption(f"🔍 Detalhando {intervalo[0]:%d/%m/%Y} a {intervalo[1]:%d/%m/%Y}.")
+        with col2:
+            if st.button("Ver período completo", key=f"{chart_id}.completo"):
+                _definir_zoom(chart_id, None)
+    else:
+        st.caption("Arraste uma seleção no gráfico para detalhar um intervalo.")
+
+
+def _definir_zoom(chart_id: str, zoom: Optional[Dict[str, any]]):
+    st.session_state[f"{chart_id}.zoom"] = zoom
+    st.session_state[f"{chart_id}.geracao"] = st.session_state.get(f"{chart_id}.geracao", 0) + 1
+    st.rerun()
\ No newline at end of file
@@ -1,13 +1,17 @@
 import pandas as pd
-import gspread
-from google.oauth2.service_account import Credentials
 import streamlit as st
 import os
+import atexit
 import hashlib
+import threading
 from datetime import datetime
-from typing import Optional, Dict, List
+from typing import Callable, Optional, Dict, List
 import logging
 
+from utils.metrics import metrics
+from utils.snapshots import SNAPSHOT_MIN_BYTES, snapshot_store
+from utils.manifest import file_version, manifest
+
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,7 +22,18 @@ DATA_FILES = {
     'turmas': "data/turmas.csv", 
     'alunos': "data/alunos.csv",
     'frequencia': "data/frequencia.csv",
-    'logs': "data/system_logs.csv"
+    'logs': "data/system_logs.csv",
+    'professor_turmas': "data/professor_turmas.csv"
+}
+
+# Versão do schema de cada tabela, registrada no manifesto (incrementar ao mudar as colunas)
+SCHEMA_VERSIONS = {
+    'users': 1,
+    'turmas': 1,
+    'alunos': 1,
+    'frequencia': 1,
+    'logs': 1,
+    'professor_turmas': 1
 }
 
 # Constantes para compatibilidade com código existente
@@ -26,6 +41,12 @@ USERS_FILE = "data/users.csv"
 TURMAS_FILE = "data/turmas.csv"
 ALUNOS_FILE = "data/alunos.csv"
 FREQUENCIA_FILE = "data/frequencia.csv"
+PROFESSOR_TURMAS_FILE = "data/professor_turmas.csv"
+
+# Gravação adiada do último login e dos logs: a cada intervalo (segundos)
+# ou ao acumular este número de itens pendentes
+PENDING_WRITES_INTERVAL = 30
+PENDING_WRITES_BATCH = 50
 
 # Níveis de acesso
 ACCESS_LEVELS = {
@@ -132,6 +153,22 @@ class DatabaseManager:
     
     def __init__(self):
         self._gspread_client = None
+        self._roster_index = None
+        self._roster_lock = threading.Lock()
+        self._frequencia_index = None
+        self._frequencia_lock = threading.Lock()
+        self._frequencia_rebuild = None
+        self._bootstrapped = False
+        self._bootstrap_lock = threading.Lock()
+        self._user_directory = None
+        self._user_lock = threading.Lock()
+        self._user_listeners: List[Callable[[List[str]], None]] = []
+        self._pending_logins: Dict[str, str] = {}
+        self._pending_logs: List[Dict[str, str]] = []
+        self._pending_lock = threading.Lock()
+        self._flush_timer = None
+        # Uma trava de escrita por tabela: leituras-modificações-gravações não se sobrepõem
+        self._table_locks = {tabela: threading.RLock() for tabela in DATA_FILES}
         self._use_google_sheets = st.secrets.get("use_google_sheets", False)
         self.setup_data_directory()
     
@@ -162,10 +199,15 @@ class DatabaseManager:
                 "https://www.googleapis.com/auth/spreadsheets",
                 "https://www.googleapis.com/auth/drive"
             ]
-            credentials = Credentials.from_service_account_info(
-                credentials_dict, scopes=scopes
-            )
-            return gspread.authorize(credentials)
+            # Importados só quando o Google Sheets está ativo (evita o custo na inicialização)
+            import gspread
+            from google.oauth2.service_account import Credentials
+            
+            with metrics.measure("sheets.connect"):
+                credentials = Credentials.from_service_account_info(
+                    credentials_dict, scopes=scopes
+                )
+                return gspread.authorize(credentials)
         except Exception as e:
             logger.error(f"Erro ao conectar com Google Sheets: {e}")
             st.error(f"Erro ao conectar com Google Sheets: {e}")
@@ -177,6 +219,7 @@ class DatabaseManager:
             os.makedirs('data')
             logger.info("Diretório 'data' criado")
     
+    @metrics.timed("db.read.{table_name}")
     def get_data(self, table_name: str) -> pd.DataFrame:
         """Lê dados de uma tabela (CSV ou Google Sheets)."""
         file_path = DATA_FILES.get(table_name)
@@ -187,19 +230,34 @@ class DatabaseManager:
         # Tentar Google Sheets primeiro
         if self._use_google_sheets and self.gspread_client:
             try:
-                sheet = self.gspread_client.open_by_key(st.secrets["google_sheets_key"])
-                worksheet = sheet.worksheet(table_name)
-                data = worksheet.get_all_records()
+                with metrics.measure(f"sheets.read.{table_name}"):
+                    sheet = self.gspread_client.open_by_key(st.secrets["google_sheets_key"])
+                    worksheet = sheet.worksheet(table_name)
+                    data = worksheet.get_all_records()
                 df = pd.DataFrame(data)
+                metrics.increment('rows_loaded_total', len(df), table=table_name, source='sheets')
                 logger.info(f"Dados lidos do Google Sheets: {table_name}")
                 return df
             except Exception as e:
                 logger.warning(f"Erro ao ler do Google Sheets ({table_name}): {e}")
         
-        # Fallback para CSV
+        # Fallback para CSV; tabelas grandes são lidas do snapshot Arrow da mesma
+        # versão (memory-map, sem parse), inclusive após reiniciar o servidor
+        versao = self.get_data_version(table_name)
+        usa_snapshot = self._usa_snapshot(file_path)
+        if usa_snapshot:
+            snapshot = snapshot_store.load(f"tabela.{table_name}", versao)
+            if snapshot is not None:
+                metrics.increment('rows_loaded_total', len(snapshot[0]), table=table_name, source='snapshot')
+                return snapshot[0]
         try:
-            df = pd.read_csv(file_path)
+            with metrics.measure(f"csv.read.{table_name}") as medicao:
+                df = pd.read_csv(file_path)
+                medicao.bytes = os.path.getsize(file_path)
+            metrics.increment('rows_loaded_total', len(df), table=table_name, source='csv')
             logger.info(f"Dados lidos do CSV: {file_path}")
+            if usa_snapshot:
+                snapshot_store.save_async(f"tabela.{table_name}", df, versao)
             return df
         except FileNotFoundError:
             logger.warning(f"Arquivo não encontrado: {file_path}")
@@ -207,69 +265,447 @@ class DatabaseManager:
         except Exception as e:
             logger.error(f"Erro ao ler CSV ({file_path}): {e}")
             return pd.DataFrame()
-    
-    def save_data(self, df: pd.DataFrame, table_name: str) -> bool:
-        """Salva dados em uma tabela (CSV ou Google Sheets)."""
+
+    def _usa_snapshot(self, file_path: str) -> bool:
+        try:
+            return os.path.getsize(file_path) >= SNAPSHOT_MIN_BYTES
+        except OSError:
+            return False
+
+    def get_data_version(self, table_name: str) -> str:
+        """Retorna um identificador da versão atual de uma tabela.
+
+        Baseado no mtime/tamanho do CSV, que é sempre regravado por save_data
+        (inclusive quando o Google Sheets está ativo).
+        """
+        file_path = DATA_FILES.get(table_name)
+        if not file_path:
+            return ""
+        try:
+            stat = os.stat(file_path)
+            return f"{stat.st_mtime_ns}-{stat.st_size}"
+        except OSError:
+            return "0"
+
+    @metrics.timed("cache.roster_index")
+    def get_roster_index(self) -> Dict[str, any]:
+        """Retorna o índice de alunos, reconstruído apenas quando a tabela muda."""
+        versao = self.get_data_version('alunos')
+        with self._roster_lock:
+            valido = self._roster_index is not None and self._roster_index['versao'] == versao
+            metrics.increment('cache_lookups_total', cache='roster_index', table='alunos',
+                              result='hit' if valido else 'miss')
+            if not valido:
+                self._roster_index = self._build_roster_index(self.get_data('alunos'), versao)
+            return self._roster_index
+
+    def _build_roster_index(self, df_alunos: pd.DataFrame, versao: str) -> Dict[str, any]:
+        """Monta os mapas turma → alunos e id_aluno → registro do aluno."""
+        if df_alunos.empty or 'id_aluno' not in df_alunos.columns:
+            df_alunos = pd.DataFrame(columns=['id_aluno', 'nome', 'turma'])
+        
+        por_id = df_alunos.drop_duplicates('id_aluno', keep='last').set_index('id_aluno', drop=False)
+        por_turma = (
+            {turma: grupo for turma, grupo in df_alunos.groupby('turma', sort=False)}
+            if 'turma' in df_alunos.columns else {}
+        )
+        logger.info(f"Índice de alunos reconstruído: {len(por_id)} alunos, {len(por_turma)} turmas")
+        return {
+            'versao': versao,
+            'alunos': df_alunos,
+            'por_id': por_id,
+            'por_turma': por_turma
+        }
+
+    @metrics.timed("cache.frequencia_index")
+    def get_frequencia_index(self) -> Dict[str, any]:
+        """Retorna a frequência particionada por turma, reconstruída apenas quando frequência ou alunos mudam.
+
+        A partição é compartilhada pelo processo; cada sessão copia apenas as
+        turmas que pode acessar. Na primeira chamada do processo ela vem do
+        snapshot gravado na execução anterior: se a versão mudou, o snapshot é
+        servido enquanto a partição atual é montada em segundo plano.
+        """
+        versao = self._frequencia_version()
+        with self._frequencia_lock:
+            if self._frequencia_index is None:
+                self._frequencia_index = self._warm_start_frequencia_index(versao)
+            valido = self._frequencia_index is not None and self._frequencia_index['versao'] == versao
+            metrics.increment('cache_lookups_total', cache='frequencia_index', table='frequencia',
+                              result='hit' if valido else 'miss')
+            if not valido and self._frequencia_rebuild is None:
+                self._frequencia_index = self._build_frequencia_index(self.get_data('frequencia'), versao)
+            return self._frequencia_index
+
+    def serving_stale_frequencia(self) -> bool:
+        """Se a frequência servida ainda é a do snapshot anterior (reconstrução em andamento)."""
+        return self._frequencia_rebuild is not None
+
+    def _frequencia_version(self) -> str:
+        return f"{self.get_data_version('frequencia')}|{self.get_data_version('alunos')}"
+
+    def _warm_start_frequencia_index(self, versao: str) -> Optional[Dict[str, any]]:
+        snapshot = snapshot_store.load('frequencia_index')
+        if snapshot is None:
+            return None
+        df_frequencia, versao_snapshot = snapshot
+        if versao_snapshot != versao:
+            logger.info("Snapshot da frequência desatualizado: servindo-o enquanto a partição é reconstruída")
+            self._frequencia_rebuild = threading.Thread(
+                target=self._rebuild_frequencia_index, name="frequencia-rebuild", daemon=True
+            )
+            self._frequencia_rebuild.start()
+        return self._partition_frequencia(df_frequencia, versao_snapshot)
+
+    def _rebuild_frequencia_index(self):
+        indice = None
+        try:
+            versao = self._frequencia_version()
+            indice = self._build_frequencia_index(self.get_data('frequencia'), versao)
+        except Exception as e:
+            logger.error(f"Erro ao reconstruir a partição da frequência: {e}")
+        finally:
+            with self._frequencia_lock:
+                if indice is not None:
+                    self._frequencia_index = indice
+                self._frequencia_rebuild = None
+
+    def _build_frequencia_index(self, df_frequencia: pd.DataFrame, versao: str) -> Dict[str, any]:
+        """Anexa a turma de cada registro (pelo índice de alunos) e separa a frequência por turma."""
+        if df_frequencia.empty or 'id_aluno' not in df_frequencia.columns:
+            return self._partition_frequencia(pd.DataFrame(), versao)
+        
+        df_frequencia = df_frequencia.assign(
+            turma=df_frequencia['id_aluno'].map(self.get_roster_index()['por_id']['turma']),
+            data=pd.to_datetime(df_frequencia['data'])
+        )
+        snapshot_store.save_async('frequencia_index', df_frequencia, versao)
+        return self._partition_frequencia(df_frequencia, versao)
+
+    def _partition_frequencia(self, df_frequencia: pd.DataFrame, versao: str) -> Dict[str, any]:
+        colunas = ['id_aluno', 'data', 'status', 'justificativa', 'professor', 'turma']
+        if df_frequencia.empty or 'turma' not in df_frequencia.columns:
+            return {'versao': versao, 'colunas': colunas, 'por_turma': {}}
+        por_turma = {turma: grupo for turma, grupo in df_frequencia.groupby('turma', sort=False)}
+        logger.info(f"Frequência particionada: {len(df_frequencia)} registros em {len(por_turma)} turmas")
+        return {'versao': versao, 'colunas': df_frequencia.columns.tolist(), 'por_turma': por_turma}
+
+    def get_professor_turmas(self, username: str) -> List[str]:
+        """Turmas atribuídas a um professor na tabela professor_turmas."""
+        atribuicoes = self.get_data('professor_turmas')
+        if atribuicoes.empty or 'username' not in atribuicoes.columns:
+            return []
+        return atribuicoes.loc[atribuicoes['username'] == username, 'turma'].dropna().astype(str).unique().tolist()
+
+    @metrics.timed("cache.user_directory")
+    def get_user_directory(self) -> Dict[str, Dict[str, any]]:
+        """Retorna o diretório username → {password, role, name, active}, recarregado só quando a tabela muda."""
+        versao = self.get_data_version('users')
+        with self._user_lock:
+            valido = self._user_directory is not None and self._user_directory['versao'] == versao
+            metrics.increment('cache_lookups_total', cache='user_directory', table='users',
+                              result='hit' if valido else 'miss')
+            if not valido:
+                self._user_directory = {
+                    'versao': versao,
+                    'usuarios': self._build_user_directory(self.get_data('users'))
+                }
+            return self._user_directory['usuarios']
+
+    def add_user_listener(self, func: Callable[[List[str]], None]):
+        """Registra func(usernames), chamada quando save_data altera senha, perfil ou status de usuários."""
+        self._user_listeners.append(func)
+
+    def _notify_user_changes(self, anterior: Dict[str, Dict[str, any]]):
+        atual = self.get_user_directory()
+        alterados = [
+            username for username, dados in anterior.items()
+            if username not in atual
+            or any(dados[campo] != atual[username][campo] for campo in ('password', 'role', 'active'))
+        ]
+        if not alterados:
+            return
+        for func in self._user_listeners:
+            try:
+                func(alterados)
+            except Exception as e:
+                logger.error(f"Erro ao notificar alteração de usuários: {e}")
+
+    def _build_user_directory(self, users_df: pd.DataFrame) -> Dict[str, Dict[str, any]]:
+        if users_df.empty or 'username' not in users_df.columns:
+            return {}
+        
+        diretorio = {}
+        for user in users_df.drop_duplicates('username').to_dict('records'):
+            diretorio[str(user['username'])] = {
+                'password': user.get('password', ''),
+                'role': user.get('role', ''),
+                'name': user.get('name', user['username']),
+                'active': self._is_active(user.get('active', True))
+            }
+        logger.info(f"Diretório de usuários carregado: {len(diretorio)} usuários")
+        return diretorio
+
+    @staticmethod
+    def _is_active(valor) -> bool:
+        """Interpreta a coluna 'active' (bool do CSV ou texto do Google Sheets)."""
+        if isinstance(valor, str):
+            return valor.strip().lower() not in ('false', '0', 'no', 'não', '')
+        return True if pd.isna(valor) else bool(valor)
+
+    def record_login(self, username: str):
+        """Agenda a atualização de last_login (gravada em lote, fora da requisição de login)."""
+        with self._pending_lock:
+            self._pending_logins[username] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        with self._pending_lock:
+            pendentes = len(self._pending_logins) + len(self._pending_logs)
+            if pendentes >= PENDING_WRITES_BATCH:
+                if self._flush_timer is not None:
+                    self._flush_timer.cancel()
+                self._flush_timer = threading.Timer(0, self.flush_pending_writes)
+            elif self._flush_timer is None:
+                self._flush_timer = threading.Timer(PENDING_WRITES_INTERVAL, self.flush_pending_writes)
+            else:
+                return
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def flush_pending_writes(self):
+        """Grava de uma vez os last_login e logs pendentes (uma regravação por tabela)."""
+        with self._pending_lock:
+            logins, self._pending_logins = self._pending_logins, {}
+            logs, self._pending_logs = self._pending_logs, []
+            self._flush_timer = None
+        if not logins and not logs:
+            return
+        
+        if logins:
+            try:
+                self.update_table('users', lambda users_df: self._apply_logins(users_df, logins))
+            except Exception as e:
+                logger.error(f"Erro ao gravar último login: {e}")
+        
+        if logs:
+            try:
+                self.update_table('logs', lambda logs_df: self._append_logs(logs_df, logs))
+            except Exception as e:
+                logger.error(f"Erro ao registrar logs: {e}")
+        logger.info(f"Gravações pendentes concluídas: {len(logins)} logins, {len(logs)} logs")
+
+    def update_table(self, table_name: str, func: Callable[[pd.DataFrame], Optional[pd.DataFrame]],
+                     notify: bool = False) -> bool:
+        """Lê a tabela, aplica func (DataFrame → DataFrame ou None para não gravar) e grava.
+
+        Leitura e gravação acontecem sob a trava de escrita da tabela, a mesma
+        de save_data: nenhuma gravação concorrente é sobrescrita com dados antigos.
+        """
+        with self._table_locks[table_name]:
+            df = func(self.get_data(table_name))
+            if df is None:
+                return False
+            return self.save_data(df, table_name, notify=notify)
+
+    @staticmethod
+    def _apply_logins(users_df: pd.DataFrame, logins: Dict[str, str]) -> Optional[pd.DataFrame]:
+        if users_df.empty:
+            return None
+        if 'last_login' not in users_df.columns:
+            users_df['last_login'] = ""
+        users_df['last_login'] = users_df['last_login'].astype(object)
+        novos = users_df['username'].map(logins)
+        users_df['last_login'] = novos.fillna(users_df['last_login'])
+        return users_df
+
+    @staticmethod
+    def _append_logs(logs_df: pd.DataFrame, logs: List[Dict[str, str]]) -> pd.DataFrame:
+        if logs_df.empty:
+            logs_df = pd.DataFrame(columns=['timestamp', 'username', 'action', 'details'])
+        return pd.concat([logs_df, pd.DataFrame(logs)], ignore_index=True)
+
+    @metrics.timed("db.write.{table_name}")
+    def save_data(self, df: pd.DataFrame, table_name: str, notify: bool = True) -> bool:
+        """Salva dados em uma tabela (CSV ou Google Sheets).
+
+        notify=False suprime as mensagens na interface (gravações em segundo plano).
+        """
         file_path = DATA_FILES.get(table_name)
         if not file_path:
             logger.error(f"Tabela '{table_name}' não reconhecida")
             return False
         
+        with self._table_locks[table_name]:
+            if table_name != 'users':
+                return self._write_table(df, table_name, file_path, notify)
+            anterior = self.get_user_directory()
+            success = self._write_table(df, table_name, file_path, notify)
+            self._notify_user_changes(anterior)
+            return success
+
+    def _write_table(self, df: pd.DataFrame, table_name: str, file_path: str, notify: bool) -> bool:
         success = False
         
         # Tentar Google Sheets primeiro
         if self._use_google_sheets and self.gspread_client:
             try:
-                sheet = self.gspread_client.open_by_key(st.secrets["google_sheets_key"])
-                worksheet = sheet.worksheet(table_name)
-                
-                # Limpar e atualizar worksheet
-                worksheet.clear()
-                if not df.empty:
-                    data = [df.columns.tolist()] + df.values.tolist()
-                    worksheet.update(data)
+                with metrics.measure(f"sheets.write.{table_name}"):
+                    sheet = self.gspread_client.open_by_key(st.secrets["google_sheets_key"])
+                    worksheet = sheet.worksheet(table_name)
+                    
+                    # Limpar e atualizar worksheet
+                    worksheet.clear()
+                    if not df.empty:
+                        data = [df.columns.tolist()] + df.values.tolist()
+                        worksheet.update(data)
                 
+                metrics.increment('rows_written_total', len(df), table=table_name, destination='sheets')
                 logger.info(f"Dados salvos no Google Sheets: {table_name}")
-                st.success(f"Dados salvos no Google Sheets: {table_name}")
+                if notify:
+                    st.success(f"Dados salvos no Google Sheets: {table_name}")
                 success = True
             except Exception as e:
                 logger.error(f"Erro ao salvar no Google Sheets ({table_name}): {e}")
-                st.error(f"Erro ao salvar no Google Sheets: {e}")
+                if notify:
+                    st.error(f"Erro ao salvar no Google Sheets: {e}")
         
-        # Salvar em CSV como backup ou método principal
+        # Salvar em CSV como backup ou método principal (arquivo temporário +
+        # os.replace: leitores concorrentes nunca veem o arquivo pela metade)
         try:
-            df.to_csv(file_path, index=False, encoding='utf-8')
+            with metrics.measure(f"csv.write.{table_name}") as medicao:
+                tmp_path = f"{file_path}.{threading.get_ident()}.tmp"
+                df.to_csv(tmp_path, index=False, encoding='utf-8')
+                medicao.bytes = os.path.getsize(tmp_path)
+                os.replace(tmp_path, file_path)
+            metrics.increment('rows_written_total', len(df), table=table_name, destination='csv')
+            manifest.record(table_name, file_path, len(df), df.columns, SCHEMA_VERSIONS.get(table_name, 1))
             logger.info(f"Dados salvos em CSV: {file_path}")
-            if not success:  # Só mostrar sucesso se Google Sheets falhou
+            if not success and notify:  # Só mostrar sucesso se Google Sheets falhou
                 st.success(f"Dados salvos em {file_path}")
             success = True
         except Exception as e:
             logger.error(f"Erro ao salvar CSV ({file_path}): {e}")
-            if not success:
+            if not success and notify:
                 st.error(f"Erro ao salvar dados: {e}")
         
         return success
-    
-    def log_action(self, username: str, action: str, details: str = ""):
-        """Registra ações do usuário no sistema."""
+
+    def table_info(self, table_name: str) -> Dict[str, any]:
+        """Linhas, bytes, hash e schema da tabela pelo manifesto.
+
+        A tabela só é carregada quando o manifesto não corresponde ao arquivo
+        atual (gravado fora de save_data, ex.: restauração de backup ou generate_data).
+        Com o Google Sheets como fonte, linhas e colunas são as da última gravação
+        pelo app (save_data também regrava a cópia em CSV) e não há hash: a
+        planilha pode ter sido editada diretamente.
+        """
+        file_path = DATA_FILES.get(table_name)
+        if not file_path:
+            return {}
+        entrada = manifest.entry(table_name, file_path)
+        if entrada is None and os.path.exists(file_path):
+            versao = file_version(file_path)
+            # Com o Google Sheets ativo, get_data leria a planilha: usa-se a cópia local
+            df = pd.read_csv(file_path) if self._use_google_sheets else self.get_data(table_name)
+            if file_version(file_path) == versao:
+                entrada = manifest.record(
+                    table_name, file_path, len(df), df.columns, SCHEMA_VERSIONS.get(table_name, 1)
+                )
+        if entrada and self._use_google_sheets:
+            entrada = dict(entrada, sha256=None)
+        return entrada or {}
+
+    def replace_table(self, table_name: str, source_path: str, rows: Optional[int] = None) -> bool:
+        """Substitui uma tabela inteira pelo CSV já validado em source_path.
+
+        Sem Google Sheets, o CSV é trocado com os.replace (atômico, sem carregar
+        a tabela em memória); com Google Sheets, a gravação passa por save_data.
+        Como em save_data, a troca acontece sob a trava da tabela, é registrada
+        no manifesto e, na tabela de usuários, notifica os ouvintes. rows evita
+        recontar as linhas do arquivo quando quem chama já as conhece.
+        """
+        file_path = DATA_FILES.get(table_name)
+        if not file_path:
+            logger.error(f"Tabela '{table_name}' não reconhecida")
+            return False
+        
+        if self._use_google_sheets and self.gspread_client:
+            df = pd.read_csv(source_path, dtype=str, keep_default_na=False)
+            success = self.save_data(df, table_name)
+            os.remove(source_path)
+            return success
+        
         try:
-            logs_df = self.get_data('logs')
-            if logs_df.empty:
-                logs_df = pd.DataFrame(columns=['timestamp', 'username', 'action', 'details'])
-            
-            new_log = pd.DataFrame({
-                'timestamp': [datetime.now().strftime("%Y-%m-%d %H:%M:%S")],
-                'username': [username],
-                'action': [action],
-                'details': [details]
-            })
-            
-            logs_df = pd.concat([logs_df, new_log], ignore_index=True)
-            self.save_data(logs_df, 'logs')
-            logger.info(f"Ação registrada: {username} - {action}")
-        except Exception as e:
-            logger.error(f"Erro ao registrar log: {e}")
+            colunas = pd.read_csv(source_path, dtype=str, nrows=0).columns
+            if rows is None:
+                rows = sum(len(chunk) for chunk in pd.read_csv(
+                    source_path, dtype=str, usecols=[0], keep_default_na=False, chunksize=100_000
+                )) if len(colunas) else 0
+        except (OSError, ValueError) as e:
+            logger.error(f"Erro ao ler tabela para substituição ({source_path}): {e}")
+            return False
+        
+        with self._table_locks[table_name]:
+            anterior = self.get_user_directory() if table_name == 'users' else None
+            try:
+                os.replace(source_path, file_path)
+            except OSError as e:
+                logger.error(f"Erro ao substituir tabela ({file_path}): {e}")
+                return False
+            manifest.record(table_name, file_path, rows, colunas, SCHEMA_VERSIONS.get(table_name, 1))
+            logger.info(f"Tabela substituída: {file_path}")
+            if anterior is not None:
+                self._notify_user_changes(anterior)
+            return True
+    
+    def log_action(self, username: str, action: str, details: str = "", adiar: bool = False):
+        """Registra ações do usuário no sistema.
+
+        Por padrão o log é gravado na hora; adiar=True (usado no login) o deixa
+        para a próxima gravação em lote de flush_pending_writes.
+        """
+        registro = {
+            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'username': username,
+            'action': action,
+            'details': details
+        }
+        if adiar:
+            with self._pending_lock:
+                self._pending_logs.append(registro)
+            self._schedule_flush()
+        else:
+            try:
+                self.update_table('logs', lambda logs_df: self._append_logs(logs_df, [registro]))
+            except Exception as e:
+                logger.error(f"Erro ao registrar log: {e}")
+                return
+        logger.info(f"Ação registrada: {username} - {action}")
     
+    def ensure_default_data(self):
+        """Executa setup_default_data uma única vez por processo (app.py chama a cada rerun)."""
+        if self._bootstrapped:
+            return
+        with self._bootstrap_lock:
+            if not self._bootstrapped:
+                self.setup_default_data()
+                self._bootstrapped = True
+
+    def _table_is_empty(self, table_name: str) -> bool:
+        """Se a tabela não tem registros, sem carregá-la (no CSV, basta ler a linha após o cabeçalho)."""
+        if self._use_google_sheets:
+            return self.get_data(table_name).empty
+        entrada = manifest.entry(table_name, DATA_FILES[table_name])
+        if entrada is not None:
+            return entrada['rows'] == 0
+        try:
+            with open(DATA_FILES[table_name], encoding='utf-8') as f:
+                f.readline()
+                return not f.readline().strip()
+        except OSError:
+            return True
+
     def setup_default_data(self):
         """Configura dados padrão do sistema."""
         self._setup_users()
@@ -277,11 +713,11 @@ class DatabaseManager:
         self._setup_alunos()
         self._setup_frequencia()
         self._setup_logs()
+        self._setup_professor_turmas()
     
     def _setup_users(self):
         """Configura tabela de usuários."""
-        users_df = self.get_data('users')
-        if users_df.empty:
+        if self._table_is_empty('users'):
             users_data = []
             for username, user_info in DEFAULT_USERS.items():
                 users_data.append({
@@ -300,8 +736,7 @@ class DatabaseManager:
     
     def _setup_turmas(self):
         """Configura tabela de turmas."""
-        turmas_df = self.get_data('turmas')
-        if turmas_df.empty:
+        if self._table_is_empty('turmas'):
             default_turmas = pd.DataFrame({
                 'id_turma': ['T001', 'T002', 'T003'],
                 'nome_turma': ['1º Ano A', '2º Ano A', '3º Ano A'],
@@ -314,8 +749,7 @@ class DatabaseManager:
     
     def _setup_alunos(self):
         """Configura tabela de alunos."""
-        alunos_df = self.get_data('alunos')
-        if alunos_df.empty:
+        if self._table_is_empty('alunos'):
             alunos_df = pd.DataFrame(columns=[
                 'id_aluno', 'nome', 'turma', 'data_nascimento', 
                 'responsavel', 'telefone', 'ativo', 'created_at'
@@ -325,8 +759,7 @@ class DatabaseManager:
     
     def _setup_frequencia(self):
         """Configura tabela de frequência."""
-        frequencia_df = self.get_data('frequencia')
-        if frequencia_df.empty:
+        if self._table_is_empty('frequencia'):
             frequencia_df = pd.DataFrame(columns=[
                 'id_registro', 'id_aluno', 'data', 'status', 
                 'justificativa', 'professor', 'created_at'
@@ -336,14 +769,34 @@ class DatabaseManager:
     
     def _setup_logs(self):
         """Configura tabela de logs."""
-        logs_df = self.get_data('logs')
-        if logs_df.empty:
+        if self._table_is_empty('logs'):
             logs_df = pd.DataFrame(columns=['timestamp', 'username', 'action', 'details'])
             self.save_data(logs_df, 'logs')
             st.info("Sistema de logs inicializado.")
+    
+    def _setup_professor_turmas(self):
+        """Configura a tabela de turmas atribuídas a cada professor."""
+        if not os.path.exists(DATA_FILES['professor_turmas']):
+            self.save_data(pd.DataFrame(columns=['username', 'turma']), 'professor_turmas', notify=False)
 
 # Funções utilitárias para compatibilidade com código existente
 db_manager = DatabaseManager()
+atexit.register(db_manager.flush_pending_writes)
+
+
+def _data_file_sizes() -> Dict[str, int]:
+    """Tamanho em bytes de cada arquivo de dados existente (gauge exportado com as métricas)."""
+    tamanhos = {}
+    for tabela, caminho in DATA_FILES.items():
+        try:
+            tamanhos[tabela] = os.path.getsize(caminho)
+        except OSError:
+            pass
+    return tamanhos
+
+
+metrics.register_gauge('data_file_bytes', _data_file_sizes, label='table')
+metrics.start_export()
 
 def get_data(file_name: str) -> pd.DataFrame:
     """Função de compatibilidade - usar db_manager.get_data()"""
@@ -353,41 +806,111 @@ def save_data(df: pd.DataFrame, file_name: str) -> bool:
     """Função de compatibilidade - usar db_manager.save_data()"""
     return db_manager.save_data(df, file_name.replace('.csv', '').replace('data/', ''))
 
+def get_data_version(*file_names: str) -> str:
+    """Retorna a versão combinada de uma ou mais tabelas (chave de cache).
+
+    Enquanto a frequência é servida do snapshot anterior, a versão leva um
+    marcador, para que os caches das páginas sejam refeitos ao fim da reconstrução.
+    """
+    tabelas = [file_name.replace('.csv', '').replace('data/', '') for file_name in file_names]
+    versao = "|".join(db_manager.get_data_version(tabela) for tabela in tabelas)
+    if 'frequencia' in tabelas and db_manager.serving_stale_frequencia():
+        versao += "|snapshot"
+    return versao
+
+def get_table_info(file_name: str) -> Dict[str, any]:
+    """Resumo da tabela pelo manifesto (ver DatabaseManager.table_info)."""
+    return db_manager.table_info(file_name.replace('.csv', '').replace('data/', ''))
+
+def get_manifest() -> Dict[str, Dict[str, any]]:
+    """Resumo de todas as tabelas existentes, por nome da tabela."""
+    tabelas = {}
+    for tabela in DATA_FILES:
+        info = db_manager.table_info(tabela)
+        if info:
+            tabelas[tabela] = info
+    return tabelas
+
 def setup_files():
-    """Função de compatibilidade - usar db_manager.setup_default_data()"""
-    return db_manager.setup_default_data()
+    """Função de compatibilidade - usar db_manager.ensure_default_data()"""
+    return db_manager.ensure_default_data()
+
+def get_roster_index() -> Dict[str, any]:
+    """Retorna o índice de alunos em memória (ver DatabaseManager.get_roster_index)."""
+    return db_manager.get_roster_index()
+
+def get_alunos() -> pd.DataFrame:
+    """Retorna a tabela de alunos a partir do índice em memória."""
+    return get_roster_index()['alunos'].copy()
 
 def get_alunos_by_turma(turma: str) -> pd.DataFrame:
     """Retorna os alunos de uma turma específica."""
-    df_alunos = db_manager.get_data('alunos')
-    if not df_alunos.empty and 'turma' in df_alunos.columns:
-        return df_alunos[df_alunos['turma'] == turma]
+    df_turma = get_roster_index()['por_turma'].get(turma)
+    if df_turma is not None:
+        return df_turma.copy()
     return pd.DataFrame()
 
+def add_aluno_info(df: pd.DataFrame, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Adiciona colunas do cadastro de alunos (por id_aluno) sem merge com a tabela de alunos."""
+    columns = columns or ['nome', 'turma']
+    por_id = get_roster_index()['por_id']
+    df = df.copy()
+    for column in columns:
+        if column in por_id.columns:
+            df[column] = df['id_aluno'].map(por_id[column])
+        else:
+            df[column] = None
+    return df
+
+def get_accessible_turmas(username: str, role: str) -> List[str]:
+    """Turmas visíveis para o usuário segundo ACCESS_LEVELS.
+
+    Perfis com permissão 'turmas' veem todas; professores veem apenas as
+    turmas atribuídas (nenhuma, enquanto não houver atribuição); demais, nenhuma.
+    """
+    turmas = get_data(TURMAS_FILE)
+    todas = turmas['nome_turma'].astype(str).tolist() if 'nome_turma' in turmas.columns else []
+    if has_permission(role, 'turmas'):
+        return todas
+    if not has_permission(role, 'frequencia') or not has_permission(role, 'alunos'):
+        return []
+    
+    atribuidas = db_manager.get_professor_turmas(username)
+    if not atribuidas:
+        logger.warning(f"Nenhuma turma atribuída a {username}")
+    return [turma for turma in todas if turma in atribuidas]
+
+def get_frequencia_turmas(turmas: List[str]) -> pd.DataFrame:
+    """Frequência (com coluna 'turma' e datas convertidas) apenas das turmas informadas."""
+    indice = db_manager.get_frequencia_index()
+    partes = [indice['por_turma'][turma] for turma in turmas if turma in indice['por_turma']]
+    if not partes:
+        return pd.DataFrame(columns=indice['colunas'])
+    return pd.concat(partes, ignore_index=True)
+
+def get_scoped_frequencia(username: str, role: str) -> pd.DataFrame:
+    """Frequência restrita às turmas que o usuário pode acessar."""
+    if not has_permission(role, 'frequencia'):
+        raise PermissionError(f"Perfil '{role}' sem acesso à frequência")
+    return get_frequencia_turmas(get_accessible_turmas(username, role))
+
 def authenticate_user(username: str, password: str) -> Dict[str, any]:
     """Autentica usuário e retorna informações se válido."""
-    # Primeiro tenta autenticação avançada
-    users_df = db_manager.get_data('users')
+    # Primeiro tenta autenticação avançada (diretório em memória)
+    user_data = db_manager.get_user_directory().get(username)
     
-    if not users_df.empty:
-        user_row = users_df[users_df['username'] == username]
-        if not user_row.empty:
-            user_data = user_row.iloc[0]
-            if user_data.get('active', True):
-                if db_manager.verify_password(password, user_data['password']):
-                    # Atualizar último login
-                    users_df.loc[users_df['username'] == username, 'last_login'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    db_manager.save_data(users_df, 'users')
-                    
-                    # Registrar login
-                    db_manager.log_action(username, 'LOGIN', 'Usuário autenticado com sucesso')
-                    
-                    return {
-                        'username': user_data['username'],
-                        'role': user_data['role'],
-                        'name': user_data['name'],
-                        'permissions': ACCESS_LEVELS.get(user_data['role'], [])
-                    }
+    if user_data and user_data['active']:
+        if db_manager.verify_password(password, user_data['password']):
+            # Último login e log gravados em lote, fora da requisição
+            db_manager.record_login(username)
+            db_manager.log_action(username, 'LOGIN', 'Usuário autenticado com sucesso', adiar=True)
+            
+            return {
+                'username': username,
+                'role': user_data['role'],
+                'name': user_data['name'],
+                'permissions': ACCESS_LEVELS.get(user_data['role'], [])
+            }
     
     # Fallback para autenticação simples (compatibilidade)
     if username in USERS and USERS[username]["password"] == password:
@@ -0,0 +1,251 @@
+import pandas as pd
+import numpy as np
+import re
+import pyarrow as pa
+import xlsxwriter
+from io import BytesIO
+from typing import Callable, Iterable, List, Optional
+import logging
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Opções do xlsxwriter para exportações grandes: as linhas são gravadas em
+# arquivo temporário à medida que são escritas, mantendo a memória constante.
+XLSX_OPTIONS = {
+    'constant_memory': True,
+    'default_date_format': 'dd/mm/yyyy',
+    'strings_to_numbers': False,
+}
+# Máximo de linhas de uma planilha do Excel (incluindo o cabeçalho); o xlsxwriter
+# ignora em silêncio as linhas além dele
+EXCEL_MAX_ROWS = 1_048_576
+
+
+def _valor_celula(valor):
+    """Converte valores do pandas para tipos aceitos pelo xlsxwriter."""
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return None
+    if isinstance(valor, pd.Timestamp):
+        return valor.to_pydatetime()
+    if hasattr(valor, 'item'):  # escalares numpy
+        return valor.item()
+    return valor
+
+
+def write_dataframe_rows(worksheet, df: pd.DataFrame, header_format=None, start_row: int = 0) -> int:
+    """Escreve cabeçalho e linhas em ordem (requisito do modo constant_memory). Retorna a próxima linha livre."""
+    worksheet.write_row(start_row, 0, [str(c) for c in df.columns], header_format)
+    row = start_row + 1
+    for valores in df.itertuples(index=False, name=None):
+        worksheet.write_row(row, 0, [_valor_celula(v) for v in valores])
+        row += 1
+    return row
+
+
+def dataframe_to_xlsx(df: pd.DataFrame, sheet_name: str = 'Dados') -> bytes:
+    """Gera um arquivo Excel, linha a linha, em modo de memória constante."""
+    return chunks_to_xlsx([df], df.columns.tolist(), sheet_name)
+
+
+def chunks_to_xlsx(chunks: Iterable[pd.DataFrame], colunas: List[str], sheet_name: str = 'Dados',
+                   max_rows: int = EXCEL_MAX_ROWS) -> bytes:
+    """Gera um arquivo Excel a partir de blocos de linhas, sem reuni-los em memória.
+
+    Cada bloco é reordenado para `colunas`. Ao atingir max_rows, as linhas
+    continuam em uma nova planilha com o mesmo cabeçalho ('Dados (2)', ...).
+    """
+    output = BytesIO()
+    workbook = xlsxwriter.Workbook(output, XLSX_OPTIONS)
+    header_format = workbook.add_format({'bold': True})
+    cabecalho = [str(c) for c in colunas]
+    usados = set()
+    worksheet, row, total = None, max_rows, 0
+    for chunk in chunks:
+        for valores in chunk.reindex(columns=colunas).itertuples(index=False, name=None):
+            if row >= max_rows:
+                worksheet = workbook.add_worksheet(_nome_planilha(sheet_name, usados))
+                worksheet.write_row(0, 0, cabecalho, header_format)
+                row = 1
+            worksheet.write_row(row, 0, [_valor_celula(v) for v in valores])
+            row += 1
+            total += 1
+    if worksheet is None:
+        workbook.add_worksheet(_nome_planilha(sheet_name, usados)).write_row(0, 0, cabecalho, header_format)
+    workbook.close()
+    logger.info(f"Excel gerado: {sheet_name} ({total} linhas em {len(usados)} planilha(s))")
+    return output.getvalue()
+
+
+# Formatos de exportação: extensão e MIME type
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'Excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'JSON': ('json', 'application/json'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'Arrow': ('arrow', 'application/vnd.apache.arrow.file'),
+}
+
+# Colunas de texto com até esta fração de valores distintos viram categóricas
+MAX_CATEGORY_RATIO = 0.5
+
+
+def typed_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+    """Prepara o esquema para formatos tipados: datas como datetime e textos repetitivos como categorias."""
+    colunas = {}
+    for coluna in df.columns:
+        serie = df[coluna]
+        if pd.api.types.infer_dtype(serie, skipna=True) != 'string':
+            continue
+        if coluna == 'data':
+            colunas[coluna] = pd.to_datetime(serie, errors='coerce')
+        elif serie.nunique() <= MAX_CATEGORY_RATIO * len(serie):
+            colunas[coluna] = serie.astype('category')
+    return df.assign(**colunas) if colunas else df
+
+
+def dataframe_to_arrow(df: pd.DataFrame) -> bytes:
+    """Serializa o DataFrame no formato de arquivo Arrow IPC, direto da memória."""
+    tabela = pa.Table.from_pandas(typed_dataframe(df), preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, tabela.schema) as writer:
+        writer.write_table(tabela)
+    return sink.getvalue().to_pybytes()
+
+
+@metrics.timed("export.{formato}")
+def serialize_dataframe(df: pd.DataFrame, formato: str, sheet_name: str = 'Relatorio') -> bytes:
+    """Serializa um DataFrame em um dos formatos de EXPORT_FORMATS."""
+    if formato == 'Excel':
+        return dataframe_to_xlsx(df, sheet_name)
+    if formato == 'Parquet':
+        output = BytesIO()
+        typed_dataframe(df).to_parquet(output, engine='pyarrow', index=False, compression='zstd')
+        return output.getvalue()
+    if formato == 'Arrow':
+        return dataframe_to_arrow(df)
+    if formato == 'JSON':
+        return df.to_json(orient='records', indent=2, force_ascii=False, date_format='iso').encode('utf-8')
+    return df.to_csv(index=False).encode('utf-8')
+
+# Grade de presença da planilha consolidada: números exibidos como P/F pelo
+# formato da célula (gravar números é bem mais rápido que texto no xlsxwriter)
+_CODIGOS_STATUS = {'Presença': 1, 'Falta': 2}
+_VALORES_GRADE = np.array([None, 1, -1], dtype=object)
+_FORMATO_GRADE = '"P";"F";""'
+
+
+def _nome_planilha(nome, usados: set) -> str:
+    """Nome de planilha válido no Excel (até 31 caracteres, sem []:*?/\\) e único."""
+    base = re.sub(r'[\[\]:*?/\\]', '_', str(nome)).strip("'") or 'Turma'
+    candidato, n = base[:31], 2
+    while candidato.lower() in usados:
+        sufixo = f" ({n})"
+        candidato, n = base[:31 - len(sufixo)] + sufixo, n + 1
+    usados.add(candidato.lower())
+    return candidato
+
+
+@metrics.timed("export.consolidated_workbook")
+def consolidated_workbook(df_frequencia: pd.DataFrame, df_alunos: pd.DataFrame,
+                          progresso: Optional[Callable[[float], None]] = None) -> bytes:
+    """Gera a planilha consolidada da escola em uma única passada, em modo de memória constante.
+
+    Uma planilha por turma com a grade aluno × dia letivo (P/F; 1/-1 nas células), seguida dos
+    totais do aluno, além das planilhas 'Resumo_Turmas' e 'Resumo_Mensal'.
+    df_frequencia precisa das colunas id_aluno, data, status e turma (e nome);
+    df_alunos (id_aluno, nome, turma) garante que alunos sem registros apareçam.
+    """
+    df = df_frequencia[df_frequencia['turma'].notna()]
+    df = df.assign(
+        data=pd.to_datetime(df['data']).dt.normalize(),
+        codigo=df['status'].map(_CODIGOS_STATUS).fillna(0).astype('int8')
+    )
+    turmas = sorted(set(df['turma']) | set(df_alunos['turma'].dropna()), key=str)
+    grupos = {turma: grupo for turma, grupo in df.groupby('turma', sort=False)}
+    alunos_por_turma = {turma: grupo for turma, grupo in df_alunos.groupby('turma', sort=False)}
+
+    output = BytesIO()
+    workbook = xlsxwriter.Workbook(output, XLSX_OPTIONS)
+    formatos = {
+        'cabecalho': workbook.add_format({'bold': True, 'bg_color': '#DDEBF7', 'border': 1}),
+        'data': workbook.add_format({'bold': True, 'bg_color': '#DDEBF7', 'border': 1, 'num_format': 'dd/mm', 'rotation': 90}),
+        'grade': workbook.add_format({'num_format': _FORMATO_GRADE, 'align': 'center'}),
+        'presenca': workbook.add_format({'bg_color': '#C6EFCE', 'font_color': '#006100'}),
+        'falta': workbook.add_format({'bg_color': '#FFC7CE', 'font_color': '#9C0006'}),
+        'percentual': workbook.add_format({'num_format': '0.0'}),
+    }
+    usados = set()
+    # Resumos criados primeiro (aparecem no início), mas preenchidos ao final
+    planilha_turmas = workbook.add_worksheet(_nome_planilha('Resumo_Turmas', usados))
+    planilha_mensal = workbook.add_worksheet(_nome_planilha('Resumo_Mensal', usados))
+    resumo_turmas = []
+
+    for indice, turma in enumerate(turmas, start=1):
+        grupo = grupos.get(turma, df.iloc[:0])
+        alunos = pd.concat([
+            alunos_por_turma.get(turma, pd.DataFrame(columns=['id_aluno', 'nome']))[['id_aluno', 'nome']],
+            grupo[['id_aluno', 'nome']] if 'nome' in grupo.columns else grupo[['id_aluno']].assign(nome='')
+        ]).drop_duplicates('id_aluno').sort_values('nome', key=lambda s: s.astype(str))
+        dias = pd.DatetimeIndex(grupo['data'].unique()).sort_values()
+
+        # Grade aluno × dia: o último registro do dia prevalece
+        grade = np.zeros((len(alunos), len(dias)), dtype='int8')
+        linhas = pd.Index(alunos['id_aluno']).get_indexer(grupo['id_aluno'])
+        validos = linhas >= 0
+        grade[linhas[validos], dias.get_indexer(grupo['data'])[validos]] = grupo['codigo'].to_numpy()[validos]
+        presencas = (grade == 1).sum(axis=1)
+        faltas = (grade == 2).sum(axis=1)
+        registros = presencas + faltas
+
+        planilha = workbook.add_worksheet(_nome_planilha(turma, usados))
+        planilha.set_column(0, 0, 32)
+        planilha.set_column(1, 1, 10)
+        planilha.set_column(2, 1 + len(dias), 3.5)
+        planilha.freeze_panes(1, 2)
+        planilha.write_row(0, 0, ['Aluno', 'ID'], formatos['cabecalho'])
+        planilha.write_row(0, 2, [dia.to_pydatetime() for dia in dias], formatos['data'])
+        planilha.write_row(0, 2 + len(dias), ['Presenças', 'Faltas', 'Taxa Presença (%)'], formatos['cabecalho'])
+
+        valores = _VALORES_GRADE[grade]
+        for linha, (id_aluno, nome) in enumerate(alunos[['id_aluno', 'nome']].itertuples(index=False, name=None)):
+            taxa = presencas[linha] / registros[linha] * 100 if registros[linha] else None
+            planilha.write_row(linha + 1, 0, [_valor_celula(nome), _valor_celula(id_aluno)])
+            planilha.write_row(linha + 1, 2, valores[linha].tolist(), formatos['grade'])
+            planilha.write_row(linha + 1, 2 + len(dias), [int(presencas[linha]), int(faltas[linha])])
+            planilha.write(linha + 1, 4 + len(dias), taxa, formatos['percentual'])
+
+        if len(alunos) and len(dias):
+            intervalo = (1, 2, len(alunos), 1 + len(dias))
+            planilha.conditional_format(*intervalo, {'type': 'cell', 'criteria': '==', 'value': 1, 'format': formatos['presenca']})
+            planilha.conditional_format(*intervalo, {'type': 'cell', 'criteria': '==', 'value': -1, 'format': formatos['falta']})
+
+        total_registros, total_faltas = int(registros.sum()), int(faltas.sum())
+        resumo_turmas.append([
+            _valor_celula(turma), len(alunos), len(dias), total_registros, int(presencas.sum()), total_faltas,
+            round((total_registros - total_faltas) / total_registros * 100, 1) if total_registros else None
+        ])
+        if progresso:
+            progresso(indice / (len(turmas) + 1))
+
+    resumo = pd.DataFrame(resumo_turmas, columns=[
+        'Turma', 'Alunos', 'Dias Letivos', 'Registros', 'Presenças', 'Faltas', 'Taxa Presença (%)'
+    ])
+    write_dataframe_rows(planilha_turmas, resumo, formatos['cabecalho'])
+    planilha_turmas.set_column(0, 0, 24)
+    planilha_turmas.set_column(1, len(resumo.columns) - 1, 16)
+
+    mensal = df.assign(
+        mes=df['data'].dt.to_period('M'), falta=df['codigo'] == 2
+    ).groupby(['turma', 'mes']).agg(Registros=('codigo', 'size'), Faltas=('falta', 'sum')).reset_index()
+    mensal['mes'] = mensal['mes'].astype(str)
+    mensal['Taxa Presença (%)'] = ((mensal['Registros'] - mensal['Faltas']) / mensal['Registros'] * 100).round(1)
+    mensal = mensal.rename(columns={'turma': 'Turma', 'mes': 'Mês'})
+    write_dataframe_rows(planilha_mensal, mensal, formatos['cabecalho'])
+    planilha_mensal.set_column(0, 0, 24)
+    planilha_mensal.set_column(1, len(mensal.columns) - 1, 16)
+
+    workbook.close()
+    logger.info(f"Planilha consolidada gerada: {len(turmas)} turmas, {len(df)} registros")
+    return output.getvalue()
\ No newline at end of file
@@ -0,0 +1,338 @@
+import streamlit as st
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+REPORTS_DIR = "data/reports"
+# Intervalo mínimo entre limpezas de resultados expirados (segundos)
+REPORTS_CLEANUP_INTERVAL = 60 * 60
+
+# Status possíveis de um job
+PENDENTE = 'pendente'
+EXECUTANDO = 'executando'
+CONCLUIDO = 'concluído'
+ERRO = 'erro'
+CANCELADO = 'cancelado'
+
+
+class JobCancelado(Exception):
+    """Lançada dentro da tarefa quando o job foi cancelado."""
+
+
+class ReportJob:
+    """Job de geração de relatório executado em segundo plano."""
+
+    def __init__(self, job_id: str, owner: str, descricao: str, cache_key: str,
+                 file_name: str, mime: str, status: str = PENDENTE, progress: float = 0.0,
+                 created_at: str = "", finished_at: str = "", error: str = ""):
+        self.job_id = job_id
+        self.owner = owner
+        self.descricao = descricao
+        self.cache_key = cache_key
+        self.file_name = file_name
+        self.mime = mime
+        self.status = status
+        self.progress = progress
+        self.created_at = created_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.finished_at = finished_at
+        self.error = error
+        self._cancel_event = threading.Event()
+        self._future = None
+        # Mesmo relatório pedido por outros usuários durante a geração: acompanham esta execução
+        self._principal: Optional['ReportJob'] = None
+        self._seguidores: List['ReportJob'] = []
+
+    @property
+    def result_path(self) -> str:
+        extensao = os.path.splitext(self.file_name)[1]
+        return os.path.join(REPORTS_DIR, f"{self.cache_key}{extensao}")
+
+    @property
+    def ativo(self) -> bool:
+        return self.status in (PENDENTE, EXECUTANDO)
+
+    def progresso(self, valor: float):
+        """Atualiza o progresso (0-1); interrompe a tarefa se o job foi cancelado."""
+        self.progress = max(0.0, min(1.0, float(valor)))
+        for seguidor in self._seguidores:
+            seguidor.progress = self.progress
+        if self._cancel_event.is_set():
+            raise JobCancelado()
+
+    def to_dict(self) -> Dict[str, any]:
+        return {
+            'job_id': self.job_id, 'owner': self.owner, 'descricao': self.descricao,
+            'cache_key': self.cache_key, 'file_name': self.file_name, 'mime': self.mime,
+            'status': self.status, 'progress': self.progress, 'created_at': self.created_at,
+            'finished_at': self.finished_at, 'error': self.error
+        }
+
+
+class JobQueue:
+    """Fila de relatórios com pool de workers, progresso, cancelamento e resultados em disco."""
+
+    def __init__(self, max_workers: int = 2, retention_days: int = 7):
+        self.retention_days = retention_days
+        self._jobs: Dict[str, ReportJob] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="relatorios")
+        self._index_path = os.path.join(REPORTS_DIR, "jobs.json")
+        self._ultima_limpeza = 0.0
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+        self._load_index()
+        self.cleanup()
+
+    @staticmethod
+    def cache_key(params: Dict[str, any], versao: str) -> str:
+        """Chave do artefato: mesmos parâmetros e mesma versão dos dados geram o mesmo arquivo."""
+        conteudo = json.dumps({'params': params, 'versao': versao}, sort_keys=True, default=str)
+        return hashlib.sha256(conteudo.encode()).hexdigest()[:24]
+
+    def submit(self, owner: str, descricao: str, func: Callable[[ReportJob], bytes],
+               params: Dict[str, any], versao: str, file_name: str, mime: str) -> str:
+        """Enfileira um relatório e retorna o id do job.
+
+        Se o mesmo relatório (parâmetros + versão) já foi gerado, o job é criado
+        como concluído apontando para o arquivo existente; se está em andamento,
+        retorna o job em andamento do usuário ou, se foi pedido por outro
+        usuário, cria um job que acompanha essa mesma execução.
+        """
+        self._limpar_se_necessario()
+        chave = self.cache_key(params, versao)
+        with self._lock:
+            em_andamento = None
+            for existente in self._jobs.values():
+                if existente.cache_key == chave and existente.ativo:
+                    if existente.owner == owner:
+                        return existente.job_id
+                    em_andamento = existente._principal or existente
+
+            job = ReportJob(uuid.uuid4().hex[:12], owner, descricao, chave, file_name, mime)
+            self._jobs[job.job_id] = job
+
+            if os.path.exists(job.result_path):
+                job.status = CONCLUIDO
+                job.progress = 1.0
+                job.finished_at = job.created_at
+                logger.info(f"Relatório servido do cache: {descricao} ({chave})")
+            elif em_andamento is not None:
+                job._principal = em_andamento
+                job.status = EXECUTANDO if em_andamento._future and em_andamento._future.running() else PENDENTE
+                job.progress = em_andamento.progress
+                em_andamento._seguidores.append(job)
+                logger.info(f"Relatório já em geração, acompanhando: {descricao} ({chave})")
+            else:
+                job._future = self._executor.submit(self._run, job, func)
+            self._save_index()
+        return job.job_id
+
+    def get(self, job_id: str) -> Optional[ReportJob]:
+        return self._jobs.get(job_id)
+
+    def list_jobs(self, owner: str) -> List[ReportJob]:
+        """Jobs de um usuário, mais recentes primeiro."""
+        self._limpar_se_necessario()
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if job.owner == owner]
+        return sorted(jobs, key=lambda job: job.created_at, reverse=True)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancela um job pendente ou em execução.
+
+        Um job em execução é interrompido no próximo ponto de verificação
+        (chamada de progresso ou fim da geração): o arquivo não é gravado.
+        Se outros usuários aguardam o mesmo relatório, só este job é cancelado
+        e a geração continua para eles.
+        """
+        job = self._jobs.get(job_id)
+        if job is None or not job.ativo:
+            return False
+        principal = job._principal or job
+        with self._lock:
+            interessados = [j for j in [principal] + principal._seguidores if j.ativo and j is not job]
+        if interessados:
+            self._finish_jobs([job], CANCELADO)
+            return True
+        principal._cancel_event.set()
+        if principal._future is not None and principal._future.cancel():
+            self._finish(principal, CANCELADO)
+        self._finish_jobs([job], CANCELADO)
+        return True
+
+    def has_result(self, job_id: str) -> bool:
+        """Se o arquivo do job concluído ainda existe (não foi apagado pela retenção)."""
+        job = self._jobs.get(job_id)
+        return job is not None and job.status == CONCLUIDO and os.path.exists(job.result_path)
+
+    def read_result(self, job_id: str) -> Optional[bytes]:
+        """Lê o arquivo gerado por um job concluído (None se o job ou o arquivo não existe mais)."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        try:
+            with open(job.result_path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            logger.warning(f"Resultado do relatório não encontrado (expirado?): {job.descricao}")
+            return None
+
+    def remove(self, job_id: str):
+        """Remove o job da lista do usuário (o arquivo segue disponível como cache)."""
+        with self._lock:
+            self._jobs.pop(job_id, None)
+            self._save_index()
+
+    def cleanup(self):
+        """Apaga resultados e jobs mais antigos que o período de retenção."""
+        self._ultima_limpeza = time.time()
+        limite = self._ultima_limpeza - self.retention_days * 86400
+        for nome in os.listdir(REPORTS_DIR):
+            caminho = os.path.join(REPORTS_DIR, nome)
+            try:
+                if caminho != self._index_path and os.path.getmtime(caminho) < limite:
+                    os.remove(caminho)
+            except OSError:
+                pass
+        with self._lock:
+            for job_id, job in list(self._jobs.items()):
+                if job.status == CONCLUIDO and not os.path.exists(job.result_path):
+                    del self._jobs[job_id]
+            self._save_index()
+
+    def _limpar_se_necessario(self):
+        # A retenção também vale em processos longos: limpeza a cada REPORTS_CLEANUP_INTERVAL
+        if time.time() - self._ultima_limpeza > REPORTS_CLEANUP_INTERVAL:
+            self.cleanup()
+
+    def _run(self, job: ReportJob, func: Callable[[ReportJob], bytes]):
+        if job._cancel_event.is_set():
+            self._finish(job, CANCELADO)
+            return
+        with self._lock:
+            for alvo in [job] + job._seguidores:
+                if alvo.ativo:
+                    alvo.status = EXECUTANDO
+        try:
+            conteudo = func(job)
+            # Cancelado durante uma etapa sem pontos de verificação: descarta o resultado
+            job.progresso(job.progress)
+            # Arquivo temporário próprio do job: gerações simultâneas nunca escrevem no mesmo arquivo
+            caminho_tmp = f"{job.result_path}.{job.job_id}.tmp"
+            with open(caminho_tmp, 'wb') as f:
+                f.write(conteudo)
+            os.replace(caminho_tmp, job.result_path)
+            self._finish(job, CONCLUIDO)
+            logger.info(f"Relatório gerado: {job.descricao} ({len(conteudo)} bytes)")
+        except JobCancelado:
+            self._finish(job, CANCELADO)
+            logger.info(f"Relatório cancelado: {job.descricao}")
+        except Exception as e:
+            self._finish(job, ERRO, str(e))
+            logger.error(f"Erro ao gerar relatório ({job.descricao}): {e}")
+
+    def _finish(self, job: ReportJob, status: str, error: str = ""):
+        """Encerra uma execução: o job e os que o acompanham (exceto os já cancelados pelo usuário)."""
+        self._finish_jobs([job] + job._seguidores, status, error)
+
+    def _finish_jobs(self, jobs: List[ReportJob], status: str, error: str = ""):
+        with self._lock:
+            for job in jobs:
+                if not job.ativo:
+                    continue
+                job.status = status
+                job.error = error
+                job.finished_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                if status == CONCLUIDO:
+                    job.progress = 1.0
+            self._save_index()
+
+    def _load_index(self):
+        try:
+            with open(self._index_path, encoding='utf-8') as f:
+                registros = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        for registro in registros:
+            job = ReportJob(**registro)
+            if job.ativo:
+                # Jobs interrompidos por reinício do servidor
+                job.status = ERRO
+                job.error = "Interrompido pelo reinício do servidor"
+            self._jobs[job.job_id] = job
+
+    def _save_index(self):
+        caminho_tmp = f"{self._index_path}.tmp"
+        with open(caminho_tmp, 'w', encoding='utf-8') as f:
+            json.dump([job.to_dict() for job in self._jobs.values()], f, ensure_ascii=False, indent=2)
+        os.replace(caminho_tmp, self._index_path)
+
+
+@st.cache_resource
+def get_report_queue() -> JobQueue:
+    """Fila de relatórios compartilhada por todas as sessões do servidor."""
+    return JobQueue()
+
+
+@st.fragment(run_every=2)
+def _painel_jobs_ativos(username: str):
+    queue = get_report_queue()
+    jobs = [job for job in queue.list_jobs(username) if job.ativo]
+    for job in jobs:
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            st.progress(job.progress, text=f"⏳ {job.descricao} ({job.status})")
+        with col2:
+            if st.button("✖️ Cancelar", key=f"cancel_{job.job_id}"):
+                queue.cancel(job.job_id)
+    if not jobs and st.session_state.get('_jobs_ativos_' + username):
+        # Algum job terminou: recarregar a página para listar o arquivo
+        st.session_state['_jobs_ativos_' + username] = False
+        st.rerun()
+    st.session_state['_jobs_ativos_' + username] = bool(jobs)
+
+
+def exibir_meus_relatorios(username: str):
+    """Painel 'Meus Relatórios': progresso dos jobs e download dos arquivos gerados."""
+    queue = get_report_queue()
+    jobs = queue.list_jobs(username)
+
+    st.subheader("🗂️ Meus Relatórios")
+    if not jobs:
+        st.info("Nenhum relatório solicitado.")
+        return
+
+    if any(job.ativo for job in jobs):
+        _painel_jobs_ativos(username)
+
+    for job in jobs:
+        if job.ativo:
+            continue
+        col1, col2, col3 = st.columns([4, 2, 1])
+        with col1:
+            st.write(f"**{job.descricao}**  \n{job.created_at} · {job.status}")
+            if job.error:
+                st.caption(f"❌ {job.error}")
+        with col2:
+            if job.status == CONCLUIDO and not queue.has_result(job.job_id):
+                st.caption("⌛ Arquivo expirado")
+            elif job.status == CONCLUIDO:
+                st.download_button(
+                    label="⬇️ Baixar",
+                    data=lambda job_id=job.job_id: queue.read_result(job_id) or b"",
+                    file_name=job.file_name,
+                    mime=job.mime,
+                    key=f"download_{job.job_id}"
+                )
+        with col3:
+            if st.button("🗑️", key=f"remove_{job.job_id}", help="Remover da lista"):
+                queue.remove(job.job_id)
+                st.rerun()
\ No newline at end of file
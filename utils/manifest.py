@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "data/manifest.json"
+
+
+def file_version(file_path: str) -> Optional[str]:
+    """Versão do arquivo (mtime_ns-tamanho), a mesma usada por get_data_version."""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+def file_hash(file_path: str) -> str:
+    """SHA-256 do conteúdo do arquivo (lido em blocos)."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(bloco)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """Resumo de cada tabela (versão do schema, linhas, bytes, hash) em data/manifest.json.
+
+    As entradas são gravadas a cada escrita da tabela e só valem enquanto o
+    arquivo não muda (mesmo mtime/tamanho); assim contagens e verificações de
+    "tabela vazia" não precisam carregar os dados. O hash é calculado em
+    segundo plano (sha256 fica None até lá), fora da gravação da tabela.
+    """
+
+    def __init__(self, path: str = MANIFEST_FILE):
+        self.path = path
+        self._entries: Dict[str, Dict[str, any]] = {}
+        self._versao_arquivo = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="manifesto")
+        self._hash_pendente = set()
+
+    def entry(self, table_name: str, file_path: str) -> Optional[Dict[str, any]]:
+        """Entrada da tabela, ou None se não existe ou o arquivo mudou desde que foi gravada."""
+        with self._lock:
+            self._reload()
+            entrada = self._entries.get(table_name)
+        if entrada is None or entrada.get('versao') != file_version(file_path):
+            return None
+        return dict(entrada)
+
+    def entries(self) -> Dict[str, Dict[str, any]]:
+        """Todas as entradas gravadas (inclusive as de arquivos que mudaram depois)."""
+        with self._lock:
+            self._reload()
+            return {tabela: dict(entrada) for tabela, entrada in self._entries.items()}
+
+    def record(self, table_name: str, file_path: str, rows: int, columns: List[str],
+               schema_version: int) -> Optional[Dict[str, any]]:
+        """Registra o estado atual do arquivo da tabela (chamado logo após gravá-lo)."""
+        try:
+            entrada = {
+                'schema_version': schema_version,
+                'rows': int(rows),
+                'bytes': os.path.getsize(file_path),
+                'sha256': None,
+                'columns': [str(coluna) for coluna in columns],
+                'versao': file_version(file_path),
+                'updated_at': datetime.fromtimestamp(os.path.getmtime(file_path)).strftime("%Y-%m-%d %H:%M:%S"),
+            }
+        except OSError as e:
+            logger.warning(f"Erro ao registrar {table_name} no manifesto: {e}")
+            return None
+
+        with self._lock:
+            self._reload()
+            self._entries[table_name] = entrada
+            self._save()
+            agendar = table_name not in self._hash_pendente
+            self._hash_pendente.add(table_name)
+        if agendar:
+            try:
+                self._executor.submit(self._hash_table, table_name, file_path)
+            except RuntimeError:
+                # Encerramento do processo (gravações do atexit): o hash fica para a próxima gravação
+                with self._lock:
+                    self._hash_pendente.discard(table_name)
+        return dict(entrada)
+
+    def _hash_table(self, table_name: str, file_path: str):
+        # Gravações feitas enquanto o hash é calculado agendam um novo cálculo
+        with self._lock:
+            self._hash_pendente.discard(table_name)
+        versao = file_version(file_path)
+        try:
+            digest = file_hash(file_path)
+        except OSError as e:
+            logger.warning(f"Erro ao calcular o hash de {table_name}: {e}")
+            return
+        if file_version(file_path) != versao:
+            return
+        with self._lock:
+            self._reload()
+            entrada = self._entries.get(table_name)
+            if entrada is not None and entrada.get('versao') == versao:
+                entrada['sha256'] = digest
+                self._save()
+
+    def _save(self):
+        try:
+            caminho_tmp = f"{self.path}.{threading.get_ident()}.tmp"
+            with open(caminho_tmp, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, ensure_ascii=False, indent=2, sort_keys=True)
+            os.replace(caminho_tmp, self.path)
+            self._versao_arquivo = file_version(self.path)
+        except OSError as e:
+            logger.warning(f"Erro ao gravar o manifesto: {e}")
+
+    def _reload(self):
+        # Relê o arquivo apenas quando outro processo o alterou
+        versao = file_version(self.path)
+        if versao == self._versao_arquivo:
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self._entries = json.load(f)
+        except FileNotFoundError:
+            self._entries = {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Manifesto inválido ({self.path}), será refeito: {e}")
+            self._entries = {}
+        self._versao_arquivo = versao
+
+
+manifest = Manifest()
\ No newline at end of file
@@ -0,0 +1,342 @@
+import pandas as pd
+import atexit
+import bisect
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Número de medições mantidas em memória (as mais antigas são descartadas)
+RING_BUFFER_SIZE = 20_000
+
+# Exportação periódica para o coletor (arquivo texto Prometheus + snapshot JSON)
+METRICS_DIR = "data/metrics"
+METRICS_EXPORT_INTERVAL = 60
+METRICS_PREFIX = "frequencia_app_"
+# Limites (segundos) dos buckets do histograma de latência
+HISTOGRAM_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICS_HELP = {
+    'operation_duration_seconds': "Latência das operações medidas (leituras, gravações, caches, seções das páginas)",
+    'operation_errors_total': "Operações medidas que terminaram com exceção",
+    'cache_lookups_total': "Consultas aos caches em memória, por resultado (hit/miss)",
+    'rows_loaded_total': "Linhas lidas das tabelas",
+    'rows_written_total': "Linhas gravadas nas tabelas",
+    'sheets_requests_total': "Requisições ao Google Sheets",
+    'sheets_errors_total': "Requisições ao Google Sheets com erro",
+    'active_sessions': "Sessões de usuário ativas",
+    'data_file_bytes': "Tamanho dos arquivos de dados",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Medicao:
+    """Medição em andamento; o código medido pode informar os bytes lidos/gravados."""
+
+    __slots__ = ('operacao', 'bytes')
+
+    def __init__(self, operacao: str):
+        self.operacao = operacao
+        self.bytes = 0
+
+
+class MetricsRegistry:
+    """Tempos dos caminhos críticos (leituras, gravações, caches, seções das páginas).
+
+    As medições ficam em um buffer circular do processo, compartilhado por todas
+    as sessões; os totais de chamadas e erros, os histogramas de latência e os
+    contadores contam desde o início do processo.
+    """
+
+    def __init__(self, capacidade: int = RING_BUFFER_SIZE):
+        self.capacidade = capacidade
+        self.inicio = time.time()
+        self._amostras = deque(maxlen=capacidade)
+        self._chamadas = Counter()
+        self._erros = Counter()
+        self._erros_totais = Counter()
+        self._histogramas: Dict[str, List[int]] = {}
+        self._soma_segundos: Dict[str, float] = defaultdict(float)
+        self._contadores: Dict[Tuple[str, Labels], float] = defaultdict(float)
+        self._gauges: Dict[str, Tuple[Callable, Optional[str]]] = {}
+        self._lock = threading.Lock()
+        self._exportador = None
+        self.ultima_exportacao = 0.0
+
+    def record(self, operacao: str, segundos: float, nbytes: int = 0, erro: bool = False):
+        """Registra uma medição."""
+        with self._lock:
+            self._amostras.append((time.time(), operacao, segundos, nbytes, erro))
+            self._chamadas[operacao] += 1
+            if erro:
+                self._erros[operacao] += 1
+                self._erros_totais[operacao] += 1
+            buckets = self._histogramas.setdefault(operacao, [0] * (len(HISTOGRAM_BUCKETS) + 1))
+            buckets[bisect.bisect_left(HISTOGRAM_BUCKETS, segundos)] += 1
+            self._soma_segundos[operacao] += segundos
+
+    def increment(self, nome: str, valor: float = 1, **labels: str):
+        """Soma valor ao contador `nome` (ex.: increment('cache_lookups_total', cache='report', result='hit'))."""
+        chave = (nome, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._contadores[chave] += valor
+
+    def register_gauge(self, nome: str, func: Callable, label: Optional[str] = None):
+        """Registra um valor lido no momento da exportação.
+
+        func retorna um número ou, com `label`, um dicionário valor do label → número.
+        """
+        with self._lock:
+            self._gauges[nome] = (func, label)
+
+    @contextmanager
+    def measure(self, operacao: str) -> Iterator[Medicao]:
+        """Mede o bloco: `with metrics.measure("csv.read.alunos") as m: ...; m.bytes = n`."""
+        medicao = Medicao(operacao)
+        erro = False
+        inicio = time.perf_counter()
+        try:
+            yield medicao
+        except Exception:
+            erro = True
+            raise
+        finally:
+            self.record(operacao, time.perf_counter() - inicio, medicao.bytes, erro)
+
+    def timed(self, operacao: str) -> Callable:
+        """Decorador: mede cada chamada. `operacao` pode usar os argumentos, ex.: "db.read.{table_name}".
+
+        Quando a função retorna bytes, o tamanho é registrado como I/O.
+        """
+        def decorador(func):
+            assinatura = inspect.signature(func) if '{' in operacao else None
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                nome = operacao
+                if assinatura is not None:
+                    argumentos = assinatura.bind_partial(*args, **kwargs).arguments
+                    nome = operacao.format(**argumentos)
+                with self.measure(nome) as medicao:
+                    resultado = func(*args, **kwargs)
+                    if isinstance(resultado, bytes):
+                        medicao.bytes = len(resultado)
+                    return resultado
+            return wrapper
+        return decorador
+
+    def summary(self) -> pd.DataFrame:
+        """p50/p95/máximo (ms), bytes e erros por operação, a partir do buffer."""
+        with self._lock:
+            amostras = list(self._amostras)
+            chamadas = dict(self._chamadas)
+            erros = dict(self._erros)
+        colunas = ['Operação', 'Chamadas', 'Amostras', 'p50 (ms)', 'p95 (ms)', 'Máx (ms)', 'Total (s)', 'Bytes I/O', 'Erros']
+        if not amostras:
+            return pd.DataFrame(columns=colunas)
+
+        df = pd.DataFrame(amostras, columns=['timestamp', 'operacao', 'segundos', 'bytes', 'erro'])
+        grupos = df.groupby('operacao')
+        resumo = pd.DataFrame({
+            'Amostras': grupos.size(),
+            'p50 (ms)': grupos['segundos'].median() * 1000,
+            'p95 (ms)': grupos['segundos'].quantile(0.95) * 1000,
+            'Máx (ms)': grupos['segundos'].max() * 1000,
+            'Total (s)': grupos['segundos'].sum(),
+            'Bytes I/O': grupos['bytes'].sum(),
+        })
+        resumo['Chamadas'] = resumo.index.map(chamadas)
+        resumo['Erros'] = resumo.index.map(lambda operacao: erros.get(operacao, 0))
+        resumo = resumo.rename_axis('Operação').reset_index()
+        return resumo[colunas].round(2).sort_values('p95 (ms)', ascending=False, ignore_index=True)
+
+    def oldest_sample(self) -> float:
+        """Timestamp da medição mais antiga ainda no buffer (ou 0)."""
+        with self._lock:
+            return self._amostras[0][0] if self._amostras else 0.0
+
+    def counters(self) -> pd.DataFrame:
+        """Contadores e gauges atuais (nome, labels, valor)."""
+        linhas = [
+            {'Métrica': nome, 'Labels': ', '.join(f"{k}={v}" for k, v in labels), 'Valor': valor}
+            for nome, labels, valor in self._contadores_exportados() + self._gauges_atuais()
+        ]
+        return pd.DataFrame(linhas, columns=['Métrica', 'Labels', 'Valor'])
+
+    def clear(self):
+        """Descarta as medições do buffer e os totais de chamadas (contadores exportados são mantidos)."""
+        with self._lock:
+            self._amostras.clear()
+            self._chamadas.clear()
+            self._erros.clear()
+        logger.info("Medições de desempenho descartadas")
+
+    def _contadores_exportados(self) -> List[Tuple[str, Labels, float]]:
+        with self._lock:
+            contadores = [(nome, labels, valor) for (nome, labels), valor in self._contadores.items()]
+            erros = [
+                ('operation_errors_total', (('operation', operacao),), total)
+                for operacao, total in self._erros_totais.items()
+            ]
+        # Requisições ao Google Sheets: derivadas das operações sheets.* medidas
+        sheets = Counter()
+        sheets_erros = Counter()
+        for operacao, (buckets, _) in self._histogramas_atuais().items():
+            if operacao.startswith('sheets.'):
+                sheets[operacao.split('.')[1]] += sum(buckets)
+        for _, labels, total in erros:
+            operacao = labels[0][1]
+            if operacao.startswith('sheets.'):
+                sheets_erros[operacao.split('.')[1]] += total
+        contadores += [('sheets_requests_total', (('operation', op),), n) for op, n in sheets.items()]
+        contadores += [('sheets_errors_total', (('operation', op),), n) for op, n in sheets_erros.items()]
+        return sorted(contadores + erros)
+
+    def _histogramas_atuais(self) -> Dict[str, Tuple[List[int], float]]:
+        with self._lock:
+            return {
+                operacao: (list(buckets), self._soma_segundos[operacao])
+                for operacao, buckets in self._histogramas.items()
+            }
+
+    def _gauges_atuais(self) -> List[Tuple[str, Labels, float]]:
+        with self._lock:
+            gauges = list(self._gauges.items())
+        valores = []
+        for nome, (func, label) in gauges:
+            try:
+                resultado = func()
+            except Exception as e:
+                logger.warning(f"Erro ao ler a métrica {nome}: {e}")
+                continue
+            if label is None:
+                valores.append((nome, (), float(resultado)))
+            else:
+                valores += [(nome, ((label, str(chave)),), float(valor)) for chave, valor in resultado.items()]
+        return valores
+
+    def snapshot(self) -> Dict[str, any]:
+        """Estado completo para exportação (contadores, gauges, histogramas e resumo do buffer)."""
+        return {
+            'timestamp': time.time(),
+            'uptime_seconds': round(time.time() - self.inicio, 1),
+            'counters': [
+                {'name': nome, 'labels': dict(labels), 'value': valor}
+                for nome, labels, valor in self._contadores_exportados()
+            ],
+            'gauges': [
+                {'name': nome, 'labels': dict(labels), 'value': valor}
+                for nome, labels, valor in self._gauges_atuais()
+            ],
+            'histograms': [
+                {
+                    'operation': operacao,
+                    'buckets': dict(zip([str(b) for b in HISTOGRAM_BUCKETS] + ['+Inf'], _acumular(buckets))),
+                    'sum': round(soma, 6),
+                    'count': sum(buckets),
+                }
+                for operacao, (buckets, soma) in sorted(self._histogramas_atuais().items())
+            ],
+            'operations': self.summary().to_dict(orient='records'),
+        }
+
+    def prometheus_text(self, snapshot: Optional[Dict[str, any]] = None) -> str:
+        """Formato de exposição texto do Prometheus (para o textfile collector)."""
+        snapshot = snapshot or self.snapshot()
+        linhas = []
+
+        def cabecalho(nome, tipo):
+            linhas.append(f"# HELP {METRICS_PREFIX}{nome} {METRICS_HELP.get(nome, nome)}")
+            linhas.append(f"# TYPE {METRICS_PREFIX}{nome} {tipo}")
+
+        nome = 'operation_duration_seconds'
+        if snapshot['histograms']:
+            cabecalho(nome, 'histogram')
+        for histograma in snapshot['histograms']:
+            operacao = {'operation': histograma['operation']}
+            for limite, total in histograma['buckets'].items():
+                linhas.append(f"{METRICS_PREFIX}{nome}_bucket{_labels({**operacao, 'le': limite})} {total}")
+            linhas.append(f"{METRICS_PREFIX}{nome}_sum{_labels(operacao)} {histograma['sum']}")
+            linhas.append(f"{METRICS_PREFIX}{nome}_count{_labels(operacao)} {histograma['count']}")
+
+        for chave, tipo in (('counters', 'counter'), ('gauges', 'gauge')):
+            por_nome = defaultdict(list)
+            for metrica in snapshot[chave]:
+                por_nome[metrica['name']].append(metrica)
+            for nome, metricas in sorted(por_nome.items()):
+                cabecalho(nome, tipo)
+                for metrica in metricas:
+                    linhas.append(f"{METRICS_PREFIX}{nome}{_labels(metrica['labels'])} {metrica['value']:g}")
+        return "\n".join(linhas) + "\n"
+
+    def export(self, diretorio: str = METRICS_DIR):
+        """Grava metrics.prom e metrics.json em diretorio (escrita atômica)."""
+        snapshot = self.snapshot()
+        os.makedirs(diretorio, exist_ok=True)
+        arquivos = {
+            'metrics.prom': self.prometheus_text(snapshot),
+            'metrics.json': json.dumps(snapshot, ensure_ascii=False, indent=2, default=str),
+        }
+        for nome, conteudo in arquivos.items():
+            caminho = os.path.join(diretorio, nome)
+            caminho_tmp = f"{caminho}.tmp"
+            with open(caminho_tmp, 'w', encoding='utf-8') as f:
+                f.write(conteudo)
+            os.replace(caminho_tmp, caminho)
+        self.ultima_exportacao = snapshot['timestamp']
+
+    def start_export(self, diretorio: str = METRICS_DIR, intervalo: int = METRICS_EXPORT_INTERVAL):
+        """Inicia (uma vez por processo) a exportação periódica em segundo plano e ao encerrar."""
+        with self._lock:
+            if self._exportador is not None:
+                return
+            self._exportador = threading.Thread(
+                target=self._exportar_periodicamente, args=(diretorio, intervalo),
+                name="metrics-export", daemon=True
+            )
+        self._exportador.start()
+        atexit.register(self._exportar_seguro, diretorio)
+
+    def _exportar_periodicamente(self, diretorio: str, intervalo: int):
+        while True:
+            time.sleep(intervalo)
+            self._exportar_seguro(diretorio)
+
+    def _exportar_seguro(self, diretorio: str):
+        try:
+            self.export(diretorio)
+        except Exception as e:
+            logger.error(f"Erro ao exportar métricas: {e}")
+
+
+def _acumular(buckets: List[int]) -> List[int]:
+    acumulado, total = [], 0
+    for n in buckets:
+        total += n
+        acumulado.append(total)
+    return acumulado
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pares = ','.join(
+        f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34)).replace(chr(10), chr(92) + "n")}"'
+        for k, v in labels.items()
+    )
+    return "{" + pares + "}"
+
+
+# Registro do processo (compartilhado por todas as sessões)
+metrics = MetricsRegistry()
+measure = metrics.measure
+timed = metrics.timed
\ No newline at end of file
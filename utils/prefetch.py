@@ -0,0 +1,45 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Hashable
+import logging
+
+from utils.tiered_cache import _MISSING, TieredCache
+
+logger = logging.getLogger(__name__)
+
+
+class PrefetchCache(TieredCache):
+    """Cache LRU limitado em bytes (TieredCache só em memória), com pré-carregamento em segundo plano."""
+
+    def __init__(self, nome: str = 'prefetch', max_bytes: int = 64 * 1024 * 1024, max_pending: int = 4):
+        super().__init__(nome, max_bytes)
+        self.max_pending = max_pending
+        self._pending = set()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Retorna o valor em cache (ou default), marcando-o como usado recentemente."""
+        valor = self._buscar(key, contar=False)
+        return default if valor is _MISSING else valor
+
+    def prefetch(self, key: Hashable, func: Callable[[], Any]) -> bool:
+        """Agenda o cálculo em segundo plano; ignora se já está em cache, pendente ou a fila está cheia."""
+        with self._lock:
+            if key in self._entries or key in self._pending or len(self._pending) >= self.max_pending:
+                return False
+            self._pending.add(key)
+        self._executor.submit(self._run, key, func)
+        return True
+
+    def _run(self, key: Hashable, func: Callable[[], Any]):
+        try:
+            self._armazenar(key, func())
+        except Exception as e:
+            logger.warning(f"Erro no pré-carregamento ({key}): {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+
+# Agregados mensais (calendário e status dos alunos) da página do professor
+month_cache = PrefetchCache()
\ No newline at end of file
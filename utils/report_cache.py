@@ -0,0 +1,29 @@
+import pandas as pd
+from typing import Callable, Hashable
+import logging
+
+from utils.export import serialize_dataframe
+from utils.tiered_cache import TieredCache
+
+logger = logging.getLogger(__name__)
+
+
+class ReportCache(TieredCache):
+    """Cache de relatórios compartilhado entre sessões, limitado em bytes.
+
+    A serialização (CSV/Excel/JSON) só acontece no download e também fica em
+    cache, como uma entrada própria (chave, formato) que conta para o limite.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, disk_max_bytes: int = 256 * 1024 * 1024):
+        super().__init__('report', max_bytes, disk_max_bytes)
+
+    def get_bytes(self, key: Hashable, formato: str, func: Callable[[], pd.DataFrame]) -> bytes:
+        """Retorna o relatório serializado em um dos formatos de EXPORT_FORMATS."""
+        return self.get_or_compute(
+            (key, formato), lambda: serialize_dataframe(self.get_or_compute(key, func), formato)
+        )
+
+
+# Relatórios detalhados da página do administrador
+report_cache = ReportCache()
\ No newline at end of file
@@ -0,0 +1,206 @@
+import pandas as pd
+import multiprocessing
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from io import BytesIO
+from typing import Callable, Dict, List, Optional, Tuple
+from fpdf import FPDF
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Alunos por tarefa na geração de PDFs individuais
+ALUNOS_POR_TAREFA = 25
+
+
+def agregar_frequencia(df: pd.DataFrame) -> Dict[str, dict]:
+    """Pré-agrega a frequência por turma, aluno e mês em uma única passada.
+
+    Retorna {turma: {'resumo', 'meses', 'alunos'}} apenas com tipos simples,
+    pronto para ser enviado aos processos de geração de PDF.
+    """
+    if df.empty:
+        return {}
+
+    falta = df['status'] == 'Falta'
+    base = df.assign(
+        falta=falta,
+        data_falta=df['data'].where(falta),
+        mes=df['data'].dt.to_period('M').astype(str)
+    ).groupby(['turma', 'id_aluno', 'nome', 'mes']).agg(
+        total=('status', 'size'),
+        faltas=('falta', 'sum'),
+        ultima_falta=('data_falta', 'max')
+    ).reset_index()
+
+    por_aluno = base.groupby(['turma', 'id_aluno', 'nome']).agg(
+        total=('total', 'sum'),
+        faltas=('faltas', 'sum'),
+        ultima_falta=('ultima_falta', 'max')
+    ).reset_index()
+    por_mes = base.groupby(['turma', 'mes'])[['total', 'faltas']].sum().reset_index()
+
+    for tabela in (base, por_aluno, por_mes):
+        tabela['taxa_presenca'] = ((tabela['total'] - tabela['faltas']) / tabela['total'] * 100).round(1)
+    for tabela in (base, por_aluno):
+        tabela['ultima_falta'] = tabela['ultima_falta'].dt.strftime('%d/%m/%Y').fillna('-')
+
+    meses_por_aluno = {
+        chave: grupo[['mes', 'total', 'faltas', 'taxa_presenca']].to_dict('records')
+        for chave, grupo in base.groupby(['turma', 'id_aluno'])
+    }
+
+    agregados = {}
+    for turma, alunos in por_aluno.groupby('turma'):
+        total = int(alunos['total'].sum())
+        faltas = int(alunos['faltas'].sum())
+        alunos_registros = alunos.to_dict('records')
+        for aluno in alunos_registros:
+            aluno['meses'] = meses_por_aluno.get((turma, aluno['id_aluno']), [])
+        agregados[turma] = {
+            'resumo': {
+                'alunos': len(alunos),
+                'registros': total,
+                'faltas': faltas,
+                'taxa_presenca': round((total - faltas) / total * 100, 1) if total else 0.0
+            },
+            'meses': por_mes[por_mes['turma'] == turma].to_dict('records'),
+            'alunos': alunos_registros
+        }
+    return agregados
+
+
+def _texto(valor) -> str:
+    """Normaliza texto para as fontes padrão do PDF (latin-1)."""
+    return str(valor).encode('latin-1', 'replace').decode('latin-1')
+
+
+def _nome_arquivo(valor) -> str:
+    """Gera um nome de arquivo seguro a partir de um texto."""
+    return re.sub(r'[^\w.-]+', '_', str(valor)).strip('_') or 'sem_nome'
+
+
+def _cabecalho(pdf: FPDF, titulo: str, periodo: str):
+    pdf.add_page()
+    pdf.set_font("Helvetica", 'B', 16)
+    pdf.cell(0, 12, "Sistema de Frequência Acadêmica", 0, 1, 'C')
+    pdf.set_font("Helvetica", 'B', 13)
+    pdf.cell(0, 9, _texto(titulo), 0, 1, 'C')
+    pdf.set_font("Helvetica", '', 9)
+    pdf.cell(0, 8, _texto(f"Período: {periodo} | Gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M')}"), 0, 1, 'C')
+    pdf.ln(6)
+
+
+def _tabela(pdf: FPDF, colunas: List[Tuple[str, int]], linhas: List[List]):
+    pdf.set_font("Helvetica", 'B', 9)
+    for titulo, largura in colunas:
+        pdf.cell(largura, 7, _texto(titulo), 1, 0, 'C')
+    pdf.ln()
+    pdf.set_font("Helvetica", '', 8)
+    for linha in linhas:
+        for (_, largura), valor in zip(colunas, linha):
+            pdf.cell(largura, 6, _texto(valor)[:40], 1, 0, 'C')
+        pdf.ln()
+
+
+def _linhas_meses(meses: List[dict]) -> List[List]:
+    return [[m['mes'], m['total'], m['faltas'], f"{m['taxa_presenca']:.1f}%"] for m in meses]
+
+
+def gerar_pdf_turma(turma: str, dados: dict, periodo: str) -> Tuple[str, bytes]:
+    """Gera o PDF de frequência de uma turma a partir dos dados pré-agregados."""
+    pdf = FPDF()
+    _cabecalho(pdf, f"Relatório da Turma {turma}", periodo)
+
+    resumo = dados['resumo']
+    pdf.set_font("Helvetica", 'B', 11)
+    pdf.cell(0, 8, "RESUMO", 0, 1)
+    pdf.set_font("Helvetica", '', 10)
+    pdf.cell(0, 6, f"- Total de Alunos: {resumo['alunos']}", 0, 1)
+    pdf.cell(0, 6, f"- Total de Registros: {resumo['registros']}", 0, 1)
+    pdf.cell(0, 6, f"- Total de Faltas: {resumo['faltas']}", 0, 1)
+    pdf.cell(0, 6, f"- Taxa de Presença: {resumo['taxa_presenca']:.1f}%", 0, 1)
+    pdf.ln(4)
+
+    pdf.set_font("Helvetica", 'B', 11)
+    pdf.cell(0, 8, "FREQUÊNCIA MENSAL", 0, 1)
+    _tabela(pdf, [("Mês", 40), ("Registros", 35), ("Faltas", 35), ("Taxa Pres.", 35)], _linhas_meses(dados['meses']))
+    pdf.ln(4)
+
+    pdf.set_font("Helvetica", 'B', 11)
+    pdf.cell(0, 8, "FREQUÊNCIA POR ALUNO", 0, 1)
+    _tabela(
+        pdf,
+        [("Aluno", 75), ("Registros", 25), ("Faltas", 25), ("Taxa Pres.", 25), ("Última Falta", 30)],
+        [
+            [a['nome'], a['total'], a['faltas'], f"{a['taxa_presenca']:.1f}%", a['ultima_falta']]
+            for a in sorted(dados['alunos'], key=lambda a: str(a['nome']))
+        ]
+    )
+    return f"turmas/{_nome_arquivo(turma)}.pdf", bytes(pdf.output())
+
+
+def gerar_pdfs_alunos(turma: str, alunos: List[dict], periodo: str) -> List[Tuple[str, bytes]]:
+    """Gera um PDF por aluno para um lote de alunos pré-agregados."""
+    arquivos = []
+    for aluno in alunos:
+        pdf = FPDF()
+        _cabecalho(pdf, f"Relatório Individual - {aluno['nome']}", periodo)
+        pdf.set_font("Helvetica", '', 10)
+        pdf.cell(0, 6, _texto(f"- Turma: {turma}"), 0, 1)
+        pdf.cell(0, 6, f"- Total de Registros: {aluno['total']}", 0, 1)
+        pdf.cell(0, 6, f"- Total de Faltas: {aluno['faltas']}", 0, 1)
+        pdf.cell(0, 6, f"- Taxa de Presença: {aluno['taxa_presenca']:.1f}%", 0, 1)
+        pdf.cell(0, 6, _texto(f"- Última Falta: {aluno['ultima_falta']}"), 0, 1)
+        pdf.ln(4)
+        _tabela(pdf, [("Mês", 40), ("Registros", 35), ("Faltas", 35), ("Taxa Pres.", 35)], _linhas_meses(aluno['meses']))
+        nome = f"alunos/{_nome_arquivo(turma)}/{aluno['id_aluno']}_{_nome_arquivo(aluno['nome'])}.pdf"
+        arquivos.append((nome, bytes(pdf.output())))
+    return arquivos
+
+
+def _tarefas(agregados: Dict[str, dict], por_aluno: bool):
+    """Divide o trabalho em uma tarefa por turma e, opcionalmente, lotes de alunos."""
+    for turma, dados in agregados.items():
+        yield gerar_pdf_turma, (turma, dados)
+        if por_aluno:
+            alunos = dados['alunos']
+            for inicio in range(0, len(alunos), ALUNOS_POR_TAREFA):
+                yield gerar_pdfs_alunos, (turma, alunos[inicio:inicio + ALUNOS_POR_TAREFA])
+
+
+def gerar_relatorios_lote(df: pd.DataFrame, periodo: str, por_aluno: bool = False,
+                          max_workers: Optional[int] = None,
+                          progresso: Optional[Callable[[float], None]] = None) -> bytes:
+    """Gera os PDFs de todas as turmas (e alunos) em paralelo e retorna um ZIP.
+
+    progresso, se informado, recebe a fração de tarefas concluídas; uma exceção
+    lançada por ele (ex.: cancelamento) descarta as tarefas ainda pendentes.
+    """
+    agregados = agregar_frequencia(df)
+    tarefas = list(_tarefas(agregados, por_aluno))
+    max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(tarefas) or 1))
+
+    output = BytesIO()
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        # 'spawn' evita herdar threads do servidor Streamlit nos processos filhos
+        contexto = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=contexto) as executor:
+            futures = [executor.submit(func, *args, periodo) for func, args in tarefas]
+            try:
+                for concluidas, future in enumerate(as_completed(futures), start=1):
+                    resultado = future.result()
+                    for nome, conteudo in (resultado if isinstance(resultado, list) else [resultado]):
+                        zip_file.writestr(nome, conteudo)
+                    if progresso:
+                        progresso(concluidas / len(futures))
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+    logger.info(f"Relatórios em lote gerados: {len(agregados)} turmas, {len(tarefas)} tarefas, {max_workers} processos")
+    return output.getvalue()
\ No newline at end of file
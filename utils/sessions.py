@@ -0,0 +1,339 @@
+import streamlit as st
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional
+import logging
+
+from utils.database import db_manager
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SESSIONS_DB = "data/sessions.db"
+SESSION_SECRET_FILE = "data/.session_secret"
+# Sessões expiram após este tempo sem atividade (segundos)
+SESSION_IDLE_TIMEOUT = 30 * 60
+# Intervalo mínimo entre gravações de last_seen de uma mesma sessão (segundos)
+SESSION_TOUCH_INTERVAL = 60
+# Intervalo mínimo entre remoções das sessões expiradas (segundos)
+SESSION_CLEANUP_INTERVAL = 5 * 60
+# Idade a partir da qual o token de uma sessão é trocado por um novo (segundos)
+SESSION_ROTATE_AFTER = 15 * 60
+# Tempo em que o token substituído continua aceito, levando ao novo (outras abas abertas ao mesmo tempo)
+SESSION_ROTATE_GRACE = 60
+# Cookie do navegador que guarda o token (mantém o login após recarregar a página ou reiniciar o servidor)
+SESSION_COOKIE = "frequencia_sessao"
+# Parâmetro da URL usado por versões anteriores para o token; é removido se aparecer
+SESSION_QUERY_PARAM = "sessao"
+
+
+def _load_secret() -> bytes:
+    """Chave de assinatura dos tokens: st.secrets['session_secret'] ou arquivo gerado na primeira execução."""
+    try:
+        segredo = st.secrets.get("session_secret")
+    except Exception:
+        segredo = None
+    if segredo:
+        return str(segredo).encode()
+
+    if not os.path.exists(SESSION_SECRET_FILE):
+        os.makedirs(os.path.dirname(SESSION_SECRET_FILE), exist_ok=True)
+        fd = os.open(SESSION_SECRET_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            f.write(secrets.token_hex(32))
+    with open(SESSION_SECRET_FILE) as f:
+        return f.read().strip().encode()
+
+
+class SessionStore:
+    """Sessões no servidor (SQLite) com perfil e permissões em cache de memória."""
+
+    def __init__(self, db_path: str = SESSIONS_DB, idle_timeout: int = SESSION_IDLE_TIMEOUT):
+        self.db_path = db_path
+        self.idle_timeout = idle_timeout
+        self._secret = _load_secret()
+        self._sessions: Dict[str, Dict[str, any]] = {}
+        self._lock = threading.Lock()
+        self._rotate_lock = threading.Lock()
+        self._ultima_limpeza = 0.0
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id TEXT PRIMARY KEY, profile TEXT NOT NULL, "
+                "created_at REAL NOT NULL, last_seen REAL NOT NULL, replaced_by TEXT)"
+            )
+            colunas = {linha[1] for linha in conn.execute("PRAGMA table_info(sessions)")}
+            if 'replaced_by' not in colunas:
+                # Banco criado antes da troca periódica de tokens
+                conn.execute("ALTER TABLE sessions ADD COLUMN replaced_by TEXT")
+        self.cleanup()
+        metrics.register_gauge('active_sessions', self.active_count)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=5)
+
+    def _sign(self, session_id: str) -> str:
+        return hmac.new(self._secret, session_id.encode(), hashlib.sha256).hexdigest()
+
+    def _session_id(self, token: str) -> Optional[str]:
+        """Valida a assinatura do token e retorna o id da sessão."""
+        if not isinstance(token, str):
+            return None
+        session_id, _, assinatura = token.partition(".")
+        if session_id and hmac.compare_digest(assinatura, self._sign(session_id)):
+            return session_id
+        return None
+
+    def create(self, profile: Dict[str, any]) -> str:
+        """Cria uma sessão para o perfil autenticado e retorna o token assinado."""
+        self._limpar_se_necessario()
+        session_id = secrets.token_urlsafe(24)
+        agora = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO sessions (session_id, profile, created_at, last_seen) VALUES (?, ?, ?, ?)",
+                (session_id, json.dumps(profile), agora, agora)
+            )
+        with self._lock:
+            self._sessions[session_id] = {
+                'profile': profile, 'created_at': agora, 'last_seen': agora, 'persisted': agora, 'sucessor': None
+            }
+        logger.info(f"Sessão criada: {profile.get('username')}")
+        return f"{session_id}.{self._sign(session_id)}"
+
+    def get(self, token: str) -> Optional[Dict[str, any]]:
+        """Perfil da sessão (username, role, name, permissions) ou None se inválida/expirada.
+
+        Normalmente é só uma consulta em memória; o SQLite é lido apenas para
+        sessões criadas antes de um reinício do servidor.
+        """
+        session_id = self._session_id(token)
+        if session_id is None:
+            return None
+
+        self._limpar_se_necessario()
+        agora = time.time()
+        with self._lock:
+            sessao = self._sessions.get(session_id)
+        if sessao is None:
+            sessao = self._load(session_id)
+            if sessao is None:
+                return None
+
+        if agora - sessao['last_seen'] > self.idle_timeout:
+            self.revoke(token)
+            return None
+
+        if sessao['sucessor'] is not None:
+            # Token substituído: vale só até o fim da carência, sem renovar last_seen
+            return sessao['profile']
+        sessao['last_seen'] = agora
+        if agora - sessao['persisted'] > SESSION_TOUCH_INTERVAL:
+            sessao['persisted'] = agora
+            with self._connect() as conn:
+                conn.execute("UPDATE sessions SET last_seen = ? WHERE session_id = ?", (agora, session_id))
+        return sessao['profile']
+
+    def rotate(self, token: str) -> Optional[str]:
+        """Token atual da sessão: o próprio, um novo se a sessão for antiga, ou None se inválida.
+
+        O token só é trocado após SESSION_ROTATE_AFTER. O substituído continua
+        aceito por SESSION_ROTATE_GRACE e, nesse intervalo, leva ao mesmo token
+        novo: abas abertas ou recarregadas juntas não derrubam umas às outras.
+        """
+        with self._rotate_lock:
+            profile = self.get(token)
+            if profile is None:
+                return None
+            session_id = self._session_id(token)
+            agora = time.time()
+            with self._lock:
+                sessao = self._sessions.get(session_id)
+            if sessao is None:
+                return None
+            if sessao['sucessor'] is not None:
+                return f"{sessao['sucessor']}.{self._sign(sessao['sucessor'])}"
+            if agora - sessao['created_at'] < SESSION_ROTATE_AFTER:
+                return token
+
+            novo_token = self.create(profile)
+            sucessor = novo_token.partition(".")[0]
+            # last_seen recuado: a expiração por inatividade encerra o token antigo ao fim da carência
+            expira = agora - self.idle_timeout + SESSION_ROTATE_GRACE
+            sessao.update(sucessor=sucessor, last_seen=expira, persisted=expira)
+            with self._connect() as conn:
+                conn.execute(
+                    "UPDATE sessions SET last_seen = ?, replaced_by = ? WHERE session_id = ?",
+                    (expira, sucessor, session_id)
+                )
+            return novo_token
+
+    def revoke(self, token: str):
+        """Encerra a sessão (logout ou expiração)."""
+        session_id = self._session_id(token)
+        if session_id is None:
+            return
+        with self._lock:
+            self._sessions.pop(session_id, None)
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def revoke_users(self, usernames: Iterable[str]):
+        """Encerra todas as sessões dos usuários informados (ex.: senha, perfil ou status alterados)."""
+        usernames = set(usernames)
+        if not usernames:
+            return
+        with self._lock:
+            for session_id in [s for s, sessao in self._sessions.items()
+                               if sessao['profile'].get('username') in usernames]:
+                del self._sessions[session_id]
+        with self._connect() as conn:
+            conn.executemany(
+                "DELETE FROM sessions WHERE json_extract(profile, '$.username') = ?",
+                [(username,) for username in usernames]
+            )
+        logger.info(f"Sessões encerradas: {', '.join(sorted(usernames))}")
+
+    def cleanup(self):
+        """Remove sessões expiradas do banco e da memória."""
+        self._ultima_limpeza = time.time()
+        limite = self._ultima_limpeza - self.idle_timeout
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE last_seen < ?", (limite,))
+        with self._lock:
+            for session_id in [s for s, sessao in self._sessions.items() if sessao['last_seen'] < limite]:
+                del self._sessions[session_id]
+
+    def active_count(self) -> int:
+        """Número de sessões não expiradas (last_seen no banco pode estar até SESSION_TOUCH_INTERVAL atrasado)."""
+        limite = time.time() - self.idle_timeout
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM sessions WHERE last_seen >= ?", (limite,)).fetchone()[0]
+
+    def _limpar_se_necessario(self):
+        if time.time() - self._ultima_limpeza > SESSION_CLEANUP_INTERVAL:
+            self.cleanup()
+
+    def _load(self, session_id: str) -> Optional[Dict[str, any]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT profile, created_at, last_seen, replaced_by FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        sessao = {
+            'profile': json.loads(row[0]), 'created_at': row[1], 'last_seen': row[2], 'persisted': row[2],
+            'sucessor': row[3]
+        }
+        with self._lock:
+            self._sessions[session_id] = sessao
+        return sessao
+
+
+@st.cache_resource
+def get_session_store() -> SessionStore:
+    """Store de sessões compartilhado por todas as sessões do servidor.
+
+    Alterações de senha, perfil ou status de um usuário encerram as sessões dele.
+    """
+    store = SessionStore()
+    db_manager.add_user_listener(store.revoke_users)
+    return store
+
+
+def start_session(profile: Dict[str, any]):
+    """Cria a sessão no servidor e a associa à sessão atual do navegador.
+
+    O cookie é gravado pelo próximo current_user (quem chama pode usar st.rerun).
+    """
+    token = get_session_store().create(profile)
+    st.session_state["session_token"] = token
+    _set_cookie(token)
+    _apply_profile(profile)
+
+
+def current_user() -> Optional[Dict[str, any]]:
+    """Perfil do usuário logado, validado no store de sessões (ou None).
+
+    Uma nova sessão do navegador (página recarregada, servidor reiniciado)
+    retoma o login pelo cookie. Sessões antigas recebem um token novo (ver
+    SessionStore.rotate), gravado no cookie para as próximas retomadas.
+    """
+    if SESSION_QUERY_PARAM in st.query_params:
+        # Tokens nunca são aceitos pela URL (histórico, links copiados, logs de proxy)
+        del st.query_params[SESSION_QUERY_PARAM]
+
+    store = get_session_store()
+    anterior = st.session_state.get("session_token") or st.context.cookies.get(SESSION_COOKIE, "")
+    token = store.rotate(anterior)
+    profile = store.get(token) if token else None
+    if profile is None:
+        st.session_state.pop("session_token", None)
+        st.session_state["logged_in"] = False
+    else:
+        if token != anterior:
+            _set_cookie(token)
+        st.session_state["session_token"] = token
+        _apply_profile(profile)
+    _write_cookie()
+    return profile
+
+
+def check_access(role: Optional[str] = None, permission: Optional[str] = None) -> Dict[str, any]:
+    """Interrompe a página se não houver sessão válida com o perfil/permissão exigidos."""
+    profile = current_user()
+    if profile is None:
+        st.warning("🔒 Sessão expirada ou inexistente. Faça login novamente.")
+        st.stop()
+    if (role and profile['role'] != role) or (permission and permission not in profile['permissions']):
+        st.error("🚫 Você não tem permissão para acessar esta página.")
+        st.stop()
+    return profile
+
+
+def end_session():
+    """Logout: encerra a sessão no servidor e limpa o estado do navegador."""
+    token = st.session_state.pop("session_token", None)
+    if token:
+        get_session_store().revoke(token)
+    _set_cookie("", expirar=True)
+    st.session_state["logged_in"] = False
+    st.session_state["username"] = None
+    st.session_state["role"] = None
+
+
+def _set_cookie(token: str, expirar: bool = False):
+    # Só agenda: o script é emitido por _write_cookie na execução que segue (sobrevive a st.rerun)
+    st.session_state["_cookie_pendente"] = (token, expirar)
+
+
+def _write_cookie():
+    # Cookie de sessão do navegador (sem validade: some ao fechar o navegador), só na mesma origem.
+    # Limitação: o Streamlit não permite cabeçalhos Set-Cookie, então o cookie é gravado por
+    # script e não pode ser HttpOnly; um script injetado na página conseguiria lê-lo. Por isso
+    # o token só vale no servidor (revogável a qualquer momento), expira com a inatividade e é
+    # trocado periodicamente, e nenhum HTML de usuário é renderizado com scripts habilitados.
+    pendente = st.session_state.pop("_cookie_pendente", None)
+    if pendente is None:
+        return
+    token, expirar = pendente
+    atributos = "; path=/; SameSite=Strict" + ("; max-age=0" if expirar else "")
+    st.html(
+        f"<script>document.cookie = '{SESSION_COOKIE}={token}{atributos}'"
+        f" + (location.protocol === 'https:' ? '; Secure' : '');</script>",
+        unsafe_allow_javascript=True
+    )
+
+
+def _apply_profile(profile: Dict[str, any]):
+    # Chaves usadas pelas páginas (compatibilidade com o estado anterior)
+    st.session_state["logged_in"] = True
+    st.session_state["username"] = profile['username']
+    st.session_state["role"] = profile['role']
+    st.session_state["permissions"] = profile['permissions']
\ No newline at end of file
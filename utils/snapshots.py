@@ -0,0 +1,120 @@
+import pandas as pd
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+import logging
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Cópias binárias (Arrow IPC) das tabelas já lidas/processadas, com a versão dos dados de origem
+SNAPSHOT_DIR = "data/cache/snapshots"
+# Tabelas menores que isto são lidas do CSV (o ganho não compensa o arquivo extra)
+SNAPSHOT_MIN_BYTES = 1024 * 1024
+
+_VERSAO = b'frequencia_app.versao'
+
+
+class SnapshotStore:
+    """Snapshots Arrow de DataFrames, persistidos entre reinícios do servidor.
+
+    Cada arquivo guarda a versão dos dados de origem nos metadados do schema;
+    a leitura é um memory-map (sem parse), e a gravação é atômica (arquivo
+    temporário + os.replace), feita em segundo plano por save_async.
+    """
+
+    def __init__(self, diretorio: str = SNAPSHOT_DIR):
+        self.diretorio = diretorio
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot")
+        self._pendentes = set()
+        self._lock = threading.Lock()
+
+    def path(self, nome: str) -> str:
+        return os.path.join(self.diretorio, f"{nome}.arrow")
+
+    def load(self, nome: str, versao: Optional[str] = None) -> Optional[Tuple[pd.DataFrame, str]]:
+        """Retorna (DataFrame, versão) do snapshot; com `versao`, só se ela for a mesma."""
+        caminho = self.path(nome)
+        if not os.path.exists(caminho):
+            return None
+        try:
+            with metrics.measure(f"snapshot.read.{nome}") as medicao:
+                with pa.memory_map(caminho) as origem:
+                    leitor = ipc.open_file(origem)
+                    versao_snapshot = (leitor.schema.metadata or {}).get(_VERSAO, b'').decode()
+                    if versao is not None and versao_snapshot != versao:
+                        return None
+                    tabela = leitor.read_all()
+                df = tabela.to_pandas()
+                medicao.bytes = os.path.getsize(caminho)
+        except Exception as e:
+            logger.warning(f"Snapshot inválido ({caminho}): {e}")
+            return None
+        logger.info(f"Snapshot carregado: {nome} ({len(df)} linhas, versão {versao_snapshot})")
+        return df, versao_snapshot
+
+    def save(self, nome: str, df: pd.DataFrame, versao: str) -> bool:
+        """Grava o snapshot de df com a versão dos dados de origem."""
+        try:
+            tabela = _tabela(df, versao)
+        except Exception as e:
+            logger.warning(f"Erro ao converter snapshot ({nome}): {e}")
+            return False
+        return self._gravar(nome, tabela, len(df), versao)
+
+    def save_async(self, nome: str, df: pd.DataFrame, versao: str):
+        """Agenda a gravação fora da requisição (ignorada se já houver uma pendente para o mesmo nome).
+
+        A conversão para Arrow é feita aqui: alterações posteriores em df não
+        chegam ao snapshot.
+        """
+        with self._lock:
+            if nome in self._pendentes:
+                return
+            self._pendentes.add(nome)
+        try:
+            tabela = _tabela(df, versao)
+        except Exception as e:
+            logger.warning(f"Erro ao converter snapshot ({nome}): {e}")
+            with self._lock:
+                self._pendentes.discard(nome)
+            return
+        self._executor.submit(self._gravar_pendente, nome, tabela, len(df), versao)
+
+    def _gravar(self, nome: str, tabela: pa.Table, linhas: int, versao: str) -> bool:
+        caminho = self.path(nome)
+        caminho_tmp = f"{caminho}.{threading.get_ident()}.tmp"
+        try:
+            with metrics.measure(f"snapshot.write.{nome}") as medicao:
+                os.makedirs(self.diretorio, exist_ok=True)
+                with pa.OSFile(caminho_tmp, 'wb') as destino, ipc.new_file(destino, tabela.schema) as escritor:
+                    escritor.write_table(tabela)
+                medicao.bytes = os.path.getsize(caminho_tmp)
+                os.replace(caminho_tmp, caminho)
+        except Exception as e:
+            logger.warning(f"Erro ao gravar snapshot ({nome}): {e}")
+            if os.path.exists(caminho_tmp):
+                os.remove(caminho_tmp)
+            return False
+        logger.info(f"Snapshot gravado: {nome} ({linhas} linhas, versão {versao})")
+        return True
+
+    def _gravar_pendente(self, nome: str, tabela: pa.Table, linhas: int, versao: str):
+        try:
+            self._gravar(nome, tabela, linhas, versao)
+        finally:
+            with self._lock:
+                self._pendentes.discard(nome)
+
+
+def _tabela(df: pd.DataFrame, versao: str) -> pa.Table:
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    return tabela.replace_schema_metadata({**(tabela.schema.metadata or {}), _VERSAO: versao.encode()})
+
+
+snapshot_store = SnapshotStore()
\ No newline at end of file
@@ -0,0 +1,266 @@
+import pandas as pd
+import hashlib
+import os
+import pickle
+import shutil
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+import logging
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Diretório da camada em disco (entradas removidas da memória)
+CACHE_DIR = "data/cache"
+
+_MISSING = object()
+
+
+def tamanho_em_memoria(valor: Any) -> int:
+    """Bytes ocupados por um valor em cache (DataFrame/Series pela memória profunda do pandas)."""
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=True).sum())
+    if isinstance(valor, pd.Series):
+        return int(valor.memory_usage(deep=True))
+    if isinstance(valor, (bytes, bytearray)):
+        return len(valor)
+    if isinstance(valor, (tuple, list)):
+        return sys.getsizeof(valor) + sum(tamanho_em_memoria(item) for item in valor)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamanho_em_memoria(item) for item in valor.values())
+    return sys.getsizeof(valor)
+
+
+class TieredCache:
+    """Cache LRU em dois níveis, compartilhado entre sessões, limitado em bytes.
+
+    A memória guarda as entradas mais recentes até max_bytes; as removidas vão
+    para a camada em disco (Parquet para DataFrames, pickle para o resto), também
+    LRU e limitada em disk_max_bytes. Cada chave é calculada uma única vez mesmo
+    com várias sessões pedindo ao mesmo tempo.
+    """
+
+    def __init__(self, nome: str, max_bytes: int, disk_max_bytes: int = 0,
+                 tabela: str = 'frequencia', diretorio: str = CACHE_DIR,
+                 medir: Callable[[Any], int] = tamanho_em_memoria):
+        self.nome = nome
+        self.tabela = tabela
+        self.medir = medir
+        self.max_bytes = max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self.diretorio = os.path.join(diretorio, nome)
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._disco: "OrderedDict[Hashable, Tuple[str, int]]" = OrderedDict()
+        self._calculando: Dict[Hashable, threading.Lock] = {}
+        self._bytes = 0
+        self._bytes_disco = 0
+        self._stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'disk_evictions': 0}
+        self._lock = threading.Lock()
+        if disk_max_bytes:
+            # O índice da camada em disco é do processo: arquivos de execuções anteriores são descartados
+            shutil.rmtree(self.diretorio, ignore_errors=True)
+            os.makedirs(self.diretorio, exist_ok=True)
+        _caches.append(self)
+
+    @metrics.timed("cache.{self.nome}")
+    def get_or_compute(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """Retorna o valor em cache (memória ou disco) ou o calcula (uma vez por chave)."""
+        valor = self._buscar(key)
+        if valor is not _MISSING:
+            return valor
+        with self._lock:
+            lock_chave = self._calculando.setdefault(key, threading.Lock())
+
+        with lock_chave:
+            valor = self._buscar(key, contar=False)
+            if valor is not _MISSING:
+                return valor
+            try:
+                valor = func()
+                self._armazenar(key, valor)
+            finally:
+                with self._lock:
+                    self._calculando.pop(key, None)
+        return valor
+
+    def stats(self) -> Dict[str, int]:
+        """Acertos (memória e disco), faltas, remoções e ocupação de cada nível."""
+        with self._lock:
+            return {
+                **self._stats,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'disk_entries': len(self._disco),
+                'disk_bytes': self._bytes_disco,
+            }
+
+    def clear(self):
+        """Remove todas as entradas dos dois níveis."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            arquivos = [caminho for caminho, _ in self._disco.values()]
+            self._disco.clear()
+            self._bytes_disco = 0
+        for caminho in arquivos:
+            _remover(caminho)
+
+    def _buscar(self, key: Hashable, contar: bool = True) -> Any:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                if contar:
+                    self._contar('hits', 'hit')
+                return self._entries[key][0]
+            no_disco = self._disco.pop(key, None)
+            if no_disco is not None:
+                self._bytes_disco -= no_disco[1]
+            elif contar:
+                self._contar('misses', 'miss')
+        if no_disco is None:
+            return _MISSING
+
+        # Promove a entrada do disco de volta para a memória
+        caminho = no_disco[0]
+        try:
+            valor = _ler(caminho)
+        except Exception as e:
+            logger.warning(f"Erro ao ler entrada do cache em disco ({caminho}): {e}")
+            if contar:
+                with self._lock:
+                    self._contar('misses', 'miss')
+            return _MISSING
+        finally:
+            _remover(caminho)
+        if contar:
+            with self._lock:
+                self._contar('disk_hits', 'disk_hit')
+        self._armazenar(key, valor)
+        return valor
+
+    def _armazenar(self, key: Hashable, valor: Any):
+        tamanho = self.medir(valor)
+        with self._lock:
+            anterior = self._entries.pop(key, None)
+            if anterior is not None:
+                self._bytes -= anterior[1]
+            self._entries[key] = (valor, tamanho)
+            self._bytes += tamanho
+            removidas = self._evict()
+        # Gravação em disco fora do lock: leituras de outras chaves não esperam o I/O
+        for chave, valor_removido in removidas:
+            self._gravar_disco(chave, valor_removido)
+
+    def _evict(self) -> List[Tuple[Hashable, Any]]:
+        # Mantém ao menos a entrada mais recente, mesmo que sozinha exceda o limite
+        removidas = []
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            key, (valor, tamanho) = self._entries.popitem(last=False)
+            self._bytes -= tamanho
+            self._stats['evictions'] += 1
+            metrics.increment('cache_evictions_total', cache=self.nome, tier='memory')
+            if self.disk_max_bytes:
+                removidas.append((key, valor))
+            logger.info(f"Entrada removida da memória do cache {self.nome}: {key}")
+        return removidas
+
+    def _gravar_disco(self, key: Hashable, valor: Any):
+        caminho = os.path.join(self.diretorio, hashlib.sha1(repr(key).encode()).hexdigest())
+        try:
+            caminho = _gravar(caminho, valor)
+            tamanho = os.path.getsize(caminho)
+        except Exception as e:
+            logger.warning(f"Erro ao gravar entrada do cache {self.nome} em disco: {e}")
+            return
+        if tamanho > self.disk_max_bytes:
+            _remover(caminho)
+            return
+
+        with self._lock:
+            excedentes = []
+            anterior = self._disco.pop(key, None)
+            if anterior is not None:
+                self._bytes_disco -= anterior[1]
+                if anterior[0] != caminho:
+                    excedentes.append(anterior[0])
+            self._disco[key] = (caminho, tamanho)
+            self._bytes_disco += tamanho
+            while self._bytes_disco > self.disk_max_bytes:
+                _, (caminho_antigo, tamanho_antigo) = self._disco.popitem(last=False)
+                self._bytes_disco -= tamanho_antigo
+                self._stats['disk_evictions'] += 1
+                metrics.increment('cache_evictions_total', cache=self.nome, tier='disk')
+                excedentes.append(caminho_antigo)
+        for caminho_antigo in excedentes:
+            _remover(caminho_antigo)
+
+    def _contar(self, estatistica: str, resultado: str):
+        self._stats[estatistica] += 1
+        metrics.increment('cache_lookups_total', cache=self.nome, table=self.tabela, result=resultado)
+
+
+def _gravar(caminho: str, valor: Any) -> str:
+    """Grava valor em caminho + extensão (.parquet, .bin ou .pkl) e retorna o arquivo criado."""
+    if isinstance(valor, pd.DataFrame):
+        try:
+            destino = f"{caminho}.parquet"
+            valor.to_parquet(f"{destino}.tmp")
+            os.replace(f"{destino}.tmp", destino)
+            return destino
+        except Exception:
+            # Colunas que o Parquet não representa (objetos mistos, nomes não textuais): pickle
+            _remover(f"{caminho}.parquet.tmp")
+    if isinstance(valor, bytes):
+        destino = f"{caminho}.bin"
+        with open(f"{destino}.tmp", 'wb') as f:
+            f.write(valor)
+    else:
+        destino = f"{caminho}.pkl"
+        with open(f"{destino}.tmp", 'wb') as f:
+            pickle.dump(valor, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(f"{destino}.tmp", destino)
+    return destino
+
+
+def _ler(caminho: str) -> Any:
+    if caminho.endswith('.parquet'):
+        return pd.read_parquet(caminho)
+    with open(caminho, 'rb') as f:
+        return f.read() if caminho.endswith('.bin') else pickle.load(f)
+
+
+def _remover(caminho: str):
+    try:
+        os.remove(caminho)
+    except OSError:
+        pass
+
+
+_caches: List[TieredCache] = []
+
+
+def cache_stats() -> pd.DataFrame:
+    """Estatísticas de todos os caches do processo (uma linha por cache)."""
+    linhas = [{'Cache': cache.nome, **cache.stats()} for cache in _caches]
+    return pd.DataFrame(linhas).rename(columns={
+        'hits': 'Acertos (memória)', 'disk_hits': 'Acertos (disco)', 'misses': 'Faltas',
+        'evictions': 'Remoções (memória)', 'disk_evictions': 'Remoções (disco)',
+        'entries': 'Entradas', 'bytes': 'Bytes (memória)',
+        'disk_entries': 'Entradas (disco)', 'disk_bytes': 'Bytes (disco)',
+    })
+
+
+def _ocupacao(atributo: str) -> Callable[[], Dict[str, int]]:
+    return lambda: {cache.nome: cache.stats()[atributo] for cache in _caches}
+
+
+metrics.register_gauge('cache_bytes', _ocupacao('bytes'), label='cache')
+metrics.register_gauge('cache_disk_bytes', _ocupacao('disk_bytes'), label='cache')
+
+# Variações filtradas de DataFrames das páginas (ex.: df_filtrado do Coordenador)
+filter_cache = TieredCache('filtros', max_bytes=128 * 1024 * 1024, disk_max_bytes=512 * 1024 * 1024)
+# Arquivos exportados sob demanda (ex.: Excel do Agente)
+export_cache = TieredCache('exportacoes', max_bytes=32 * 1024 * 1024, disk_max_bytes=256 * 1024 * 1024)
\ No newline at end of file